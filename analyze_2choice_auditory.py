@@ -9,22 +9,42 @@ Created on Tue Jun  3 11:26:34 2025
 import argparse
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.patches import Patch
-from matplotlib.ticker import FuncFormatter
-import matplotlib.gridspec as gridspec
 from pathlib import Path
-from scipy.stats import norm
 
+import downsample
+import metrics
+import paths
+import session_data
+import timing
+
+# Trial outcome categories, top to bottom in the outcome raster
+categories = session_data.OUTCOMES[1:]
+category_colors = {
+    "early lick": "black", "omission": "gray",
+    "correct left": "green", "correct right": "green",
+    "incorrect left": "red", "incorrect right": "red",
+}
+# Colour of each outcome code (code 0 is never drawn)
+outcome_colors = np.array(["none"] + [category_colors[c] for c in categories])
+
+
+def plot_outcomes(ax, trial_number, outcome, **kwargs):
+    """Outcome raster as a single scatter: one row per category, y = code - 1."""
+    keep = outcome > 0
+    codes = outcome[keep]
+    ax.scatter(trial_number[keep], codes - 1, color=outcome_colors[codes], **kwargs)
+
+
+@timing.timed("analyze")
 def analyze(file_path, animal, date, box, output_dir):
    
-    # Get info from file name 
-    df = pd.read_csv(file_path).fillna(0)
+    timing.mark("load")
+    session = session_data.load(file_path)
     protocol = "Two-choice Auditory task"
     fig_title = f"{protocol} | Animal: {animal} | Date: {date} | Box {box}"
 
     # Extract tone-spout mapping for a specific animal
-    mapping_file_path = Path(r"L:/dmclab/Joana/Behavior/Spout-tone map/spout_tone_generator.csv")
+    mapping_file_path = paths.MAPPING_FILE
     spout_mapping_df = pd.read_csv(mapping_file_path)
     animal_id = int(animal)
     mapping_row = spout_mapping_df[spout_mapping_df["Animal"] == animal_id].iloc[0]
@@ -32,52 +52,33 @@ def analyze(file_path, animal, date, box, output_dir):
     pair_16khz = f"16KHz → {mapping_row['16KHz']} spout"
     mapping_subtitle = f"Tone-spout mapping: {pair_8khz}, {pair_16khz}"
 
-    # Calculate lick latency
-    df["tone_time"] = df["trial_start"] + 1.2
-    df["lick_latency"] = df["lick_time"] - df["tone_time"]
+    timing.mark("compute")
+    trial_number = session.trial_number
+    lick_latency = session.lick_latency
+    reward, punishment = session.reward, session.punishment
+    left, right = session.left, session.right
 
-    # Define the different variables to plot    
-    valid_licks = df[df["lick_latency"].notna()]
-    left_licks = valid_licks[valid_licks["left_spout"] == 1]
-    right_licks = valid_licks[valid_licks["right_spout"] == 1]
-    left_colors = left_licks["reward"].map({1: "green", 0: "red"}) 
-    right_colors = right_licks["reward"].map({1: "green", 0: "red"})
+    # Define the different variables to plot
+    left_licks = left & ~np.isnan(lick_latency)
+    right_licks = right & ~np.isnan(lick_latency)
+    left_colors = np.where(reward[left_licks], "green", "red")
+    right_colors = np.where(reward[right_licks], "green", "red")
 
-    categories = [
-        "early lick", "omission", "correct left", "correct right",
-        "incorrect left", "incorrect right"
-    ]
     category_to_y = {cat: i for i, cat in enumerate(categories)}
-    category_colors = {
-        "early lick": "black", "omission": "gray",
-        "correct left": "green", "correct right": "green",
-        "incorrect left": "red", "incorrect right": "red",
-    }
-
-    df["category"] = None
-    df.loc[df["early_lick"] == 1, "category"] = "early lick"
-    df.loc[(df["omission"] == 1) & (df["category"].isna()), "category"] = "omission"
-    df.loc[(df["left_spout"] == 1) & (df["reward"] == 1), "category"] = "correct left"
-    df.loc[(df["right_spout"] == 1) & (df["reward"] == 1), "category"] = "correct right"
-    df.loc[(df["punishment"] == 1) & (df["left_spout"] == 1), "category"] = "incorrect left"
-    df.loc[(df["punishment"] == 1) & (df["right_spout"] == 1), "category"] = "incorrect right"
-
-    df_plot = df[df["category"].notna()]
-    df_sorted = df_plot.sort_values("trial_number")
-    df_sorted["autom_reward"] = df_sorted["autom_reward"].astype(int) 
-    min_trial = df_sorted["trial_number"].min()
-    max_trial = df_sorted["trial_number"].max()
+    plotted = session.outcome > 0
+    min_trial = trial_number[plotted].min()
+    max_trial = trial_number[plotted].max()
 
     # Count data for bar plot
-    count_8khz = df[df["8KHz"] == 1].shape[0]
-    count_16khz = df[df["16KHz"] == 1].shape[0]
-    omission_8khz = df[(df["omission"] == 1) & (df["8KHz"] == 1)].shape[0]
-    omission_16khz = df[(df["omission"] == 1) & (df["16KHz"] == 1)].shape[0]
-    total_early_licks = df[df["early_lick"] == 1].shape[0]
-    count_left_correct = df[(df["left_spout"] == 1) & (df["reward"] == 1)].shape[0]
-    count_left_incorrect = df[(df["left_spout"] == 1) & (df["punishment"] == 1)].shape[0]
-    count_right_correct = df[(df["right_spout"] == 1) & (df["reward"] == 1)].shape[0]
-    count_right_incorrect = df[(df["right_spout"] == 1) & (df["punishment"] == 1)].shape[0]
+    count_8khz = session.low_tone.sum()
+    count_16khz = session.high_tone.sum()
+    omission_8khz = (session.omission & session.low_tone).sum()
+    omission_16khz = (session.omission & session.high_tone).sum()
+    total_early_licks = session.early_lick.sum()
+    count_left_correct = (left & reward).sum()
+    count_left_incorrect = (left & punishment).sum()
+    count_right_correct = (right & reward).sum()
+    count_right_incorrect = (right & punishment).sum()
     
     bar_labels = [
         "8KHz Trials", "16KHz Trials", 
@@ -94,7 +95,40 @@ def analyze(file_path, animal, date, box, output_dir):
         count_left_correct, count_left_incorrect,
         count_right_correct, count_right_incorrect
     ]
+
+    # HR / FA / d' over trials
+    trial_numbers = trial_number[plotted]
+    total_trials = np.arange(1, len(trial_numbers)+1)
+    correct_trials = reward[plotted].cumsum()
+    incorrect_trials = punishment[plotted].cumsum()
+
+    HR = (correct_trials + 0.5) / (total_trials + 1)
+    FA = (incorrect_trials + 0.5) / (total_trials + 1)
+    HR = np.clip(HR, 0.01, 0.99)
+    FA = np.clip(FA, 0.01, 0.99)
+    d_prime = metrics.d_prime(HR, FA)
+
+    # Performance breakdown
+    num_total_trials = plotted.sum()
+    num_correct = (reward & plotted).sum()
+    num_incorrect = (punishment & plotted).sum()
+    correct_left = (reward & left & plotted).sum()
+    correct_right = (reward & right & plotted).sum()
     
+    bar_labels_pct = ['Correct', 'Incorrect', 'Correct Left', 'Correct Right']
+    bar_values_pct = [
+    num_correct / num_total_trials * 100,
+    num_incorrect / num_total_trials * 100,
+    correct_left / num_total_trials * 100,
+    correct_right / num_total_trials * 100
+    ]
+
+    timing.mark("plot")
+    # Plotting libraries are only imported when a figure is made
+    import matplotlib.pyplot as plt
+    from matplotlib.patches import Patch
+    from matplotlib.ticker import FuncFormatter
+    import matplotlib.gridspec as gridspec
 
     # Make figure with different plots
     
@@ -103,20 +137,16 @@ def analyze(file_path, animal, date, box, output_dir):
 
     # Row 1 - Trial Outcomes
     ax0 = fig.add_subplot(gs[0, :])
-    for _, row in df.iterrows():
-        trial = row["trial_number"]
-        if row["autom_reward"] == 1:
+    for trial, autom_reward, stimulus in zip(trial_number, session.autom_reward, session.stimulus):
+        if autom_reward:
             ax0.axvspan(trial - 0.5, trial + 0.5, color="purple", alpha=0.1)
-        elif row["8KHz"] == 1:
+        elif stimulus == 1:
             ax0.axvspan(trial - 0.5, trial + 0.5, color="#BFF9FF", alpha=0.2)
-        elif row["16KHz"] == 1:
+        elif stimulus == 2:
             ax0.axvspan(trial - 0.5, trial + 0.5, color="#F5A783", alpha=0.2)
     
-    for category in categories:
-        subset = df_sorted[(df_sorted["category"] == category) & (df_sorted["autom_reward"] != 1)]
-        
-        ax0.scatter(subset["trial_number"], [category_to_y[category]] * len(subset),
-                    color=category_colors[category], s=10, zorder=3)
+    manual = ~session.autom_reward
+    plot_outcomes(ax0, trial_number[manual], session.outcome[manual], s=10, zorder=3)
     
     ax0.invert_yaxis()
     ax0.set_yticks(list(category_to_y.values()))
@@ -133,8 +163,8 @@ def analyze(file_path, animal, date, box, output_dir):
     # Row 2 - Lick Latencies
     # Left Spout
     ax1 = fig.add_subplot(gs[1, 0])
-    ax1.plot(left_licks["trial_number"], left_licks["lick_latency"], color='gray')
-    ax1.scatter(left_licks["trial_number"], left_licks["lick_latency"], c=left_colors)
+    downsample.plot(ax1, trial_number[left_licks], lick_latency[left_licks], color='gray')
+    ax1.scatter(trial_number[left_licks], lick_latency[left_licks], c=left_colors)
     ax1.set_title("Lick Latency - Left Spout")
     ax1.set_xlabel("Trial Number")
     ax1.set_ylabel("Lick Latency (s)")
@@ -145,8 +175,8 @@ def analyze(file_path, animal, date, box, output_dir):
     
     # Right Spout
     ax2 = fig.add_subplot(gs[1, 1])
-    ax2.plot(right_licks["trial_number"], right_licks["lick_latency"], color='gray')
-    ax2.scatter(right_licks["trial_number"], right_licks["lick_latency"], c=right_colors)
+    downsample.plot(ax2, trial_number[right_licks], lick_latency[right_licks], color='gray')
+    ax2.scatter(trial_number[right_licks], lick_latency[right_licks], c=right_colors)
     ax2.set_title("Lick Latency - Right Spout")
     ax2.set_xlabel("Trial Number")
     ax2.set_ylabel("Lick Latency (s)")
@@ -170,22 +200,11 @@ def analyze(file_path, animal, date, box, output_dir):
     ax3.spines['right'].set_visible(False)
     
     # Row 4 - HR / FA / d' and Performance Breakdown
-    trial_numbers = df_plot["trial_number"].astype(int).values
-    total_trials = np.arange(1, len(trial_numbers)+1)
-    correct_trials = (df_plot["reward"] == 1).cumsum().values
-    incorrect_trials = (df_plot["punishment"] == 1).cumsum().values
-
-    HR = (correct_trials + 0.5) / (total_trials + 1)
-    FA = (incorrect_trials + 0.5) / (total_trials + 1)
-    HR = np.clip(HR, 0.01, 0.99)
-    FA = np.clip(FA, 0.01, 0.99)
-    d_prime = norm.ppf(HR) - norm.ppf(FA)
-
     ax4 = fig.add_subplot(gs[3, 0])
     ax4b = ax4.twinx()
-    ax4.step(trial_numbers, HR, where='post', color='black', label='Hit Rate', linewidth=2)
-    ax4.step(trial_numbers, FA, where='post', color='red', label='False Alarm', linewidth=2)
-    ax4b.step(trial_numbers, d_prime, color='#9DB4C0', label="d'", linewidth=2)
+    downsample.step(ax4, trial_numbers, HR, where='post', color='black', label='Hit Rate', linewidth=2)
+    downsample.step(ax4, trial_numbers, FA, where='post', color='red', label='False Alarm', linewidth=2)
+    downsample.step(ax4b, trial_numbers, d_prime, color='#9DB4C0', label="d'", linewidth=2)
     ax4.set_ylim(0, 1)
     ax4b.set_ylim(min(d_prime) - 0.5, max(d_prime) + 0.5)
     ax4.set_ylabel("HR / FA")
@@ -197,21 +216,6 @@ def analyze(file_path, animal, date, box, output_dir):
     ax4.legend(lines1 + lines2, labels1 + labels2, loc='upper center', bbox_to_anchor=(0.5, -0.25), ncol=3, frameon=False)
 
     ax5 = fig.add_subplot(gs[3, 1])
-    
-    num_total_trials = len(df_plot)
-    num_correct = (df_plot["reward"] == 1).sum()
-    num_incorrect = (df_plot["punishment"] == 1).sum()
-    correct_left = ((df_plot["reward"] == 1) & (df_plot["left_spout"] == 1)).sum()
-    correct_right = ((df_plot["reward"] == 1) & (df_plot["right_spout"] == 1)).sum()
-    
-    bar_labels_pct = ['Correct', 'Incorrect', 'Correct Left', 'Correct Right']
-    bar_values_pct = [
-    num_correct / num_total_trials * 100,
-    num_incorrect / num_total_trials * 100,
-    correct_left / num_total_trials * 100,
-    correct_right / num_total_trials * 100
-    ]
-    
     bars = ax5.bar(bar_labels_pct, bar_values_pct, color=['green', 'red', 'green', 'green'])
     for bar in bars:
         yval = bar.get_height()
@@ -229,6 +233,7 @@ def analyze(file_path, animal, date, box, output_dir):
 
     Path(output_dir).mkdir(parents=True, exist_ok=True)
     fig.tight_layout(rect=[0, 0, 1, 0.95])
+    timing.mark("save")
     base_filename = Path(file_path).stem
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
@@ -247,7 +252,8 @@ def main():
     parser.add_argument('--box', required=True)
     parser.add_argument('--output', required=True)
     args = parser.parse_args()
-    analyze(args.file, args.animal, args.date, args.box, args.output)
+    with timing.session(Path(args.file).stem, animal=args.animal, date=args.date, box=args.box):
+        analyze(args.file, args.animal, args.date, args.box, args.output)
 
 if __name__ == "__main__":
     main()
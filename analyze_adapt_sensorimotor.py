@@ -8,21 +8,32 @@ Created on Mon Jun 16 18:43:55 2025
 import argparse
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.patches import Patch
-import matplotlib.gridspec as gridspec
 from pathlib import Path
-from scipy.stats import norm
 
+import downsample
+import metrics
+import paths
+import session_data
+import timing
+from analyze_2choice_auditory import categories, plot_outcomes
+
+# Colour of each block in the outcome rasters
+block_colors = {
+    "sound": "#DD6E42",
+    "action-left": "#7F557D",
+    "action-right": "#4EA5D9"
+}
+
+@timing.timed("analyze")
 def analyze(file_path, animal, date, box, output_dir):
     
-    # Get info from file name 
-    df = pd.read_csv(file_path).fillna(0)
+    timing.mark("load")
+    session = session_data.load(file_path)
     protocol = "Two-choice Auditory task"
     fig_title = f"{protocol} | Animal: {animal} | Date: {date} | Box {box}"
 
     # Extract tone-spout mapping for a specific animal
-    mapping_file_path = Path(r"L:/dmclab/Joana/Behavior/Spout-tone map/spout_tone_generator.csv")
+    mapping_file_path = paths.MAPPING_FILE
     spout_mapping_df = pd.read_csv(mapping_file_path)
     animal_id = int(animal)
     mapping_row = spout_mapping_df[spout_mapping_df["Animal"] == animal_id].iloc[0]
@@ -30,47 +41,39 @@ def analyze(file_path, animal, date, box, output_dir):
     pair_10khz = f"10KHz → {mapping_row['10KHz']} spout"
     mapping_subtitle = f"Tone-spout mapping: {pair_5khz}, {pair_10khz}"
 
-    # Calculate lick latency
-    df["tone_time"] = df["trial_start"] + 1.2
-    df["lick_latency"] = df["lick_time"] - df["tone_time"]
-    df["autom_reward"] = df["autom_reward"].fillna(0)
-
-    # Block color mapping
-    df["block_color"] = df["block"].map({
-        "sound": "#DD6E42",
-        "action-left": "#7F557D",
-        "action-right": "#4EA5D9"
-    })
-
-    # Categorize outcomes
-    df["category"] = None
-    df.loc[df["early_lick"] == 1, "category"] = "early lick"
-    df.loc[(df["omission"] == 1) & (df["category"].isna()), "category"] = "omission"
-    df.loc[(df["left_spout"] == 1) & (df["reward"] == 1), "category"] = "correct left"
-    df.loc[(df["right_spout"] == 1) & (df["reward"] == 1), "category"] = "correct right"
-    df.loc[(df["punishment"] == 1) & (df["left_spout"] == 1), "category"] = "incorrect left"
-    df.loc[(df["punishment"] == 1) & (df["right_spout"] == 1), "category"] = "incorrect right"
-
-    df_plot = df[df["category"].notna()]
-    df_sorted = df_plot.sort_values("trial_number")
-    min_trial = df_sorted["trial_number"].min()
-    max_trial = df_sorted["trial_number"].max()
-
-    categories = [
-        "early lick", "omission", "correct left", "correct right",
-        "incorrect left", "incorrect right"
-    ]
+    timing.mark("compute")
+    trial_number = session.trial_number
+    lick_latency = session.lick_latency
+    reward, punishment = session.reward, session.punishment
+    left, right = session.left, session.right
+    block_names = session.block_names()
+
+    plotted = session.outcome > 0
+    min_trial = trial_number[plotted].min()
+    max_trial = trial_number[plotted].max()
     category_to_y = {cat: i for i, cat in enumerate(categories)}
-    category_colors = {
-        "early lick": "black", "omission": "gray",
-        "correct left": "green", "correct right": "green",
-        "incorrect left": "red", "incorrect right": "red"
-    }
 
     # Count block transitions
-    df["block_transition"] = df["block"] != df["block"].shift()
-    block_starts = df[df["block_transition"]]
-    block_counts = block_starts["block"].value_counts()
+    block_transition = np.r_[True, session.block[1:] != session.block[:-1]]
+    block_counts = pd.Series(block_names[block_transition]).value_counts()
+
+    # HR / FA / d' over trials
+    trial_numbers = trial_number[plotted]
+    total_trials = np.arange(1, len(trial_numbers)+1)
+    correct_trials = reward[plotted].cumsum()
+    incorrect_trials = punishment[plotted].cumsum()
+
+    HR = (correct_trials + 0.5) / (total_trials + 1)
+    FA = (incorrect_trials + 0.5) / (total_trials + 1)
+    HR = np.clip(HR, 0.01, 0.99)
+    FA = np.clip(FA, 0.01, 0.99)
+    d_prime = metrics.d_prime(HR, FA)
+
+    timing.mark("plot")
+    # Plotting libraries are only imported when a figure is made
+    import matplotlib.pyplot as plt
+    from matplotlib.patches import Patch
+    import matplotlib.gridspec as gridspec
 
     # Plot setup
     fig = plt.figure(figsize=(14, 16))
@@ -78,25 +81,22 @@ def analyze(file_path, animal, date, box, output_dir):
 
     # Row 1: Trial outcomes
     ax0 = fig.add_subplot(gs[0, :])
-    for _, row in df.iterrows():
-        trial = row["trial_number"]
-        if row["catch_trial"] == 1:
+    for trial, catch_trial, stimulus in zip(trial_number, session.catch_trial, session.stimulus):
+        if catch_trial:
             ax0.axvspan(trial - 0.5, trial + 0.5, color="#EBE89E", alpha=0.4)
-        elif row["5KHz"] == 1:
+        elif stimulus == 1:
             ax0.axvspan(trial - 0.5, trial + 0.5, color="#BFF9FF", alpha=0.2)
-        elif row["10KHz"] == 1:
+        elif stimulus == 2:
             ax0.axvspan(trial - 0.5, trial + 0.5, color="#F5A783", alpha=0.2)
 
-    for category in categories:
-        subset = df_sorted[(df_sorted["category"] == category)]
-        ax0.scatter(subset["trial_number"], [category_to_y[category]] * len(subset),
-                    color=category_colors[category], s=10, zorder=3)
+    plot_outcomes(ax0, trial_number, session.outcome, s=10, zorder=3)
 
 
     # Add 'Blocks' line
     block_y = -1
-    for _, row in df.iterrows():
-        ax0.scatter(row["trial_number"], block_y, color=row["block_color"], s=10, zorder=3)
+    in_block = session.block > 0
+    ax0.scatter(trial_number[in_block], [block_y] * in_block.sum(),
+                color=[block_colors[b] for b in block_names[in_block]], s=10, zorder=3)
 
     ax0.set_yticks(list(category_to_y.values()) + [block_y])
     ax0.set_yticklabels(list(category_to_y.keys()) + ["Blocks"])
@@ -115,14 +115,14 @@ def analyze(file_path, animal, date, box, output_dir):
     ], bbox_to_anchor=(0.5, -0.35), loc='upper center', fontsize='small', ncol=6, frameon=False)
 
     # Row 2: Lick Latencies
-    left_licks = df[(df["left_spout"] == 1) & df["lick_latency"].notna()]
-    right_licks = df[(df["right_spout"] == 1) & df["lick_latency"].notna()]
-    left_colors = left_licks["reward"].map({1: "green", 0: "red"})
-    right_colors = right_licks["reward"].map({1: "green", 0: "red"})
+    left_licks = left & ~np.isnan(lick_latency)
+    right_licks = right & ~np.isnan(lick_latency)
+    left_colors = np.where(reward[left_licks], "green", "red")
+    right_colors = np.where(reward[right_licks], "green", "red")
 
     ax1 = fig.add_subplot(gs[1, 0])
-    ax1.plot(left_licks["trial_number"], left_licks["lick_latency"], color='gray')
-    ax1.scatter(left_licks["trial_number"], left_licks["lick_latency"], c=left_colors)
+    downsample.plot(ax1, trial_number[left_licks], lick_latency[left_licks], color='gray')
+    ax1.scatter(trial_number[left_licks], lick_latency[left_licks], c=left_colors)
     ax1.set_title("Lick Latency - Left Spout")
     ax1.set_xlabel("Trial Number")
     ax1.set_ylabel("Lick Latency (s)")
@@ -130,8 +130,8 @@ def analyze(file_path, animal, date, box, output_dir):
     ax1.grid(True)
 
     ax2 = fig.add_subplot(gs[1, 1])
-    ax2.plot(right_licks["trial_number"], right_licks["lick_latency"], color='gray')
-    ax2.scatter(right_licks["trial_number"], right_licks["lick_latency"], c=right_colors)
+    downsample.plot(ax2, trial_number[right_licks], lick_latency[right_licks], color='gray')
+    ax2.scatter(trial_number[right_licks], lick_latency[right_licks], c=right_colors)
     ax2.set_title("Lick Latency - Right Spout")
     ax2.set_xlabel("Trial Number")
     ax2.set_ylabel("Lick Latency (s)")
@@ -140,15 +140,15 @@ def analyze(file_path, animal, date, box, output_dir):
 
     # Row 3: Detailed Trial Counts
     trial_counts = [
-        df[df["5KHz"] == 1].shape[0],
-        df[df["10KHz"] == 1].shape[0],
-        df[(df["omission"] == 1) & (df["5KHz"] == 1)].shape[0],
-        df[(df["omission"] == 1) & (df["10KHz"] == 1)].shape[0],
-        df[df["early_lick"] == 1].shape[0],
-        df[(df["left_spout"] == 1) & (df["reward"] == 1)].shape[0],
-        df[(df["left_spout"] == 1) & (df["punishment"] == 1)].shape[0],
-        df[(df["right_spout"] == 1) & (df["reward"] == 1)].shape[0],
-        df[(df["right_spout"] == 1) & (df["punishment"] == 1)].shape[0],
+        session.low_tone.sum(),
+        session.high_tone.sum(),
+        (session.omission & session.low_tone).sum(),
+        (session.omission & session.high_tone).sum(),
+        session.early_lick.sum(),
+        (left & reward).sum(),
+        (left & punishment).sum(),
+        (right & reward).sum(),
+        (right & punishment).sum(),
         block_counts.get("sound", 0),
         block_counts.get("action-left", 0),
         block_counts.get("action-right", 0)
@@ -175,22 +175,11 @@ def analyze(file_path, animal, date, box, output_dir):
     ax3.spines['right'].set_visible(False)
 
     # Row 4: Performance summary
-    trial_numbers = df_plot["trial_number"].astype(int).values
-    total_trials = np.arange(1, len(trial_numbers)+1)
-    correct_trials = (df_plot["reward"] == 1).cumsum().values
-    incorrect_trials = (df_plot["punishment"] == 1).cumsum().values
-
-    HR = (correct_trials + 0.5) / (total_trials + 1)
-    FA = (incorrect_trials + 0.5) / (total_trials + 1)
-    HR = np.clip(HR, 0.01, 0.99)
-    FA = np.clip(FA, 0.01, 0.99)
-    d_prime = norm.ppf(HR) - norm.ppf(FA)
-
     ax4 = fig.add_subplot(gs[3, 0])
     ax4b = ax4.twinx()
-    ax4.step(trial_numbers, HR, where='post', color='black', label='Hit Rate', linewidth=2)
-    ax4.step(trial_numbers, FA, where='post', color='red', label='False Alarm', linewidth=2)
-    ax4b.step(trial_numbers, d_prime, color='#9DB4C0', label="d'", linewidth=2)
+    downsample.step(ax4, trial_numbers, HR, where='post', color='black', label='Hit Rate', linewidth=2)
+    downsample.step(ax4, trial_numbers, FA, where='post', color='red', label='False Alarm', linewidth=2)
+    downsample.step(ax4b, trial_numbers, d_prime, color='#9DB4C0', label="d'", linewidth=2)
     ax4.set_ylim(0, 1)
     ax4b.set_ylim(min(d_prime) - 0.5, max(d_prime) + 0.5)
     ax4.set_ylabel("HR / FA")
@@ -202,11 +191,11 @@ def analyze(file_path, animal, date, box, output_dir):
     ax4.legend(lines1 + lines2, labels1 + labels2, loc='upper center', bbox_to_anchor=(0.5, -0.25), ncol=3, frameon=False)
 
     ax5 = fig.add_subplot(gs[3, 1])
-    num_total_trials = len(df_plot)
-    num_correct = (df_plot["reward"] == 1).sum()
-    num_incorrect = (df_plot["punishment"] == 1).sum()
-    correct_left = ((df_plot["reward"] == 1) & (df_plot["left_spout"] == 1)).sum()
-    correct_right = ((df_plot["reward"] == 1) & (df_plot["right_spout"] == 1)).sum()
+    num_total_trials = plotted.sum()
+    num_correct = (reward & plotted).sum()
+    num_incorrect = (punishment & plotted).sum()
+    correct_left = (reward & left & plotted).sum()
+    correct_right = (reward & right & plotted).sum()
 
     bar_labels_pct = ['Correct', 'Incorrect', 'Correct Left', 'Correct Right']
     bar_values_pct = [
@@ -229,6 +218,7 @@ def analyze(file_path, animal, date, box, output_dir):
     plt.figtext(0.5, 0.95, mapping_subtitle, ha='center', fontsize=12)
 
     # Save
+    timing.mark("save")
     Path(output_dir).mkdir(parents=True, exist_ok=True)
     base_filename = Path(file_path).stem
     for ext in ['png', 'pdf', 'svg']:
@@ -236,31 +226,30 @@ def analyze(file_path, animal, date, box, output_dir):
 
     
      # --- Second Figure (per-block outcomes and bar plots) ---
+    timing.mark("plot_blocks")
     fig2 = plt.figure(figsize=(14, 18))
     gs2 = gridspec.GridSpec(nrows=6, ncols=1, height_ratios=[1, 0.5]*3, hspace=1.2)
     block_types = ['sound', 'action-left', 'action-right']
     block_titles = ['Sound Block', 'Action L Block', 'Action R Block']
 
     for i, block in enumerate(block_types):
-        df_block = df[df["block"] == block].copy()
-        df_block = df_block.sort_values("trial_number")
-        df_block["block_instance"] = (df_block["trial_number"].diff() > 1).cumsum()
-        change_points = df_block.groupby("block_instance")["trial_number"].min().values
-        df_block_plot = df_block[df_block["category"].notna()]
+        rows = np.flatnonzero(block_names == block)
+        rows = rows[np.argsort(trial_number[rows], kind="stable")]
+        block_trials = trial_number[rows]
+        # First trial of each run of this block
+        change_points = block_trials[np.r_[True, np.diff(block_trials) > 1]] if len(rows) else block_trials
+        in_block = np.zeros(len(session), dtype=bool)
+        in_block[rows] = True
 
         ax1 = fig2.add_subplot(gs2[i * 2])
-        for _, row in df_block.iterrows():
-            trial = row["trial_number"]
-            if row["catch_trial"] == 1:
+        for trial, catch_trial, stimulus in zip(block_trials, session.catch_trial[rows], session.stimulus[rows]):
+            if catch_trial:
                 ax1.axvspan(trial - 0.5, trial + 0.5, color="#EBE89E", alpha=0.4)
-            elif row["5KHz"] == 1:
+            elif stimulus == 1:
                 ax1.axvspan(trial - 0.5, trial + 0.5, color="#BFF9FF", alpha=0.2)
-            elif row["10KHz"] == 1:
+            elif stimulus == 2:
                 ax1.axvspan(trial - 0.5, trial + 0.5, color="#F5A783", alpha=0.2)
-        for category in categories:
-            subset = df_block_plot[df_block_plot["category"] == category]
-            ax1.scatter(subset["trial_number"], [category_to_y[category]] * len(subset),
-                        color=category_colors[category], s=10)
+        plot_outcomes(ax1, block_trials, session.outcome[rows], s=10)
         for trial in change_points[1:]:
             ax1.axvline(trial - 0.5, linestyle="--", color="black", linewidth=1, alpha=0.5)
         ax1.set_title(f"{block_titles[i]} - Trial Outcomes")
@@ -279,15 +268,15 @@ def analyze(file_path, animal, date, box, output_dir):
         bar_labels = ["5KHz", "10KHz", "5KHz Om", "10KHz Om", "Early Lick",
                       "Left Correct", "Left Incorrect", "Right Correct", "Right Incorrect"]
         bar_values = [
-            df_block[df_block["5KHz"] == 1].shape[0],
-            df_block[df_block["10KHz"] == 1].shape[0],
-            df_block[(df_block["omission"] == 1) & (df_block["5KHz"] == 1)].shape[0],
-            df_block[(df_block["omission"] == 1) & (df_block["10KHz"] == 1)].shape[0],
-            df_block[df_block["early_lick"] == 1].shape[0],
-            df_block[(df_block["left_spout"] == 1) & (df_block["reward"] == 1)].shape[0],
-            df_block[(df_block["left_spout"] == 1) & (df_block["punishment"] == 1)].shape[0],
-            df_block[(df_block["right_spout"] == 1) & (df_block["reward"] == 1)].shape[0],
-            df_block[(df_block["right_spout"] == 1) & (df_block["punishment"] == 1)].shape[0],
+            (in_block & session.low_tone).sum(),
+            (in_block & session.high_tone).sum(),
+            (in_block & session.omission & session.low_tone).sum(),
+            (in_block & session.omission & session.high_tone).sum(),
+            (in_block & session.early_lick).sum(),
+            (in_block & left & reward).sum(),
+            (in_block & left & punishment).sum(),
+            (in_block & right & reward).sum(),
+            (in_block & right & punishment).sum(),
         ]
         bar_colors = ["skyblue", "lightsalmon", "gray", "gray", "black",
                       "green", "red", "green", "red"]
@@ -304,6 +293,7 @@ def analyze(file_path, animal, date, box, output_dir):
         fig2.suptitle(fig_title, fontsize=14, y=0.98)
         plt.figtext(0.5, 0.95, mapping_subtitle, ha='center', fontsize=12)
 
+    timing.mark("save_blocks")
     for ext in ['png', 'pdf', 'svg']:
         fig2.savefig(Path(output_dir) / f"{base_filename}_summary_blocks.{ext}", dpi=400)
 
@@ -318,7 +308,8 @@ def main():
     parser.add_argument('--box', required=True)
     parser.add_argument('--output', required=True)
     args = parser.parse_args()
-    analyze(args.file, args.animal, args.date, args.box, args.output)
+    with timing.session(Path(args.file).stem, animal=args.animal, date=args.date, box=args.box):
+        analyze(args.file, args.animal, args.date, args.box, args.output)
 
 if __name__ == "__main__":
     main()
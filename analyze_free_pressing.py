@@ -6,42 +6,47 @@ Created on Mon Aug  4 16:27:44 2025
 """
 
 import argparse
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.gridspec as gridspec
-from matplotlib.patches import Patch
+import numpy as np
 from pathlib import Path
 
+import downsample
+import lick_rate
+import session_data
+import timing
+
+@timing.timed("analyze")
 def analyze(file_path, animal, date, box, output_dir):
     print(f"Starting Free Pressing analysis for: {file_path}")
-    df = pd.read_csv(file_path)
+    timing.mark("load")
+    session = session_data.load(file_path)
 
     required_columns = {'lick', 'left_spout', 'right_spout', 'QW', 'trial_start', 'trial_end', 'lick_time', 'session_start'}
-    if not required_columns.issubset(df.columns):
+    if not required_columns.issubset(session.columns):
         print(f"Skipping file (missing columns): {file_path}")
         return
 
+    timing.mark("compute")
     # Preprocessing
-    session_start = df['session_start'].iloc[0]
-    licks_df = df[['trial_number', 'lick', 'left_spout', 'right_spout']].copy()
-    licks_df['time'] = licks_df.index * 0.1
-    licks_only = licks_df[licks_df['lick'] == 1].copy()
-    licks_only['true_relative_time_min'] = (df.loc[licks_only.index, 'lick_time'] - session_start) / 60
-
-    start_time = df['trial_start'].min()
-    end_time = df['trial_end'].max()
+    session_start = session.session_start
+
+    start_time = np.nanmin(session.trial_start)
+    end_time = np.nanmax(session.trial_end)
     session_duration_minutes = (end_time - start_time) / 60
 
-    # Cumulative licks
-    licks_only['is_left'] = licks_only['left_spout'] == 1
-    licks_only['is_right'] = licks_only['right_spout'] == 1
-    cumulative_total = licks_only.groupby('trial_number').size().cumsum()
-    cumulative_left = licks_only[licks_only['is_left']].groupby('trial_number').size().cumsum()
-    cumulative_right = licks_only[licks_only['is_right']].groupby('trial_number').size().cumsum()
+    # Presses per side in time bins (finest resolution that fits the panel) and per trial
+    bin_width = lick_rate.pick_bin(lick_rate.session_seconds(session))
+    binned = lick_rate.bin_licks(session, [bin_width])[bin_width]
+    bin_edges = lick_rate.edges_minutes(binned.shape[1], bin_width)
+    per_trial = lick_rate.trial_counts(session)
+    cumulative_total, cumulative_left, cumulative_right = (lick_rate.cumulative(c) for c in per_trial)
+
+    total_presses, left_presses, right_presses = per_trial.sum(axis=1)
 
-    total_presses = len(licks_only)
-    left_presses = licks_only['left_spout'].sum()
-    right_presses = licks_only['right_spout'].sum()
+    timing.mark("plot")
+    # Plotting libraries are only imported when a figure is made
+    import matplotlib.pyplot as plt
+    import matplotlib.gridspec as gridspec
+    from matplotlib.patches import Patch
 
     # Plot setup
     labels = ['Total', 'Left', 'Right']
@@ -62,30 +67,30 @@ def analyze(file_path, animal, date, box, output_dir):
 
     # Plot 1: Licks Over Time
     ax0 = fig.add_subplot(gs[0, :])
-    for _, row in df.iterrows():
-        start_min = (row["trial_start"] - session_start) / 60
-        end_min = (row["trial_end"] - session_start) / 60
-        color = qw_colors.get(row["QW"], None)
+    for trial_start, trial_end, qw in zip(session.trial_start, session.trial_end, session.qw):
+        start_min = (trial_start - session_start) / 60
+        end_min = (trial_end - session_start) / 60
+        color = qw_colors.get(qw, None)
         if color:
             ax0.axvspan(start_min, end_min, color=color, alpha=0.5)
-    ax0.scatter(licks_only['true_relative_time_min'], [1]*len(licks_only), alpha=0.6, color='#AC90BF', marker='x')
+    for counts, label, color in zip(binned, labels, colors):
+        ax0.stairs(lick_rate.per_minute(counts, bin_width), bin_edges, label=label, color=color)
     ax0.set_xlabel("Time (min)")
+    ax0.set_ylabel(f"Presses / min ({bin_width} s bins)")
     ax0.set_title("Presses Over Time")
-    ax0.set_yticks([])
     ax0.set_xlim(0, session_duration_minutes)
     ax0.spines['top'].set_visible(False)
     ax0.spines['right'].set_visible(False)
 
     # Plot 2: Cumulative Licks Over Trials
     ax1 = fig.add_subplot(gs[1, :])
-    for _, row in df.iterrows():
-        trial = row["trial_number"]
-        color = qw_colors.get(row["QW"], None)
+    for trial, qw in zip(session.trial_number, session.qw):
+        color = qw_colors.get(qw, None)
         if color:
             ax1.axvspan(trial - 0.5, trial + 0.5, color=color, alpha=0.5)
-    ax1.plot(cumulative_total, drawstyle='steps-post', label="Total Presses", color="#F5A885")
-    ax1.plot(cumulative_left, drawstyle='steps-post', label="Left Press", color="#BB5C7A")
-    ax1.plot(cumulative_right, drawstyle='steps-post', label="Right Press", color="#5EA5A3")
+    downsample.plot(ax1, *cumulative_total, drawstyle='steps-post', label="Total Presses", color="#F5A885")
+    downsample.plot(ax1, *cumulative_left, drawstyle='steps-post', label="Left Press", color="#BB5C7A")
+    downsample.plot(ax1, *cumulative_right, drawstyle='steps-post', label="Right Press", color="#5EA5A3")
     ax1.set_xlabel("Trial Number")
     ax1.set_ylabel("Total Presses")
     ax1.set_title("Presses Over Trials")
@@ -124,6 +129,7 @@ def analyze(file_path, animal, date, box, output_dir):
     ax3.legend(handles=all_legend, loc='center', fontsize=11, frameon=False, ncol=1)
 
     # Save figure
+    timing.mark("save")
     Path(output_dir).mkdir(parents=True, exist_ok=True)
     base_filename = Path(file_path).stem
     fig.tight_layout(rect=[0, 0, 1, 0.95])
@@ -143,7 +149,8 @@ def main():
     parser.add_argument('--output', required=True)
     args = parser.parse_args()
 
-    analyze(args.file, args.animal, args.date, args.box, args.output)
+    with timing.session(Path(args.file).stem, animal=args.animal, date=args.date, box=args.box):
+        analyze(args.file, args.animal, args.date, args.box, args.output)
 
 if __name__ == "__main__":
     main()
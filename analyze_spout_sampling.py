@@ -5,48 +5,45 @@ Created on Mon Jun 16 17:26:54 2025
 @author: JoanaCatarino
 """
 import argparse
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.patches import Patch
-import matplotlib.gridspec as gridspec
+import numpy as np
 from pathlib import Path
 
+import session_data
+import timing
+
+@timing.timed("analyze")
 def analyze(file_path, animal, date, box, output_dir):
     print(f"Starting Spout Sampling analysis for: {file_path}")
-    df = pd.read_csv(file_path)
-    
-    # Get info from file name 
-    df = pd.read_csv(file_path).fillna(0)
+    timing.mark("load")
+    session = session_data.load(file_path)
     protocol = "Spout Sampling"
     fig_title = f"{protocol} | Animal: {animal} | Date: {date} | Box {box}"
     
 
     required_columns = {'trial_number', 'left_spout', 'right_spout', 'reward', 'omission', 'lick'}
-    if not required_columns.issubset(df.columns):
+    if not required_columns.issubset(session.columns):
         print(f"Skipping file (missing columns): {file_path}")
         return
 
-    df = df.sort_values("trial_number")
-    df = df.fillna(0)
-
-    # Define outcomes (excluding omission)
-    df["outcome"] = ""
-    df.loc[(df["left_spout"] == 1) & (df["omission"] == 0), "outcome"] = "left"
-    df.loc[(df["right_spout"] == 1) & (df["omission"] == 0), "outcome"] = "right"
-
+    timing.mark("compute")
+    # Define outcomes (excluding omission); a lick on the right spout wins
+    answered = ~session.omission
+    outcome_masks = {"right": session.right & answered}
+    outcome_masks["left"] = session.left & answered & ~outcome_masks["right"]
     outcome_to_y = {"left": 1, "right": 0}
-    df = df[df["outcome"] != ""]
-    df["y_pos"] = df["outcome"].map(outcome_to_y)
-    df["color"] = df["reward"].apply(lambda r: "green" if r == 1 else "gray")
+    kept = outcome_masks["left"] | outcome_masks["right"]
+    trial_number = session.trial_number
+    reward = session.reward
+    color = np.where(reward, "green", "gray")
 
     # Compute bar plot values
-    total_licks = len(df)
-    correct_trials = df[(df["lick"] == 1) & (df["reward"] == 1)].shape[0]
-    incorrect_trials = df[(df["lick"] == 1) & (df["reward"] == 0)].shape[0]
-    correct_left = df[(df["left_spout"] == 1) & (df["reward"] == 1)].shape[0]
-    incorrect_left = df[(df["left_spout"] == 1) & (df["reward"] == 0)].shape[0]
-    correct_right = df[(df["right_spout"] == 1) & (df["reward"] == 1)].shape[0]
-    incorrect_right = df[(df["right_spout"] == 1) & (df["reward"] == 0)].shape[0]
+    total_licks = kept.sum()
+    correct_trials = (kept & session.lick & reward).sum()
+    incorrect_trials = (kept & session.lick & ~reward).sum()
+    correct_left = (kept & session.left & reward).sum()
+    incorrect_left = (kept & session.left & ~reward).sum()
+    correct_right = (kept & session.right & reward).sum()
+    incorrect_right = (kept & session.right & ~reward).sum()
 
     bar_labels = [
         "Total Licks", "Correct Trials", "Incorrect Trials",
@@ -62,6 +59,12 @@ def analyze(file_path, animal, date, box, output_dir):
     ]
 
     # Plot
+    timing.mark("plot")
+    # Plotting libraries are only imported when a figure is made
+    import matplotlib.pyplot as plt
+    from matplotlib.patches import Patch
+    import matplotlib.gridspec as gridspec
+
     fig = plt.figure(figsize=(14, 10))
     gs = gridspec.GridSpec(nrows=5, ncols=1, height_ratios=[0.2, 2, 0.2, 0.2, 1], hspace=0.7)
 
@@ -71,14 +74,16 @@ def analyze(file_path, animal, date, box, output_dir):
 
     ax0 = fig.add_subplot(gs[1])
     for outcome, y_val in outcome_to_y.items():
-        subset = df[df["outcome"] == outcome]
-        ax0.scatter(subset["trial_number"], [y_val]*len(subset), c=subset["color"], label=outcome, s=20, zorder=3)
+        # Scatter in trial order, as the points overlap
+        rows = np.flatnonzero(outcome_masks[outcome])
+        rows = rows[np.argsort(trial_number[rows], kind="stable")]
+        ax0.scatter(trial_number[rows], [y_val]*len(rows), c=color[rows], label=outcome, s=20, zorder=3)
 
     ax0.set_yticks(list(outcome_to_y.values()))
     ax0.set_yticklabels(["Right Spout", "Left Spout"][::-1])
     ax0.set_xlabel("Trial Number")
     ax0.set_title(f" Performance over trials")
-    ax0.set_xlim(df["trial_number"].min() - 1, df["trial_number"].max() + 1)
+    ax0.set_xlim(trial_number[kept].min() - 1, trial_number[kept].max() + 1)
     ax0.set_ylim(-0.5, 1.5)
     ax0.grid(True, zorder=1)
 
@@ -109,6 +114,7 @@ def analyze(file_path, animal, date, box, output_dir):
     fig.suptitle(fig_title, fontsize=14, y=0.90)
 
     # Save figure
+    timing.mark("save")
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
     base_filename = Path(file_path).stem
@@ -126,7 +132,8 @@ def main():
     parser.add_argument('--output', required=True)
     args = parser.parse_args()
 
-    analyze(args.file, args.animal, args.date, args.box, args.output)
+    with timing.session(Path(args.file).stem, animal=args.animal, date=args.date, box=args.box):
+        analyze(args.file, args.animal, args.date, args.box, args.output)
 
 if __name__ == "__main__":
     main()
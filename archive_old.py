@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 10:12:40 2026
+
+@author: JoanaCatarino
+
+Packs the old/ backup folders that clean_duplicates and concat_files leave
+in every date folder into one compressed old.zip per date folder, so tree
+walks and the share see one small file instead of a folder of raw CSVs.
+
+Files are added to the archive (new backups are appended to an existing
+old.zip), checked against their CRC and only then removed; old/ is deleted
+once empty. Archived originals can still be read for audits:
+
+    python archive_old.py                 # archive every old/ folder of the data tree
+    python archive_old.py --dry-run       # only show what would be archived
+
+    import archive_old
+    df = archive_old.read_backup(".../20250110/old/2ChoiceAuditory_900001_..._old.csv")
+"""
+
+import os
+import io
+import shutil
+import zlib
+import zipfile
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import paths
+
+DATA_DIR = paths.DATA_DIR
+OLD_FOLDER = "old"
+ARCHIVE_NAME = "old.zip"
+WORKERS = 4   # zlib releases the GIL, so threads are enough
+
+
+def archive_path_for(date_dir) -> Path:
+    return Path(date_dir) / ARCHIVE_NAME
+
+
+def list_archived(date_dir) -> list[str]:
+    """Names of the backups archived in date_dir/old.zip (empty if there is no archive)."""
+    archive = archive_path_for(date_dir)
+    if not archive.exists():
+        return []
+    with zipfile.ZipFile(archive) as zf:
+        return zf.namelist()
+
+
+def open_backup(backup_path) -> io.BytesIO:
+    """Contents of a backup given its old/ path, from old/ if still there, else from old.zip."""
+    backup_path = Path(backup_path)
+    if backup_path.exists():
+        return io.BytesIO(backup_path.read_bytes())
+    archive = archive_path_for(backup_path.parent.parent)
+    try:
+        with zipfile.ZipFile(archive) as zf:
+            return io.BytesIO(zf.read(backup_path.name))
+    except (FileNotFoundError, KeyError):
+        raise FileNotFoundError(f"{backup_path.name} is neither in {backup_path.parent} nor in {archive}")
+
+
+def read_backup(backup_path, **read_csv_kwargs) -> pd.DataFrame:
+    """Backup CSV as a DataFrame, whether it is still in old/ or already archived."""
+    return pd.read_csv(open_backup(backup_path), **read_csv_kwargs)
+
+
+def file_crc(path) -> int:
+    crc = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            crc = zlib.crc32(block, crc)
+    return crc
+
+
+def archive_folder(old_dir, dry_run=False) -> tuple[int, int, int]:
+    """Move the files of one old/ folder into the old.zip next to it.
+
+    Returns (files archived, bytes before, archive bytes after). A file whose name is already
+    in the archive with different contents is never stored under another name (read_backup
+    could then return the wrong file): it is reported and left in old/.
+    """
+    old_dir = Path(old_dir)
+    archive = archive_path_for(old_dir.parent)
+    files = sorted(p for p in old_dir.iterdir() if p.is_file())
+    before = sum(p.stat().st_size for p in files)
+    if dry_run or not files:
+        return len(files), before, archive.stat().st_size if archive.exists() else 0
+
+    # Work on a copy, so an interrupted run never leaves a broken archive behind
+    tmp = archive.with_suffix(".zip.tmp")
+    if archive.exists():
+        shutil.copy2(archive, tmp)
+    with zipfile.ZipFile(tmp, "a", compression=zipfile.ZIP_DEFLATED, compresslevel=9) as zf:
+        existing = {info.filename: info.CRC for info in zf.infolist()}
+        written = []
+        for path in files:
+            crc = file_crc(path)
+            if path.name in existing:
+                if existing[path.name] == crc:
+                    written.append(path)   # already archived by an earlier run
+                else:
+                    print(f"⚠️ {path}: a different {path.name} is already in {archive}, left in old/")
+                continue
+            zf.write(path, path.name)
+            existing[path.name] = crc
+            written.append(path)
+
+    # Check every member against its source before deleting anything
+    with zipfile.ZipFile(tmp) as zf:
+        bad = zf.testzip()
+        crcs = {info.filename: info.CRC for info in zf.infolist()}
+    if bad is not None or any(crcs.get(path.name) != file_crc(path) for path in written):
+        tmp.unlink()
+        raise IOError(f"verification of {archive} failed, {old_dir} left untouched")
+    os.replace(tmp, archive)
+
+    for path in written:
+        path.unlink()
+    if not any(old_dir.iterdir()):
+        old_dir.rmdir()
+    return len(written), before, archive.stat().st_size
+
+
+def find_old_folders(root=DATA_DIR) -> list[Path]:
+    """Every <animal>/Behavior/<date>/old folder under root."""
+    folders = []
+    for animal in os.scandir(root):
+        behavior_dir = Path(animal.path) / "Behavior"
+        if not animal.name.isdigit() or not behavior_dir.is_dir():
+            continue
+        for date in os.scandir(behavior_dir):
+            old_dir = Path(date.path) / OLD_FOLDER
+            if date.is_dir() and old_dir.is_dir():
+                folders.append(old_dir)
+    return sorted(folders)
+
+
+def archive_all(root=DATA_DIR, workers=WORKERS, dry_run=False):
+    folders = find_old_folders(root)
+    print(f"🔍 {len(folders)} old/ folders under {root}")
+    if not folders:
+        return
+
+    def archive(old_dir):
+        try:
+            return archive_folder(old_dir, dry_run)
+        except Exception as e:
+            print(f"❌ {old_dir}: {e}")
+            return 0, 0, 0
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(archive, folders))
+
+    n_files = sum(r[0] for r in results)
+    before = sum(r[1] for r in results) / 1024 ** 2
+    if dry_run:
+        print(f"📊 {n_files} backup files, {before:.1f} MB would be archived")
+        return
+    after = sum(r[2] for r in results) / 1024 ** 2
+    print(f"✅ {n_files} backup files archived: {before:.1f} MB → {after:.1f} MB in {ARCHIVE_NAME} files")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack each date folder's old/ backups into a compressed old.zip.")
+    parser.add_argument("--root", default=DATA_DIR, help="Data folder to scan.")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be archived.")
+    parser.add_argument("--list", metavar="DATE_DIR", help="List the backups archived in one date folder and exit.")
+    args = parser.parse_args()
+    if args.list:
+        for name in list_archived(args.list):
+            print(f"  📁 {name}")
+        return
+    archive_all(args.root, args.workers, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
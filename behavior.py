@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 15:02:33 2026
+
+@author: JoanaCatarino
+
+Query API for notebooks, so the data can be reached without copying loaders
+from the analysis scripts:
+
+    import behavior
+    s = behavior.sessions(animal="900001", protocol="2ChoiceAuditory", dates=("20250101", "20250131"))
+    s.metrics()          # per-session metrics from the cohort cache, no CSV is read
+    s[0].trials          # trial frame of the first session (a copy of the cached frame)
+    s[0].data.outcome    # compact read-only arrays (session_data.Session), outcomes as uint8 codes
+    s.trials()           # all trial frames stacked, with animal/date/box columns
+
+Sessions come from the per-animal session index, one SessionFile each. Trial
+frames are loaded on first access and kept in a small in-memory LRU cache
+keyed on (path, mtime), so a file that changes on disk is read again; callers
+get copies, so editing a frame never changes the cached one. Metrics come
+from the cohort summary cache (cohort.py); sessions missing from it are
+summarized once and kept in a bounded cache.
+"""
+
+import functools
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import cohort
+import session_data
+import session_index
+import overall_plots
+
+# Sessions whose trial frames / arrays are kept in memory
+TRIAL_CACHE_SIZE = 32
+# Metrics of sessions missing from the cohort cache kept in memory
+SUMMARY_CACHE_SIZE = 512
+
+
+@functools.lru_cache(maxsize=TRIAL_CACHE_SIZE)
+def _load_trials(path, mtime):
+    return overall_plots.safe_read_csv(Path(path))
+
+
+@functools.lru_cache(maxsize=TRIAL_CACHE_SIZE)
+def _load_session(path, mtime):
+    # Shared between callers, so the arrays are made read-only
+    session = session_data.load(path)
+    for name in session.__slots__:
+        value = getattr(session, name)
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+    return session
+
+
+@functools.lru_cache(maxsize=1)
+def _cached_summaries(cache_mtime):
+    df = cohort.load_cached_summaries()
+    return {(row["path"], row["mtime"]): row for row in df.to_dict("records")}
+
+
+def cached_summaries() -> dict:
+    """{(path, mtime): metrics} from cohort_sessions.csv, re-read only when the file changes."""
+    try:
+        cache_mtime = cohort.SUMMARY_CACHE.stat().st_mtime
+    except FileNotFoundError:
+        cache_mtime = None
+    return _cached_summaries(cache_mtime)
+
+
+@functools.lru_cache(maxsize=SUMMARY_CACHE_SIZE)
+def _summarize(protocol, path, mtime):
+    summary = cohort.protocol_to_summary.get(protocol)
+    return summary(path) if summary else {}
+
+
+class SessionFile:
+    """One session file. Trials and metrics are only loaded when asked for."""
+
+    __slots__ = ("animal", "protocol", "date", "time", "box", "path", "mtime", "size")
+
+    def __init__(self, record):
+        for name in self.__slots__:
+            setattr(self, name, record.get(name))
+
+    def __repr__(self):
+        return f"SessionFile({self.protocol} {self.animal} {self.date}_{self.time} box{self.box})"
+
+    @property
+    def trials(self) -> pd.DataFrame:
+        return _load_trials(self.path, self.mtime).copy()
+
+    @property
+    def data(self) -> session_data.Session:
+        """Array form of the session (outcome codes instead of strings), cached like trials.
+        The object is shared and its arrays are read-only: .copy() an array before editing it."""
+        return _load_session(self.path, self.mtime)
+
+    @property
+    def metrics(self) -> dict:
+        """Per-session metrics: from the cohort cache if the file is unchanged, else computed once."""
+        row = cached_summaries().get((self.path, self.mtime))
+        if row is None:
+            row = _summarize(self.protocol, self.path, self.mtime)
+        return {k: v for k, v in row.items() if k not in cohort.ID_COLUMNS and k != "size"}
+
+    def info(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class Sessions:
+    """Lazy collection of sessions; indexing and iteration never read a CSV."""
+
+    def __init__(self, sessions):
+        self._sessions = list(sessions)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __iter__(self):
+        return iter(self._sessions)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return Sessions(self._sessions[key])
+        return self._sessions[key]
+
+    def __repr__(self):
+        animals = sorted({s.animal for s in self._sessions})
+        return f"Sessions({len(self)} sessions, {len(animals)} animals)"
+
+    def filter(self, func) -> "Sessions":
+        return Sessions(s for s in self._sessions if func(s))
+
+    def info(self) -> pd.DataFrame:
+        return pd.DataFrame([s.info() for s in self._sessions])
+
+    def metrics(self) -> pd.DataFrame:
+        """One row per session: identifiers plus the precomputed metrics."""
+        return pd.DataFrame([{**s.info(), **s.metrics} for s in self._sessions])
+
+    def trials(self) -> pd.DataFrame:
+        """Trial frames of every session stacked, tagged with animal, protocol, date, time and box."""
+        if not self._sessions:
+            return pd.DataFrame()
+        # concat copies anyway, so the cached frames are used directly
+        frames = [_load_trials(s.path, s.mtime) for s in self._sessions]
+        df = pd.concat(frames, ignore_index=True)
+        lengths = [len(f) for f in frames]
+        for name in ("animal", "protocol", "date", "time", "box"):
+            df[name] = np.repeat([getattr(s, name) for s in self._sessions], lengths)
+        return df
+
+
+def _as_set(value):
+    if value is None:
+        return None
+    if isinstance(value, (str, int)):
+        return {str(value)}
+    return {str(v) for v in value}
+
+
+def _date_filter(dates):
+    """dates: one 'YYYYMMDD', a list/set of them, or a (first, last) tuple, both included."""
+    if dates is None:
+        return lambda date: True
+    if isinstance(dates, tuple) and len(dates) == 2:
+        first, last = (str(d) if d is not None else None for d in dates)
+        return lambda date: (first is None or date >= first) and (last is None or date <= last)
+    wanted = _as_set(dates)
+    return lambda date: date in wanted
+
+
+def sessions(animal=None, protocol=None, dates=None) -> Sessions:
+    """Sessions matching the query, oldest first. Each argument may be one value or a list;
+    leaving it out matches everything."""
+    animals = sorted(_as_set(animal)) if animal is not None else None
+    in_dates = _date_filter(dates)
+    found = session_index.lookup_all(animals, protocols=_as_set(protocol))
+    return Sessions(SessionFile(r) for records in found.values() for r in records if in_dates(r["date"]))
+
+
+def clear_cache():
+    _load_trials.cache_clear()
+    _load_session.cache_clear()
+    _cached_summaries.cache_clear()
+    _summarize.cache_clear()
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 16:02:17 2026
+
+@author: JoanaCatarino
+
+Benchmark suite on synthetic data. Generates session files of each protocol at
+several sizes and times the hot paths: CSV load, metric extraction, daily
+figure rendering, across-days aggregation and the two runners end to end.
+Each case gets one extra run under tracemalloc for its peak heap.
+
+Runs fully offline; the data tree is written to a temporary folder and the
+analysis modules are pointed at it through BEHAVIOR_DATA_DIR /
+BEHAVIOR_MAPPING_FILE.
+
+    python benchmark.py --sizes small medium --repeats 3
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import importlib
+import tracemalloc
+import statistics
+import subprocess
+from pathlib import Path
+
+import synthetic_sessions
+
+# Rows per session file
+SIZES = {
+    "small": 500,
+    "medium": 20_000,
+    "large": 1_000_000,
+}
+
+# Daily analysis script of each protocol
+protocol_to_module = {
+    "FreeLick": "analyze_free_licking",
+    "FreePressing": "analyze_free_pressing",
+    "SpoutSamp": "analyze_spout_sampling",
+    "2ChoiceAuditory": "analyze_2choice_auditory",
+    "AdaptSensorimotor": "analyze_adapt_sensorimotor",
+}
+
+# Per-session metric extraction used by the across-days scripts
+protocol_to_metrics = {
+    "FreeLick": ("general_free_licking", "load_lick_counts"),
+    "SpoutSamp": ("general_spout_sampling", "load_trial_counts"),
+    "2ChoiceAuditory": ("overall_plots", "load_trial_counts"),
+}
+
+# Sessions in the across-days aggregation case
+ACROSS_DAYS_SESSIONS = 100
+
+REPO_DIR = Path(__file__).resolve().parent
+RESULTS_FILE = Path("benchmark_results.json")
+
+
+def measure(func, repeats):
+    """Run func repeats times; return (min, median) wall time and the last result."""
+    times = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), statistics.median(times), result
+
+
+def measure_memory(func):
+    """Peak Python heap of one run of func, in MB (kept apart from the timed runs)."""
+    tracemalloc.start()
+    try:
+        func()
+        return round(tracemalloc.get_traced_memory()[1] / 1024 ** 2, 2)
+    finally:
+        tracemalloc.stop()
+
+
+def stage_times(runs) -> tuple[dict, dict]:
+    """({stage: min seconds}, {stage: median seconds}) over the timed runs, each {stage: seconds}."""
+    names = {name for run in runs for name in run}
+    seconds = {name: [run[name] for run in runs if name in run] for name in names}
+    return ({name: min(s) for name, s in seconds.items()},
+            {name: statistics.median(s) for name, s in seconds.items()})
+
+
+def add_case(results, case, base, func, repeats, memory, **extra):
+    best, median, result = measure(func, repeats)
+    row = {"case": case, **base, "min": best, "median": median, **extra}
+    if memory:
+        row["peak_mb"] = measure_memory(func)
+    results.append(row)
+    return result
+
+
+def point_to(root):
+    """Make paths.DATA_DIR / MAPPING_FILE resolve to the synthetic tree, here and in subprocesses."""
+    os.environ["BEHAVIOR_DATA_DIR"] = str(root)
+    os.environ["BEHAVIOR_MAPPING_FILE"] = str(Path(root) / synthetic_sessions.MAPPING_NAME)
+    import paths
+    importlib.reload(paths)
+
+
+def session_cases(root, size_name, n_rows, protocols, repeats, memory=True):
+    import pandas as pd
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import timing
+
+    results = []
+    files = synthetic_sessions.generate_tree(root / size_name, n_animals=1, n_days=1,
+                                             n_rows=n_rows, protocols=protocols)
+    point_to(root / size_name)
+    for path in files:
+        protocol, animal, date, _, box = path.stem.split("_")
+        box = box.replace("box", "")
+        base = {"size": size_name, "rows": n_rows, "protocol": protocol}
+
+        add_case(results, f"load_{protocol}", base, lambda: pd.read_csv(path), repeats, memory)
+
+        if protocol in protocol_to_metrics:
+            module_name, func_name = protocol_to_metrics[protocol]
+            func = getattr(importlib.import_module(module_name), func_name)
+            add_case(results, f"metrics_{protocol}", base, lambda: func(str(path)), repeats, memory)
+
+        # Render the daily figure; the timing stages split it into load/compute/plot/save
+        analyze = importlib.import_module(protocol_to_module[protocol]).analyze
+        output_dir = root / "output" / f"{protocol}_{size_name}"
+        output_dir.mkdir(parents=True, exist_ok=True)
+        runs = []
+
+        def render():
+            with timing.session(f"benchmark_{protocol}", log_path=root / "timing.jsonl") as records:
+                analyze(str(path), animal, date, box, str(output_dir))
+            plt.close("all")
+            runs.append({r["stage"]: r["seconds"] for r in records})
+
+        add_case(results, f"render_{protocol}", base, render, repeats, memory)
+        # Only the timed repeats; the tracemalloc run that follows them is slower
+        stages_min, stages = stage_times(runs[:repeats])
+        results[-1].update(stages=stages, stages_min=stages_min)
+
+        # Without a separate metrics function, the metrics are the compute stage of the daily analysis
+        if protocol not in protocol_to_metrics and "analyze/compute" in stages:
+            results.append({"case": f"metrics_{protocol}", **base,
+                            "min": stages_min["analyze/compute"], "median": stages["analyze/compute"],
+                            "derived_from": f"render_{protocol}"})
+        print(f"⏱️  {protocol} ({size_name}) done")
+    return results
+
+
+def across_days_cases(root, n_sessions, n_rows, repeats, memory=True):
+    """Across-days aggregation and figure of one animal with n_sessions 2ChoiceAuditory sessions."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import timing
+    import general_2choice_auditory
+
+    files = synthetic_sessions.generate_tree(root / "across_days", n_animals=1, n_days=n_sessions,
+                                             n_rows=n_rows, protocols=["2ChoiceAuditory"])
+    point_to(root / "across_days")
+    animal = files[0].stem.split("_")[1]
+    args = argparse.Namespace(animal=animal, files=[str(f) for f in files])
+    runs = []
+
+    def aggregate():
+        with timing.session("benchmark_across_days", log_path=root / "timing.jsonl") as records:
+            general_2choice_auditory.run(args)
+        plt.close("all")
+        runs.append({r["stage"]: r["seconds"] for r in records})
+
+    results = []
+    base = {"size": f"{n_sessions} sessions", "rows": n_rows, "protocol": "2ChoiceAuditory"}
+    add_case(results, "across_days_2ChoiceAuditory", base, aggregate, repeats, memory)
+    stages_min, stages = stage_times(runs[:repeats])
+    results[-1].update(stages=stages, stages_min=stages_min)
+    print(f"⏱️  across-days ({n_sessions} sessions) done")
+    return results
+
+
+def runner_cases(root, n_animals, n_days, n_rows, repeats):
+    """Run the daily and across-days runners on a fresh tree each repeat."""
+    results = []
+    for script in ["run_daily_analysis.py", "run_across_days_analysis.py"]:
+        times = []
+        for i in range(repeats):
+            tree = root / f"runners_{i}"
+            shutil.rmtree(tree, ignore_errors=True)
+            synthetic_sessions.generate_tree(tree, n_animals, n_days, n_rows)
+            point_to(tree)
+            start = time.perf_counter()
+            subprocess.run([sys.executable, script], cwd=REPO_DIR, env=os.environ.copy(),
+                           stdout=subprocess.DEVNULL, check=False)
+            times.append(time.perf_counter() - start)
+        results.append({"case": script.replace(".py", ""), "size": f"{n_animals}x{n_days}",
+                        "rows": n_rows, "protocol": None,
+                        "min": min(times), "median": statistics.median(times)})
+        print(f"⏱️  {script} done")
+    return results
+
+
+def print_table(results):
+    print(f"\n{'case':<34}{'size':>14}{'rows':>10}{'min (s)':>12}{'median (s)':>12}{'heap MB':>10}")
+    for r in results:
+        print(f"{r['case']:<34}{r['size']:>14}{r['rows']:>10}{r['min']:>12.4f}{r['median']:>12.4f}"
+              f"{r.get('peak_mb', '-'):>10}")
+
+
+def run(sizes=("small",), protocols=None, repeats=3, runners=True, animals=3, days=10,
+        output=RESULTS_FILE, keep=False, memory=True) -> list[dict]:
+    protocols = protocols or list(protocol_to_module)
+    root = Path(tempfile.mkdtemp(prefix="behavior_benchmark_"))
+    point_to(root)
+    results = []
+    try:
+        for size_name in sizes:
+            results += session_cases(root, size_name, SIZES[size_name], protocols, repeats, memory)
+        results += across_days_cases(root, ACROSS_DAYS_SESSIONS, SIZES["small"], repeats, memory)
+        if runners:
+            results += runner_cases(root, animals, days, SIZES["small"], repeats)
+    finally:
+        if not keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    print_table(results)
+    Path(output).write_text(json.dumps(results, indent=2))
+    print(f"\n✅ Results saved to: {output}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the analyses on synthetic sessions.")
+    parser.add_argument("--sizes", nargs="+", default=["small"], choices=list(SIZES))
+    parser.add_argument("--protocols", nargs="+", default=None, choices=list(protocol_to_module))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--animals", type=int, default=3, help="Animals in the end-to-end runner tree.")
+    parser.add_argument("--days", type=int, default=10, help="Days per animal in the runner tree.")
+    parser.add_argument("--no-runners", action="store_true", help="Skip the end-to-end runner cases.")
+    parser.add_argument("--output", default=str(RESULTS_FILE))
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic data folder.")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc run of each case.")
+    args = parser.parse_args()
+    run(args.sizes, args.protocols, args.repeats, not args.no_runners, args.animals, args.days,
+        args.output, args.keep, not args.no_memory)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,62 +5,161 @@ Created on Sat Jul  5 18:07:54 2025
 @author: JoanaCatarino
 """
 
-import pandas as pd
-import tkinter as tk
-from tkinter import filedialog
+import argparse
 import os
 import shutil
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import paths
+import archive_old
+
+# Base data directory (used by --batch when no files are given)
+DATA_DIR = paths.DATA_DIR
+
+
+# --- Deduplicate trial_number with custom logic ---
+def resolve_duplicates(df: pd.DataFrame) -> pd.DataFrame:
+    """Keep one row per trial_number, sorted by trial_number.
+
+    Rewarded rows are preferred; otherwise the first row of the trial is kept.
+    One stable sort + drop_duplicates instead of a Python function per group.
+    """
+    df = df[df["trial_number"].notna()]
+    rewarded = (df["reward"] == 1).to_numpy()
+    # lexsort is stable: within a trial, rewarded rows first, then original order
+    order = np.lexsort((~rewarded, df["trial_number"].to_numpy()))
+    df = df.iloc[order]
+    return df[~df["trial_number"].duplicated(keep="first")].reset_index(drop=True)
+
+
+def backup_path_for(file_path, save_dir) -> str:
+    """old/<name>_old.csv, with a counter if that backup already exists (e.g. from concat_files),
+    either in old/ or already packed into old.zip by archive_old."""
+    base_name, ext = os.path.splitext(os.path.basename(file_path))
+    old_dir = os.path.join(save_dir, "old")
+    os.makedirs(old_dir, exist_ok=True)
+    archived = set(archive_old.list_archived(save_dir))
+
+    backup = os.path.join(old_dir, f"{base_name}_old{ext}")
+    n = 2
+    while os.path.exists(backup) or os.path.basename(backup) in archived:
+        backup = os.path.join(old_dir, f"{base_name}_old{n}{ext}")
+        n += 1
+    return backup
+
+
+def clean_file(file_path, save_dir=None) -> int:
+    """Save a backup of the original in save_dir/old and write the cleaned file to save_dir.
+
+    Returns the number of rows removed.
+    """
+    save_dir = save_dir or os.path.dirname(file_path)
+    df_original = pd.read_csv(file_path)
+    df_cleaned = resolve_duplicates(df_original)
+
+    old_backup_path = backup_path_for(file_path, save_dir)
+    final_path = os.path.join(save_dir, os.path.basename(file_path))
+    shutil.copy(file_path, old_backup_path)     # Backup original
+
+    # Write next to the target and swap it in, so a failed write never leaves a truncated file
+    tmp_path = os.path.join(save_dir, f".{os.path.basename(file_path)}.clean_tmp")
+    try:
+        df_cleaned.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, final_path)        # Save cleaned version ✅
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    print(f"✅ Cleaned {os.path.basename(file_path)}: removed {len(df_original) - len(df_cleaned)} rows")
+    print(f"📁 Original file saved as backup in: {old_backup_path}")
+    return len(df_original) - len(df_cleaned)
+
+
+def has_duplicates(file_path) -> bool:
+    try:
+        trials = pd.read_csv(file_path, usecols=["trial_number"])["trial_number"]
+    except ValueError:
+        return False  # no trial_number column
+    return trials.dropna().duplicated().any()
+
+
+def clean_if_duplicated(file_path) -> int:
+    """Worker: clean the file in place only when it has duplicate trial numbers."""
+    try:
+        if not has_duplicates(file_path):
+            return 0
+        return clean_file(file_path)
+    except Exception as e:
+        print(f"❌ Error processing {file_path}: {e}")
+        return 0
+
+
+def find_session_files(base_dir=DATA_DIR) -> list[str]:
+    """Session CSVs directly inside each date folder (old/ backups are not included)."""
+    files = []
+    for animal_dir in Path(base_dir).iterdir():
+        behavior_dir = animal_dir / "Behavior"
+        if not animal_dir.name.isdigit() or not behavior_dir.is_dir():
+            continue
+        for date_dir in behavior_dir.iterdir():
+            if date_dir.is_dir():
+                files.extend(str(f) for f in date_dir.glob("*_*_*_box*.csv"))
+    return files
+
+
+def clean_batch(files, workers=None) -> None:
+    print(f"🔍 Checking {len(files)} files for duplicate trial numbers")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        removed = list(pool.map(clean_if_duplicated, files, chunksize=8))
+    n_cleaned = sum(1 for r in removed if r)
+    print(f"✅ Batch cleaning completed: {n_cleaned} files cleaned, {sum(removed)} rows removed.")
+
+
+def clean_interactive() -> None:
+    import tkinter as tk
+    from tkinter import filedialog
+
+    # --- File and Save Directory Selection ---
+    root = tk.Tk()
+    root.withdraw()
+
+    file_path = filedialog.askopenfilename(
+        title="Select CSV file to clean",
+        filetypes=[("CSV files", "*.csv")]
+    )
+    if not file_path:
+        raise Exception("No file selected.")
+
+    save_dir = filedialog.askdirectory(
+        title="Select folder where modified file should be saved"
+    )
+    if not save_dir:
+        raise Exception("No save folder selected.")
+
+    clean_file(file_path, save_dir)
+    print(f"💾 Cleaned file saved to: {os.path.join(save_dir, os.path.basename(file_path))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remove duplicate trial_number rows from session CSVs.")
+    parser.add_argument("--batch", action="store_true",
+                        help="Headless mode: clean every file with duplicates, in place, with backups in old/.")
+    parser.add_argument("--files", nargs="*", default=None,
+                        help="Files to check in batch mode (default: scan the whole data folder).")
+    parser.add_argument("--root", default=str(DATA_DIR), help="Data folder to scan in batch mode.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes.")
+    args = parser.parse_args()
+
+    if args.batch or args.files:
+        files = args.files or find_session_files(args.root)
+        clean_batch(files, args.workers)
+    else:
+        clean_interactive()
+
 
-# --- Step 1: File and Save Directory Selection ---
-root = tk.Tk()
-root.withdraw()
-
-file_path = filedialog.askopenfilename(
-    title="Select CSV file to clean",
-    filetypes=[("CSV files", "*.csv")]
-)
-if not file_path:
-    raise Exception("No file selected.")
-
-save_dir = filedialog.askdirectory(
-    title="Select folder where modified file should be saved"
-)
-if not save_dir:
-    raise Exception("No save folder selected.")
-
-# --- Step 2: Prepare file paths ---
-file_name = os.path.basename(file_path)
-base_name, ext = os.path.splitext(file_name)
-old_dir = os.path.join(save_dir, "old")
-os.makedirs(old_dir, exist_ok=True)
-
-old_backup_path = os.path.join(old_dir, f"{base_name}_old{ext}")
-final_path = os.path.join(save_dir, file_name)
-
-# --- Step 3: Load original file ---
-df_original = pd.read_csv(file_path)
-
-# --- Step 4: Deduplicate trial_number with custom logic ---
-def resolve_duplicates(group):
-    # Prefer rewarded trials
-    rewarded = group[group["reward"] == 1]
-    if not rewarded.empty:
-        group = rewarded
-
-    # Drop exact duplicates
-    group = group.drop_duplicates()
-
-    # Keep only one (first remaining)
-    return group.iloc[[0]]
-
-cleaned_list = [resolve_duplicates(group) for _, group in df_original.groupby("trial_number")]
-df_cleaned = pd.concat(cleaned_list, ignore_index=True)
-
-# --- Step 5: Save backup and cleaned file ---
-shutil.copy(file_path, old_backup_path)     # Backup original
-df_cleaned.to_csv(final_path, index=False)  # Save cleaned version ✅
-
-# --- Step 6: Optional summary ---
-print("✅ Cleaning completed.")
-print(f"📁 Original file saved as backup in: {old_backup_path}")
-print(f"💾 Cleaned file saved to: {final_path}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 10:41:07 2026
+
+@author: JoanaCatarino
+
+Cohort aggregation across all animals: one tidy session-level table for the
+whole lab and cohort mean ± CI figures per protocol and training day.
+"""
+
+import os
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import paths
+import session_index
+import overall_plots
+import general_free_licking
+import general_spout_sampling
+
+# Base data directory
+DATA_DIR = paths.DATA_DIR
+COHORT_DIR = DATA_DIR / "Cohort"
+SUMMARY_CACHE = COHORT_DIR / "cohort_sessions.csv"
+FIG_FORMATS = ("png", "pdf", "svg")
+DPI = 300
+
+# Metrics shown in the cohort figures, per protocol
+COHORT_METRICS = {
+    '2ChoiceAuditory': ['performance', 'dprime', 'total_trials', 'omissions'],
+    'FreeLick': ['total_licks', 'left_licks', 'right_licks'],
+    'SpoutSamp': ['correct', 'incorrect'],
+}
+
+ID_COLUMNS = ['animal', 'protocol', 'date', 'time', 'box', 'path', 'mtime']
+
+# Small-multiples figure: one panel per animal, drawn from the summary cache only
+SMALL_MULTIPLES_METRICS = ['performance', 'dprime']
+SMALL_MULTIPLES_FORMATS = ("png",)
+
+
+def summarize_2choice(file_path):
+    return overall_plots.load_trial_counts(file_path)
+
+
+def summarize_free_licking(file_path):
+    left, right, total, qw = general_free_licking.load_lick_counts(file_path)
+    return dict(left_licks=left, right_licks=right, total_licks=total, QW=qw)
+
+
+def summarize_spout_sampling(file_path):
+    correct, incorrect, inc_left, inc_right, qw = general_spout_sampling.load_trial_counts(file_path)
+    return dict(correct=correct, incorrect=incorrect,
+                incorrect_left=inc_left, incorrect_right=inc_right, QW=qw)
+
+
+# Map protocol prefix to session summary function
+protocol_to_summary = {
+    '2ChoiceAuditory': summarize_2choice,
+    'FreeLick': summarize_free_licking,
+    'SpoutSamp': summarize_spout_sampling,
+}
+
+
+def find_session_files(animals=None) -> dict:
+    """Return {animal: [file record, ...]} for every session CSV in the data tree.
+
+    Files come from the shared per-animal session index, which never includes old/ backups.
+    """
+    return session_index.lookup_all(animals, protocols=set(protocol_to_summary))
+
+
+def load_animal_sessions(records: list[dict]) -> list[dict]:
+    """Summarize every session of one animal. Runs inside a worker process."""
+    rows = []
+    for record in records:
+        try:
+            summary = protocol_to_summary[record["protocol"]](record["path"])
+        except Exception as e:
+            print(f"⚠️ Skipping file due to error: {record['path']}\n{e}")
+            continue
+        summary.update(record)
+        rows.append(summary)
+    return rows
+
+
+def load_cached_summaries() -> pd.DataFrame:
+    if SUMMARY_CACHE.exists():
+        # round_trip keeps mtime exact, otherwise unchanged files never match the cache
+        return pd.read_csv(SUMMARY_CACHE, dtype={"animal": str, "date": str, "time": str, "box": str},
+                           float_precision="round_trip")
+    return pd.DataFrame(columns=ID_COLUMNS)
+
+
+def build_cohort_table(animals=None, workers=None) -> pd.DataFrame:
+    """Tidy session-level table (animal, protocol, date, box, metrics) for the whole lab.
+
+    Sessions whose file is unchanged since the last run are taken from the cache,
+    the rest are summarized in parallel, one animal per task.
+    """
+    sessions = find_session_files(animals)
+    cached = load_cached_summaries()
+    cached_keys = set(zip(cached["path"], cached["mtime"]))
+
+    pending = {}
+    current_keys = set()
+    for animal, records in sessions.items():
+        current_keys.update((r["path"], r["mtime"]) for r in records)
+        todo = [r for r in records if (r["path"], r["mtime"]) not in cached_keys]
+        if todo:
+            pending[animal] = todo
+    n_pending = sum(len(v) for v in pending.values())
+
+    print(f"🐭 {len(sessions)} animals, {len(current_keys)} sessions ({n_pending} new or changed)")
+
+    new_rows = []
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for rows in pool.map(load_animal_sessions, pending.values()):
+                new_rows.extend(rows)
+
+    # Keep cached rows that still point to an unchanged file. The row of a changed file is
+    # never reused, so a file that no longer summarizes drops out instead of showing old values
+    reused = cached[[key in current_keys for key in zip(cached["path"], cached["mtime"])]]
+    if len(new_rows) < n_pending:
+        print(f"⚠️ {n_pending - len(new_rows)} new or changed sessions could not be summarized "
+              f"and are left out of the cohort table")
+    df = pd.concat([reused, pd.DataFrame(new_rows)], ignore_index=True)
+    if df.empty:
+        return df
+
+    df = df.sort_values(["animal", "protocol", "date", "time"]).reset_index(drop=True)
+    df["training_day"] = df.groupby(["animal", "protocol"])["date"].rank(method="dense").astype(int)
+
+    # Only write back the full lab table, a subset would drop the other animals from the cache
+    if not animals:
+        COHORT_DIR.mkdir(parents=True, exist_ok=True)
+        df.to_csv(SUMMARY_CACHE, index=False)
+    return df
+
+
+def cohort_by_day(df: pd.DataFrame, by=("training_day",), confidence=0.95) -> pd.DataFrame:
+    """Cohort mean ± CI of every metric, computed in a single groupby.
+
+    by are the columns grouped on within each protocol and metric. Returns a long table
+    with one row per (protocol, metric, *by).
+    """
+    by = [c for c in by if c not in ("protocol", "metric")]
+    metrics = sorted({m for ms in COHORT_METRICS.values() for m in ms} & set(df.columns))
+    long = df.melt(id_vars=list(dict.fromkeys(["protocol", "animal"] + by)), value_vars=metrics, var_name="metric")
+    long["value"] = pd.to_numeric(long["value"], errors="coerce")
+    long = long.dropna(subset=["value"])
+    # Drop metrics that do not belong to the protocol (NaN above already removes most)
+    long = long[[m in COHORT_METRICS.get(p, []) for p, m in zip(long["protocol"], long["metric"])]]
+
+    stats = long.groupby(["protocol", "metric"] + by)["value"].agg(["mean", "std", "count"]).reset_index()
+    sem = stats["std"] / np.sqrt(stats["count"])
+    dof = (stats["count"] - 1).clip(lower=1)
+    from scipy.stats import t  # only needed for the confidence intervals
+
+    half_width = sem * t.ppf(0.5 + confidence / 2, dof)
+    stats["ci_low"] = stats["mean"] - half_width
+    stats["ci_high"] = stats["mean"] + half_width
+    return stats
+
+
+def plot_cohort(df: pd.DataFrame, stats: pd.DataFrame) -> None:
+    import matplotlib.pyplot as plt  # only when figures are made
+
+    for protocol, metrics in COHORT_METRICS.items():
+        df_protocol = df[df["protocol"] == protocol]
+        if df_protocol.empty:
+            continue
+        n_animals = df_protocol["animal"].nunique()
+
+        fig, axs = plt.subplots(len(metrics), 1, figsize=(12, 3.5 * len(metrics)), squeeze=False)
+        for ax, metric in zip(axs[:, 0], metrics):
+            # Individual animals in the background
+            for _, animal_df in df_protocol.groupby("animal"):
+                ax.plot(animal_df["training_day"], pd.to_numeric(animal_df[metric], errors="coerce"),
+                        color="gray", alpha=0.3, linewidth=0.8)
+
+            s = stats[(stats["protocol"] == protocol) & (stats["metric"] == metric)]
+            ax.fill_between(s["training_day"], s["ci_low"], s["ci_high"], color="#876EA6", alpha=0.3, linewidth=0)
+            ax.plot(s["training_day"], s["mean"], '-o', color="#876EA6", markersize=4, label="Cohort mean ± 95% CI")
+            ax.set_title(metric)
+            ax.set_xlabel("Training day")
+            ax.spines['top'].set_visible(False)
+            ax.spines['right'].set_visible(False)
+        axs[0, 0].legend(frameon=False)
+
+        fig.suptitle(f"{protocol} — cohort across training days (N={n_animals} animals)", fontsize=12, fontweight='bold')
+        fig.tight_layout(rect=[0, 0, 1, 0.97])
+        for ext in FIG_FORMATS:
+            fig.savefig(COHORT_DIR / f"cohort_{protocol}.{ext}", dpi=DPI)
+        plt.close(fig)
+        print(f"✅ Cohort figure saved for {protocol} ({n_animals} animals)")
+
+
+def plot_small_multiples(df: pd.DataFrame, protocol='2ChoiceAuditory', metrics=SMALL_MULTIPLES_METRICS,
+                         animals=None) -> None:
+    """One figure per metric with a panel per animal: its trajectory over the cohort mean.
+
+    Each panel is a single LineCollection, so 50 animals render in about a second.
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+    from matplotlib.ticker import MaxNLocator
+
+    df = df[df["protocol"] == protocol]
+    if animals:
+        df = df[df["animal"].isin(animals)]
+    if df.empty:
+        print(f"No cached {protocol} sessions to plot.")
+        return
+
+    animal_ids = sorted(df["animal"].unique())
+    n_cols = int(np.ceil(np.sqrt(len(animal_ids))))
+    n_rows = int(np.ceil(len(animal_ids) / n_cols))
+    COHORT_DIR.mkdir(parents=True, exist_ok=True)
+
+    for metric in metrics:
+        values = df[["animal", "training_day"]].assign(value=pd.to_numeric(df[metric], errors="coerce"))
+        values = values.dropna(subset=["value"])
+        mean = values.groupby("training_day")["value"].mean()
+        mean_line = np.column_stack([mean.index, mean.to_numpy()])
+        by_animal = {a: g.sort_values("training_day") for a, g in values.groupby("animal")}
+
+        # Same limits everywhere, set once; shared/autoscaled axes make the grid quadratic to lay out
+        x_lim = (values["training_day"].min() - 0.5, values["training_day"].max() + 0.5)
+        pad = 0.05 * (values["value"].max() - values["value"].min() or 1)
+        y_lim = (values["value"].min() - pad, values["value"].max() + pad)
+        x_ticks = MaxNLocator(4, integer=True).tick_values(*x_lim)
+        y_ticks = MaxNLocator(3).tick_values(*y_lim)
+
+        fig, axs = plt.subplots(n_rows, n_cols, figsize=(2.4 * n_cols, 1.8 * n_rows), squeeze=False)
+        for ax, animal in zip(axs.flat, animal_ids):
+            animal_df = by_animal.get(animal)
+            lines = [mean_line]
+            if animal_df is not None:
+                lines.append(animal_df[["training_day", "value"]].to_numpy())
+            ax.add_collection(LineCollection(lines, colors=["lightgray", "#876EA6"][:len(lines)],
+                                             linewidths=[2, 1.2][:len(lines)]), autolim=False)
+            ax.set_xticks(x_ticks)
+            ax.set_yticks(y_ticks)
+            ax.set_xlim(x_lim)
+            ax.set_ylim(y_lim)
+            # Label inside the panel: titles make every axis re-measure its ticks when drawn
+            ax.text(0.03, 0.97, animal, transform=ax.transAxes, fontsize=8, va="top")
+            ax.tick_params(labelsize=7)
+            ax.label_outer()
+        for i in range(len(animal_ids), n_rows * n_cols):
+            axs.flat[i].set_visible(False)
+            axs.flat[i - n_cols].tick_params(labelbottom=True)  # last panel of this column
+        fig.subplots_adjust(top=0.93, bottom=0.06, left=0.06, right=0.98)
+
+        fig.supxlabel("Training day", fontsize=9)
+        fig.supylabel(metric, fontsize=9)
+        fig.suptitle(f"{protocol} — {metric} per animal (gray: cohort mean, N={len(animal_ids)})",
+                     fontsize=11, fontweight='bold')
+        for ext in SMALL_MULTIPLES_FORMATS:
+            fig.savefig(COHORT_DIR / f"small_multiples_{protocol}_{metric}.{ext}", dpi=150)
+        plt.close(fig)
+        print(f"✅ Small-multiples figure saved for {protocol} {metric} ({len(animal_ids)} animals)")
+
+
+def run(animals=None, workers=None) -> pd.DataFrame:
+    df = build_cohort_table(animals, workers)
+    if df.empty:
+        print("No valid data to plot.")
+        return df
+    stats = cohort_by_day(df)
+    COHORT_DIR.mkdir(parents=True, exist_ok=True)
+    stats.to_csv(COHORT_DIR / "cohort_by_day.csv", index=False)
+    plot_cohort(df, stats)
+    return df
+
+
+def cli():
+    parser = argparse.ArgumentParser(description="Cohort summaries and figures across all animals.")
+    parser.add_argument("--animals", nargs="*", default=None,
+                        help="Animal IDs to include (default: every animal in the data folder).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Number of worker processes.")
+    parser.add_argument("--small-multiples", action="store_true",
+                        help="Only draw the per-animal grid, from the cached session summaries.")
+    parser.add_argument("--metrics", nargs="+", default=SMALL_MULTIPLES_METRICS)
+    args = parser.parse_args()
+
+    if args.small_multiples:
+        cached = load_cached_summaries()
+        if cached.empty:
+            print(f"⚠️ No cached summaries in {SUMMARY_CACHE} — run cohort.py first")
+            return
+        plot_small_multiples(cached, metrics=args.metrics, animals=args.animals)
+        return
+    run(args.animals, args.workers)
+
+
+if __name__ == "__main__":
+    cli()
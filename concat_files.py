@@ -7,76 +7,167 @@ Created on Sat Jul  5 19:02:36 2025
 
 import os
 import re
+import csv
 import shutil
-import pandas as pd
+import argparse
+from collections import defaultdict
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import paths
+from clean_duplicates import backup_path_for
 
 # Base directory path
-base_dir = r"L:\dmclab\Joana\Behavior\Data"
+base_dir = str(paths.DATA_DIR)
+
+# Regex to parse filenames, including the session start time
+filename_regex = re.compile(
+    r'(?P<protocol>[^_]+)_(?P<animal>\d+)_(?P<date>\d{8})_(?P<time>\d{6})_box(?P<box>\w+)\.csv$',
+    re.IGNORECASE
+)
+
+# Column rewritten so that every row refers to the start of the first file
+SESSION_START_COLUMN = "session_start"
+
 
 # Check if folder name is only digits
 def is_digit_folder(name):
     return name.isdigit()
 
-# Extract timestamp from filename
+
+# Extract protocol and timestamp from filename
 def extract_timestamp(filename):
-    match = re.search(r'2ChoiceAuditory_\d+_(\d{8}_\d{6})_box', filename)
+    match = filename_regex.match(filename)
     if match:
-        return datetime.strptime(match.group(1), "%Y%m%d_%H%M%S")
-    return None
+        return match.group("protocol"), datetime.strptime(match.group("date") + match.group("time"), "%Y%m%d%H%M%S")
+    return None, None
 
-# Loop through digit-named folders
-for subject_folder in os.listdir(base_dir):
-    if not is_digit_folder(subject_folder):
-        continue
 
-    behavior_path = os.path.join(base_dir, subject_folder, "Behavior")
-    if not os.path.isdir(behavior_path):
-        continue
+def read_header(path):
+    with open(path, newline="") as f:
+        return next(csv.reader(f), [])
 
-    for date_folder in os.listdir(behavior_path):
-        date_path = os.path.join(behavior_path, date_folder)
-        if not os.path.isdir(date_path):
-            continue
 
-        # Get all 2ChoiceAuditory CSV files
-        files = [f for f in os.listdir(date_path) if f.startswith("2ChoiceAuditory") and f.endswith(".csv")]
+def format_number(value):
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def concat_session_files(paths, out_path):
+    """Stream same-day session files (oldest first) into one file.
+
+    Trial numbers of each file are shifted by the last trial number written so far and
+    session_start is set to the first file's value, so times stay on one session clock.
+    Rows are copied one at a time; no file is loaded whole.
+    """
+    headers = [read_header(p) for p in paths]
+    columns = []
+    for header in headers:
+        columns.extend(c for c in header if c not in columns)
+
+    trial_offset = 0
+    session_start = None
+    with open(out_path, "w", newline="") as out:
+        writer = csv.writer(out)
+        writer.writerow(columns)
+
+        for path, header in zip(paths, headers):
+            position = {c: i for i, c in enumerate(header)}
+            trial_idx = position.get("trial_number")
+            start_idx = position.get(SESSION_START_COLUMN)
+            last_trial = trial_offset
+
+            with open(path, newline="") as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                for row in reader:
+                    if not row:
+                        continue
+                    row = row + [""] * (len(header) - len(row))
 
-        # Extract timestamps and sort
-        files_with_time = [(f, extract_timestamp(f)) for f in files if extract_timestamp(f)]
-        if len(files_with_time) != 2:
-            print(f"⚠️ Skipping {date_path} — found {len(files_with_time)} valid 2ChoiceAuditory files.")
+                    if trial_idx is not None and row[trial_idx] != "":
+                        trial = float(row[trial_idx]) + trial_offset
+                        row[trial_idx] = format_number(trial)
+                        last_trial = max(last_trial, trial)
+
+                    if start_idx is not None and row[start_idx] != "":
+                        if session_start is None:
+                            session_start = row[start_idx]
+                        row[start_idx] = session_start
+
+                    writer.writerow([row[position[c]] if c in position else "" for c in columns])
+
+            trial_offset = last_trial
+
+
+def process_date_folder(date_path, protocols=None):
+    """Concatenate every protocol with more than one file in this date folder."""
+    groups = defaultdict(list)
+    for f in os.listdir(date_path):
+        protocol, timestamp = extract_timestamp(f)
+        if timestamp is None or (protocols and protocol not in protocols):
             continue
+        groups[protocol].append((timestamp, f))
 
-        files_with_time.sort(key=lambda x: x[1])  # oldest first
-        (older_file, _), (newer_file, _) = files_with_time
+    for protocol, files_with_time in groups.items():
+        if len(files_with_time) < 2:
+            continue
 
-        path_old = os.path.join(date_path, older_file)
-        path_new = os.path.join(date_path, newer_file)
+        files_with_time.sort()  # oldest first
+        files = [f for _, f in files_with_time]
+        paths = [os.path.join(date_path, f) for f in files]
+        final_path = paths[0]  # combined file keeps the oldest file's name
+        tmp_path = os.path.join(date_path, f".{files[0]}.concat_tmp")
+        moved = []
 
         try:
-            df_old = pd.read_csv(path_old)
-            df_new = pd.read_csv(path_new)
+            concat_session_files(paths, tmp_path)
 
-            # Update trial numbers in the newer file
-            max_trial_old = df_old["trial_number"].max()
-            df_new["trial_number"] += max_trial_old
+            # Move original files to old/ (same backup names as clean_duplicates, never overwriting one)
+            for path in paths:
+                backup = backup_path_for(path, date_path)
+                shutil.move(path, backup)
+                moved.append((path, backup))
 
-            # Concatenate
-            df_concat = pd.concat([df_old, df_new], ignore_index=True)
+            os.replace(tmp_path, final_path)
+            print(f"✅ Concatenated {len(files)} {protocol} files and saved: {final_path}")
 
-            # Move original files to old/ subfolder
-            old_folder = os.path.join(date_path, "old")
-            os.makedirs(old_folder, exist_ok=True)
+        except Exception as e:
+            # Put back the originals already moved, so the folder is as before
+            for path, backup in reversed(moved):
+                shutil.move(backup, path)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            print(f"❌ Error processing {date_path} ({protocol}): {e}")
+
+
+def find_date_folders(root=base_dir):
+    date_folders = []
+    for subject_folder in os.listdir(root):
+        if not is_digit_folder(subject_folder):
+            continue
+        behavior_path = os.path.join(root, subject_folder, "Behavior")
+        if not os.path.isdir(behavior_path):
+            continue
+        for date_folder in os.listdir(behavior_path):
+            date_path = os.path.join(behavior_path, date_folder)
+            if os.path.isdir(date_path):
+                date_folders.append(date_path)
+    return date_folders
 
-            shutil.move(path_old, os.path.join(old_folder, older_file.replace(".csv", "_old.csv")))
-            shutil.move(path_new, os.path.join(old_folder, newer_file.replace(".csv", "_old.csv")))
 
-            # Save combined file using the older file's name
-            final_path = os.path.join(date_path, older_file)
-            df_concat.to_csv(final_path, index=False)
+def main():
+    parser = argparse.ArgumentParser(description="Concatenate same-day session files, per protocol.")
+    parser.add_argument("--root", default=base_dir, help="Data folder to scan.")
+    parser.add_argument("--protocols", nargs="*", default=None,
+                        help="Protocol prefixes to concatenate (default: all).")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes.")
+    args = parser.parse_args()
 
-            print(f"✅ Concatenated and saved: {final_path}")
+    date_folders = find_date_folders(args.root)
+    print(f"🔍 Scanning {len(date_folders)} date folders")
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        list(pool.map(process_date_folder, date_folders, [args.protocols] * len(date_folders), chunksize=16))
 
-        except Exception as e:
-            print(f"❌ Error processing {date_path}: {e}")
+
+if __name__ == "__main__":
+    main()
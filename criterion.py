@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 11:20:44 2026
+
+@author: JoanaCatarino
+
+Learning-criterion detector for 2ChoiceAuditory. Keeps a running state per
+animal (current streak of sessions above threshold) that is updated once per
+new session, and writes a lab-wide status table.
+"""
+
+import argparse
+from pathlib import Path
+
+import pandas as pd
+
+import cohort
+import paths
+import overall_plots
+
+# ==== USER SETTINGS ==========================================
+DATA_DIR = paths.DATA_DIR
+STATUS_FILE = DATA_DIR / "Cohort" / "criterion_status.csv"
+PROTOCOL = "2ChoiceAuditory"
+NEXT_PROTOCOL = "AdaptSensorimotor"
+PERFORMANCE_THRESHOLD = 70      # % performance, as in overall_plots.load_trial_counts
+CONSECUTIVE_SESSIONS = 3        # sessions in a row at or above threshold
+# =============================================================
+
+STATUS_COLUMNS = [
+    "animal", "sessions", "last_session", "last_performance", "streak",
+    "criterion_met", "criterion_session", "threshold", "n_required"
+]
+
+
+def new_state(animal: str) -> dict:
+    return {
+        "animal": animal,
+        "sessions": 0,
+        "last_session": "",
+        "last_performance": None,
+        "streak": 0,
+        "criterion_met": False,
+        "criterion_session": "",
+        "threshold": PERFORMANCE_THRESHOLD,
+        "n_required": CONSECUTIVE_SESSIONS,
+    }
+
+
+def update_state(state: dict, session: str, performance: float) -> dict:
+    """Advance one animal's state by one session (O(1))."""
+    state["sessions"] += 1
+    state["last_session"] = session
+    state["last_performance"] = performance
+
+    if performance >= state["threshold"]:
+        state["streak"] += 1
+    else:
+        state["streak"] = 0
+
+    # Only the first time the criterion is reached is recorded
+    if not state["criterion_met"] and state["streak"] >= state["n_required"]:
+        state["criterion_met"] = True
+        state["criterion_session"] = session
+    return state
+
+
+def load_status() -> dict:
+    """Return {animal: state} from the status table, dropping states saved with other criterion settings."""
+    if not STATUS_FILE.exists():
+        return {}
+    df = pd.read_csv(STATUS_FILE, dtype={"animal": str, "last_session": str, "criterion_session": str},
+                     keep_default_na=False)
+    states = {}
+    for row in df.to_dict("records"):
+        if float(row["threshold"]) != PERFORMANCE_THRESHOLD or int(row["n_required"]) != CONSECUTIVE_SESSIONS:
+            continue
+        row["last_performance"] = float(row["last_performance"]) if row["last_performance"] != "" else None
+        row["sessions"] = int(row["sessions"])
+        row["streak"] = int(row["streak"])
+        row["criterion_met"] = str(row["criterion_met"]) == "True"
+        row["threshold"] = float(row["threshold"])
+        row["n_required"] = int(row["n_required"])
+        states[row["animal"]] = row
+    return states
+
+
+def save_status(states: dict) -> pd.DataFrame:
+    df = pd.DataFrame(list(states.values()), columns=STATUS_COLUMNS).sort_values("animal")
+    df["ready_for_" + NEXT_PROTOCOL] = df["criterion_met"]
+    STATUS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(STATUS_FILE, index=False)
+    return df
+
+
+def update_status(animals=None) -> list[str]:
+    """Feed every session not yet seen into the per-animal state and save the status table.
+
+    Returns the animals that reached criterion during this update.
+    """
+    states = load_status()
+    newly_met = []
+
+    for animal, records in cohort.find_session_files(animals).items():
+        records = sorted((r for r in records if r["protocol"] == PROTOCOL),
+                         key=lambda r: (r["date"], r["time"]))
+        if not records:
+            continue
+
+        state = states.get(animal) or new_state(animal)
+        was_met = state["criterion_met"]
+        sessions = [f"{r['date']}_{r['time']}" for r in records]
+        # A different number of already-seen sessions means history changed (e.g. a late transfer)
+        if state["sessions"] != sum(s <= state["last_session"] for s in sessions):
+            print(f"↩️  Session history changed for animal {animal} — recomputing criterion")
+            state = new_state(animal)
+
+        for record, session in zip(records, sessions):
+            if session <= state["last_session"]:
+                continue
+            try:
+                performance = overall_plots.load_trial_counts(record["path"])["performance"]
+            except Exception as e:
+                # Stop before this session, so it is read again on the next update (once fixed or
+                # re-transferred) instead of being skipped for good with a wrong streak
+                print(f"⚠️ Could not read {record['path']}, criterion for animal {animal} "
+                      f"stays at session {state['last_session'] or '-'}\n{e}")
+                break
+            update_state(state, session, performance)
+
+        states[animal] = state
+        if state["criterion_met"] and not was_met:
+            newly_met.append(animal)
+
+    if not states:
+        print(f"No {PROTOCOL} sessions found.")
+        return newly_met
+
+    status = save_status(states)
+    for animal in newly_met:
+        session = states[animal]["criterion_session"]
+        print(f"🎓 Animal {animal} reached criterion on session {session} — ready for {NEXT_PROTOCOL}")
+
+    ready = status.loc[status["criterion_met"].astype(bool), "animal"].tolist()
+    if ready:
+        print(f"📋 Animals at criterion on {PROTOCOL}: {', '.join(ready)}")
+    return newly_met
+
+
+def main():
+    parser = argparse.ArgumentParser(description=f"Learning criterion status for {PROTOCOL}.")
+    parser.add_argument("--animals", nargs="*", default=None,
+                        help="Animal IDs to update (default: every animal in the data folder).")
+    args = parser.parse_args()
+    update_status(args.animals)
+
+
+if __name__ == "__main__":
+    main()
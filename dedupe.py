@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 15:21:09 2026
+
+@author: JoanaCatarino
+
+Finds session files that are byte-identical copies of another session (a box
+re-uploading, or a file copied twice on the way in) and records them in
+Index/duplicates.json. session_index.lookup and the across-days loaders skip
+the copies, so each session is only read and counted once.
+
+Only files whose size matches another file are hashed, in parallel, and
+hashes are kept between runs for files that did not change. Of each group
+of identical files the oldest one is the canonical session.
+
+    python dedupe.py              # scan the data tree and update the index
+    python dedupe.py --list       # also print every duplicate found
+"""
+
+import os
+import json
+import argparse
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import session_index
+from transfer_files import sha256_of
+
+DUPLICATES_FILE = session_index.DUPLICATES_FILE
+WORKERS = 8   # hashing is disk-bound and hashlib releases the GIL, so threads are enough
+
+
+def load_scan() -> dict:
+    try:
+        with open(DUPLICATES_FILE) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {"hashes": {}, "duplicates": {}}
+
+
+def save_scan(scan):
+    DUPLICATES_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = DUPLICATES_FILE.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(scan, f)
+    os.replace(tmp, DUPLICATES_FILE)
+
+
+def hash_records(records, known, workers=WORKERS) -> dict:
+    """{path: sha256}, reusing the hashes of files whose size and mtime did not change."""
+    hashes, todo = {}, []
+    for r in records:
+        entry = known.get(r["path"])
+        if entry and entry["size"] == r["size"] and entry["mtime"] == r["mtime"]:
+            hashes[r["path"]] = entry["sha256"]
+        else:
+            todo.append(r["path"])
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        hashes.update(zip(todo, pool.map(sha256_of, todo)))
+    return hashes
+
+
+def find_duplicates(workers=WORKERS) -> dict:
+    """Scan every session file of the data tree and save {duplicate: canonical} to the index."""
+    records = [{**r, "path": os.path.normpath(r["path"])}
+               for animal_records in session_index.lookup_all(unique=False).values()
+               for r in animal_records]
+
+    # Files of a unique size cannot have a copy
+    by_size = defaultdict(list)
+    for r in records:
+        by_size[r["size"]].append(r)
+    candidates = [r for group in by_size.values() if len(group) > 1 for r in group]
+
+    scan = load_scan()
+    hashes = hash_records(candidates, scan["hashes"], workers)
+
+    by_hash = defaultdict(list)
+    for r in candidates:
+        by_hash[hashes[r["path"]]].append(r)
+
+    duplicates = {}
+    for group in by_hash.values():
+        if len(group) < 2:
+            continue
+        canonical, *copies = sorted(group, key=lambda r: (r["mtime"], r["path"]))
+        for r in copies:
+            duplicates[r["path"]] = {"canonical": canonical["path"], "size": r["size"], "mtime": r["mtime"]}
+
+    save_scan({
+        "hashes": {r["path"]: {"sha256": hashes[r["path"]], "size": r["size"], "mtime": r["mtime"]}
+                   for r in candidates},
+        "duplicates": duplicates,
+    })
+    print(f"🔍 {len(records)} session files, {len(candidates)} hashed (same size as another file)")
+    print(f"✅ {len(duplicates)} duplicate copies recorded in {DUPLICATES_FILE}")
+    return duplicates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record byte-identical copies of session files in the index.")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--list", action="store_true", help="Print each duplicate and its canonical file.")
+    args = parser.parse_args()
+    duplicates = find_duplicates(args.workers)
+    if args.list:
+        for path, entry in sorted(duplicates.items()):
+            print(f"  ⏭️ {path}\n     = {entry['canonical']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 24 10:31:26 2026
+
+@author: JoanaCatarino
+
+Min/max downsampling of long line and step series before they are drawn.
+Above MAX_POINTS the series is split into MAX_POINTS / 2 equal buckets and
+only the lowest and highest point of each bucket are kept (in their original
+order), plus the first and last points. Buckets are narrower than a pixel of
+the saved figures, so every peak and dip is still drawn and the figure looks
+the same, while render time and PDF/SVG size stay bounded for very long
+sessions. Shorter series are drawn untouched.
+
+    downsample.plot(ax, trial_number, latency, color='gray')
+    downsample.step(ax, trial_numbers, HR, where='post')
+"""
+
+import numpy as np
+
+# Points above which a series is downsampled (2 per bucket)
+MAX_POINTS = 8000
+
+
+def reduce(x, y, max_points=MAX_POINTS):
+    """(x, y) with at most max_points points, keeping the min and max of each bucket."""
+    x, y = np.asarray(x), np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= max_points:
+        return x, y
+
+    n_buckets = max_points // 2
+    size = -(-n // n_buckets)   # ceil
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n] = y
+    buckets = padded.reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+
+    # NaNs never win a bucket unless the bucket is all NaN
+    low = np.where(np.isnan(buckets), np.inf, buckets).argmin(axis=1) + offsets
+    high = np.where(np.isnan(buckets), -np.inf, buckets).argmax(axis=1) + offsets
+    keep = np.unique(np.concatenate([[0, n - 1], low, high]))
+    keep = keep[keep < n]
+    return x[keep], y[keep]
+
+
+def plot(ax, x, y, *args, max_points=MAX_POINTS, **kwargs):
+    """ax.plot of the downsampled series."""
+    return ax.plot(*reduce(x, y, max_points), *args, **kwargs)
+
+
+def step(ax, x, y, *args, max_points=MAX_POINTS, **kwargs):
+    """ax.step of the downsampled series."""
+    return ax.step(*reduce(x, y, max_points), *args, **kwargs)
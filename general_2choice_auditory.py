@@ -6,12 +6,24 @@ Created on Mon Jun 30 10:21:24 2025
 """
 
 import argparse
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.patches import Patch
 from pathlib import Path
 import re
-from scipy.stats import norm
+
+import metrics
+import paths
+import session_data
+import timing
+
+# Trials in the rolling % correct of the session × trial heatmap
+ROLLING_WINDOW = 20
+# The heatmap has a fixed size whatever the number of sessions, and is only saved as PNG.
+# It is drawn on every run (also --summary-only) unless --no-heatmap is given
+HEATMAP_SIZE = (16, 8)
+HEATMAP_DPI = 100
+# Heatmap colour of each outcome code (session_data.OUTCOMES order, code 0 = no outcome)
+heatmap_colors = ["#F5F5F5", "black", "gray", "green", "limegreen", "red", "darkred"]
 
 # Regex to extract date and box from filename
 filename_regex = re.compile(
@@ -27,62 +39,53 @@ def extract_metadata(file_path):
 
 
 def load_tone_mapping(animal_id):
-    mapping_file_path = Path(r"L:/dmclab/Joana/Behavior/Spout-tone map/spout_tone_generator.csv")
+    mapping_file_path = paths.MAPPING_FILE
     spout_mapping_df = pd.read_csv(mapping_file_path)
     row = spout_mapping_df[spout_mapping_df["Animal"] == int(animal_id)].iloc[0]
     pair_8khz = f"8KHz → {row['8KHz']} spout"
     pair_16khz = f"16KHz → {row['16KHz']} spout"
     return f"Tone-spout mapping: {pair_8khz}, {pair_16khz}"
 
+def latency_stats(latency):
+    """Mean and std of the lick latencies (None without licks, std NaN with one)."""
+    latency = latency[~np.isnan(latency)]
+    if not len(latency):
+        return None, None
+    return latency.mean(), latency.std(ddof=1) if len(latency) > 1 else np.nan
+
+
 def load_trial_counts(file_path):
-    
-    df = pd.read_csv(file_path).fillna(0)
-    
-    # Compute lick latency
-    df["tone_time"] = df["trial_start"] + 1.2
-    df["lick_latency"] = df["lick_time"] - df["tone_time"]
-
-    valid_licks = df[df["lick_latency"].notna()]
-    left_licks = valid_licks[valid_licks["left_spout"] == 1]
-    right_licks = valid_licks[valid_licks["right_spout"] == 1]
-
-    total_trials = len(df)
-    correct_left = df[(df["left_spout"] == 1) & (df["reward"] == 1)].shape[0]
-    correct_right = df[(df["right_spout"] == 1) & (df["reward"] == 1)].shape[0]
-    incorrect_left = df[(df["left_spout"] == 1) & (df["punishment"] == 1)].shape[0]
-    incorrect_right = df[(df["right_spout"] == 1) & (df["punishment"] == 1)].shape[0]
-    early = df[df["early_lick"] == 1].shape[0] if "early_lick" in df.columns else 0
-    omission_8khz = df[(df["omission"] == 1) & (df["8KHz"] == 1)].shape[0]
-    omission_16khz = df[(df["omission"] == 1) & (df["16KHz"] == 1)].shape[0]
-    dprime = df["d_prime"].iloc[0] if "d_prime" in df.columns else None
-    hit_rate = df["hit_rate"].iloc[0] if "hit_rate" in df.columns else None
-    false_alarm = df["false_alarm"].iloc[0] if "false_alarm" in df.columns else None
-    latency_left = left_licks["lick_latency"].mean() if not left_licks.empty else None
-    latency_right = right_licks["lick_latency"].mean() if not right_licks.empty else None
-    latency_left_std = left_licks["lick_latency"].std() if not left_licks.empty else None
-    latency_right_std = right_licks["lick_latency"].std() if not right_licks.empty else None
-    
+    """Session summary; file_path may also be a session_data.Session already loaded."""
+    session = session_data.as_session(file_path)
+    left, right = session.left, session.right
+    reward, punishment = session.reward, session.punishment
+
+    total_trials = len(session)
+    correct_left = (left & reward).sum()
+    correct_right = (right & reward).sum()
+    incorrect_left = (left & punishment).sum()
+    incorrect_right = (right & punishment).sum()
+    early = session.early_lick.sum()
+    omission_8khz = (session.omission & session.low_tone).sum()
+    omission_16khz = (session.omission & session.high_tone).sum()
+    latency_left, latency_left_std = latency_stats(session.lick_latency[left])
+    latency_right, latency_right_std = latency_stats(session.lick_latency[right])
 
     # Compute hit rate, false alarm, d'
     correct = correct_left + correct_right
     incorrect = incorrect_left + incorrect_right
-    total = len(df)
+    total = total_trials
     
     hr = (correct + 0.5) / (total + 1)
     fa = (incorrect + 0.5) / (total + 1)
     hr = min(max(hr, 0.01), 0.99)
     fa = min(max(fa, 0.01), 0.99)
-    dprime = norm.ppf(hr) - norm.ppf(fa)
-
+    dprime = metrics.d_prime(hr, fa)
 
-    if "QW" in df.columns and not df["QW"].isna().all():
-        qw_value = df["QW"].mode()[0]
-    else:
-        qw_value = "NA"
 
-    autom_reward_dominant = False
-    if "autom_reward" in df.columns:
-        autom_reward_dominant = (df["autom_reward"] == 1).sum() > len(df) / 2
+    # The frame used to be filled with 0 first, so trials without a QW count as QW 0
+    qw_value = session.qw_most_common(missing=0)
+    autom_reward_dominant = session.autom_reward.sum() > total_trials / 2
 
     return dict(
         correct_left=correct_left,
@@ -104,29 +107,134 @@ def load_trial_counts(file_path):
         autom_reward=autom_reward_dominant
     )
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--animal", required=True)
-    parser.add_argument("--files", nargs="+", required=True)
-    args = parser.parse_args()
-
+def load_summary(files):
+    """One row per session, sorted by date."""
     summary = []
-
-    for file_path in args.files:
+    for file_path in files:
         try:
             date, box = extract_metadata(file_path)
-            trial_data = load_trial_counts(file_path)
-            trial_data.update({"date": date, "box": box})
+            session = session_data.load(file_path)
+            trial_data = load_trial_counts(session)
+            trial_data.update({"date": date, "box": box, "outcome": session.outcome})
             summary.append(trial_data)
         except Exception as e:
             print(f"⚠️ Skipping file due to error: {file_path}\n{e}")
 
+    summary.sort(key=lambda x: x["date"])
+    return summary
+
+
+def output_dir(animal):
+    return paths.DATA_DIR / animal / "Analysis" / "Across-days"
+
+
+def save_summary(animal, summary):
+    base_dir = output_dir(animal)
+    base_dir.mkdir(parents=True, exist_ok=True)
+    csv_path = base_dir / f"{animal}_2ChoiceAuditory_across_days.csv"
+    pd.DataFrame([{k: v for k, v in s.items() if k != "outcome"} for s in summary]).to_csv(csv_path, index=False)
+    return csv_path
+
+
+def outcome_matrix(outcomes):
+    """Stack per-session outcome code arrays into one (sessions, longest session) matrix.
+
+    Returns the matrix and a mask of the real trials (False where a shorter session is padded).
+    """
+    lengths = np.array([len(o) for o in outcomes])
+    valid = np.arange(lengths.max(initial=0)) < lengths[:, None]
+    matrix = np.zeros(valid.shape, dtype=np.uint8)
+    matrix[valid] = np.concatenate(outcomes) if len(outcomes) else []
+    return matrix, valid
+
+
+def rolling_correct(matrix, valid, window=ROLLING_WINDOW):
+    """Fraction of correct trials over the last `window` trials of each session (NaN in the padding)."""
+    correct = np.isin(matrix, session_data.CORRECT) & valid
+    total = np.cumsum(correct, axis=1, dtype=float)
+    total[:, window:] = total[:, window:] - total[:, :-window]
+    trials = np.minimum(np.arange(1, matrix.shape[1] + 1), window)
+    return np.where(valid, total / trials, np.nan)
+
+
+def plot_trial_heatmap(animal, summary, window=ROLLING_WINDOW):
+    """Sessions × trials figure: outcome codes and rolling % correct, one imshow each."""
+    import matplotlib.pyplot as plt
+    from matplotlib.colors import ListedColormap
+    from matplotlib.patches import Patch
+
+    matrix, valid = outcome_matrix([s["outcome"] for s in summary])
+    correct = rolling_correct(matrix, valid, window)
+    # At most ~20 day labels, so they stay readable with many sessions
+    every = max(1, len(summary) // 20)
+    days = range(0, len(summary), every)
+    extent = (0.5, matrix.shape[1] + 0.5, len(summary) - 0.5, -0.5)
+
+    fig, axs = plt.subplots(2, 1, figsize=HEATMAP_SIZE)
+    cmap = ListedColormap(heatmap_colors)
+    cmap.set_bad("white")
+    axs[0].imshow(np.ma.masked_array(matrix, ~valid), cmap=cmap, vmin=-0.5, vmax=len(heatmap_colors) - 0.5,
+                  aspect='auto', interpolation='nearest', extent=extent)
+    axs[0].set_title("Trial outcomes")
+    axs[0].legend(handles=[Patch(facecolor=c, label=name)
+                           for name, c in zip(session_data.OUTCOMES[1:], heatmap_colors[1:])],
+                  loc='upper left', bbox_to_anchor=(1.01, 1), frameon=False, fontsize=8)
+
+    image = axs[1].imshow(correct, cmap='viridis', vmin=0, vmax=1,
+                          aspect='auto', interpolation='nearest', extent=extent)
+    axs[1].set_title(f"Rolling % correct (last {window} trials)")
+    fig.colorbar(image, ax=axs[1], fraction=0.02, pad=0.01, label="Fraction correct")
+
+    for ax in axs:
+        ax.set_yticks(days)
+        ax.set_yticklabels([f"Day {i+1}" for i in days], fontsize=8)
+        ax.set_xlabel("Trial")
+    fig.suptitle(f"Animal {animal} — 2-Choice Auditory trials across days", fontsize=12, fontweight='bold')
+    fig.tight_layout()
+    return fig
+
+
+def save_heatmap(animal, summary):
+    import matplotlib.pyplot as plt
+    heatmap = plot_trial_heatmap(animal, summary)
+    base_dir = output_dir(animal)
+    base_dir.mkdir(parents=True, exist_ok=True)
+    heatmap_path = base_dir / f"{animal}_2ChoiceAuditory_trial_heatmap.png"
+    heatmap.savefig(heatmap_path, dpi=HEATMAP_DPI)
+    plt.close(heatmap)
+    print(f"✅ Trial heatmap saved to: {heatmap_path}")
+    return heatmap_path
+
+
+def write_summary(animal, files):
+    """Write the across-days table without making the figure. Returns the CSV path."""
+    summary = load_summary(files)
+    if not summary:
+        print("No valid data to summarize.")
+        return None
+    csv_path = save_summary(animal, summary)
+    print(f"✅ Summary saved to: {csv_path}")
+    return csv_path
+
+
+@timing.timed("across_days")
+def run(args):
+    timing.mark("load")
+    summary = load_summary(args.files)
+
     if not summary:
         print("No valid data to plot.")
         return
 
-    # Sort by date
-    summary.sort(key=lambda x: x["date"])
+    if getattr(args, "summary_only", False):
+        timing.mark("save")
+        if getattr(args, "heatmap", True):
+            save_heatmap(args.animal, summary)
+        csv_path = save_summary(args.animal, summary)
+        print(f"✅ Summary saved to: {csv_path}")
+        return
+
+    timing.mark("compute")
 
     df = pd.DataFrame(summary)
     x = range(len(df))
@@ -153,6 +261,11 @@ def main():
 
     tone_mapping_str = load_tone_mapping(args.animal)
 
+    timing.mark("plot")
+    # Plotting libraries are only imported when a figure is made
+    import matplotlib.pyplot as plt
+    from matplotlib.patches import Patch
+
     fig, axs = plt.subplots(5, 1, figsize=(16, 20))
 
     # Add background (Autom_reward overrides QW)
@@ -233,14 +346,30 @@ def main():
     plt.suptitle(f"Animal {args.animal} — 2-Choice Auditory data across days", fontsize=12, fontweight='bold')
     plt.figtext(0.5, 0.95, tone_mapping_str, ha='center', fontsize=10)
 
-    base_dir = Path(r"L:/dmclab/Joana/Behavior/Data") / args.animal / "Analysis" / "Across-days"
+    timing.mark("save")
+    base_dir = output_dir(args.animal)
     base_dir.mkdir(parents=True, exist_ok=True)
     fig_filename = base_dir / f"{args.animal}_2ChoiceAuditory_across_days"
     for ext in ["png", "pdf", "svg"]:
         fig.savefig(fig_filename.with_suffix(f".{ext}"), dpi=500)
 
-    df.to_csv(base_dir / f"{args.animal}_2ChoiceAuditory_across_days.csv", index=False)
+    if getattr(args, "heatmap", True):
+        save_heatmap(args.animal, summary)
+
+    save_summary(args.animal, summary)
     print(f"✅ Analysis complete and saved for animal {args.animal}")
 
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--animal", required=True)
+    parser.add_argument("--files", nargs="+", required=True)
+    parser.add_argument("--summary-only", action="store_true",
+                        help="Only write the across-days CSV, without the figure.")
+    parser.add_argument("--no-heatmap", dest="heatmap", action="store_false",
+                        help="Skip the session × trial outcome heatmap (PNG).")
+    args = parser.parse_args()
+    with timing.session(f"{args.animal}_2ChoiceAuditory_across_days", animal=args.animal, n_files=len(args.files)):
+        run(args)
+
 if __name__ == "__main__":
     main()
@@ -6,12 +6,19 @@ Created on Thu Jun 26 11:11:33 2025
 """
 
 import argparse
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.patches import Patch
 from pathlib import Path
 import re
 
+import lick_rate
+import paths
+import session_data
+import timing
+
+# Bin width (s) of the within-session lick rates stored for the across-days overlay
+RATE_BIN_SECONDS = 60
+
 # Regex to extract date and box from filename
 filename_regex = re.compile(
     r'(?P<protocol>[^_]+)_(?P<animal>\d+)_(?P<date>\d{8})_\d+_box(?P<box>\w+)',
@@ -25,49 +32,94 @@ def extract_metadata(file_path):
     return match.group("date"), match.group("box")
 
 def load_lick_counts(file_path):
-    df = pd.read_csv(file_path)
-    left_licks = df['left_spout'].sum()
-    right_licks = df['right_spout'].sum()
-    total_licks = df['lick'].sum()
-    
-    # Get most frequent QW value
-    if 'QW' in df.columns and not df['QW'].isna().all():
-        qw_value = df['QW'].mode()[0]
-    else:
-        qw_value = 'NA'
+    """file_path may also be a session_data.Session already loaded."""
+    session = session_data.as_session(file_path)
+    left_licks = session.left.sum()
+    right_licks = session.right.sum()
+    total_licks = session.lick.sum()
     
+    # Most frequent QW value
+    qw_value = session.qw_mode
     
     return left_licks, right_licks, total_licks, qw_value
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--animal", required=True)
-    parser.add_argument("--files", nargs="+", required=True)
-    args = parser.parse_args()
-
+def load_summary(files):
+    """One row per session, sorted by date."""
     summary = []
-
-    for file_path in args.files:
+    for file_path in files:
         try:
             date, box = extract_metadata(file_path)
-            left, right, total, qw = load_lick_counts(file_path)
+            session = session_data.load(file_path)
+            left, right, total, qw = load_lick_counts(session)
             summary.append({
                 "date": date,
                 "box": box,
                 "left_licks": left,
                 "right_licks": right,
                 "total_licks": total,
-                "QW": qw
+                "QW": qw,
+                "lick_rate": lick_rate.bin_licks(session, [RATE_BIN_SECONDS])[RATE_BIN_SECONDS]
             })
         except Exception as e:
             print(f"⚠️ Skipping file due to error: {file_path}\n{e}")
 
+    summary.sort(key=lambda x: x["date"])
+    return summary
+
+
+def output_dir(animal):
+    return paths.DATA_DIR / animal / "Analysis" / "Across-days"
+
+
+def rates_path(animal):
+    return output_dir(animal) / f"{animal}_FreeLick_lick_rate.npz"
+
+
+def save_summary(animal, summary):
+    """Across-days CSV plus the per-day binned lick rates (.npz, one row per day)."""
+    base_dir = output_dir(animal)
+    base_dir.mkdir(parents=True, exist_ok=True)
+    csv_path = base_dir / f"{animal}_FreeLick_across_days.csv"
+    pd.DataFrame([{k: v for k, v in s.items() if k != "lick_rate"} for s in summary]).to_csv(csv_path, index=False)
+    np.savez_compressed(rates_path(animal),
+                        dates=[s["date"] for s in summary], boxes=[s["box"] for s in summary],
+                        bin_seconds=RATE_BIN_SECONDS, counts=lick_rate.stack([s["lick_rate"] for s in summary]))
+    return csv_path
+
+
+def load_rates(animal) -> dict:
+    """Stored lick rates: dates, boxes, bin_seconds and counts (days × SPOUTS × bins, NaN padded)."""
+    with np.load(rates_path(animal)) as f:
+        return {name: f[name] for name in f.files}
+
+
+def write_summary(animal, files):
+    """Write the across-days table without making the figure. Returns the CSV path."""
+    summary = load_summary(files)
+    if not summary:
+        print("No valid data to summarize.")
+        return None
+    csv_path = save_summary(animal, summary)
+    print(f"✅ Data exported to: {csv_path}")
+    return csv_path
+
+
+@timing.timed("across_days")
+def run(args):
+    timing.mark("load")
+    summary = load_summary(args.files)
+
     if not summary:
         print("No valid data to plot.")
         return
 
-    # Sort by date
-    summary.sort(key=lambda x: x["date"])
+    if getattr(args, "summary_only", False):
+        timing.mark("save")
+        csv_path = save_summary(args.animal, summary)
+        print(f"✅ Data exported to: {csv_path}")
+        return
+
+    timing.mark("compute")
 
     # Extract data
     dates = [s["date"] for s in summary]
@@ -78,6 +130,9 @@ def main():
     day_labels = [f"Day {i+1}" for i in range(len(dates))]
     qws = [s["QW"] for s in summary]
     x = range(len(dates))
+    rates = lick_rate.stack([s["lick_rate"] for s in summary])
+    rate_minutes = lick_rate.edges_minutes(rates.shape[2], RATE_BIN_SECONDS)[:-1]
+    total_rates = lick_rate.per_minute(rates[:, lick_rate.TOTAL], RATE_BIN_SECONDS)
 
     # Define color map for QWs
     qw_colors = {
@@ -90,7 +145,12 @@ def main():
         
     
     # Create figure with two subplots
-    fig, axs = plt.subplots(2, 1, figsize=(10, 12))
+    timing.mark("plot")
+    # Plotting libraries are only imported when a figure is made
+    import matplotlib.pyplot as plt
+    from matplotlib.patches import Patch
+
+    fig, axs = plt.subplots(3, 1, figsize=(10, 18))
     
     # Add QW background shading
     for i, qw in enumerate(qws):
@@ -149,12 +209,23 @@ def main():
     )
     axs[1].legend(frameon=False)
 
+    # Plot 3: Lick rate within each session, one line per day (all days in one call)
+    axs[2].set_prop_cycle(color=plt.cm.viridis(np.linspace(0, 0.9, len(dates))))
+    axs[2].plot(rate_minutes, total_rates.T, drawstyle='steps-post')
+    axs[2].set_xlabel("Time (min)")
+    axs[2].set_ylabel(f"Licks / min ({RATE_BIN_SECONDS} s bins)")
+    axs[2].set_title("Lick rate within sessions across days", pad=20)
+    axs[2].spines['top'].set_visible(False)
+    axs[2].spines['right'].set_visible(False)
+    axs[2].legend(day_labels, frameon=False, fontsize=8, ncol=2)
+
     
     plt.subplots_adjust(hspace=0.5) 
     fig.suptitle(f"Animal {args.animal} — Free Licking data across days", fontsize=12, fontweight='bold', y=0.95)
 
     # Save figure
-    base_dir = Path(r"L:/dmclab/Joana/Behavior/Data") / args.animal / "Analysis" / "Across-days"
+    timing.mark("save")
+    base_dir = output_dir(args.animal)
     base_dir.mkdir(parents=True, exist_ok=True)
 
     fig_filename = base_dir / f"{args.animal}_FreeLick_across_days"
@@ -164,11 +235,19 @@ def main():
     print(f"✅ Plot saved to: {fig_filename.with_suffix('.png')}, .pdf, .svg")
         
     # Export summary data to CSV
-    summary_df = pd.DataFrame(summary)
-    csv_filename = base_dir / f"{args.animal}_FreeLick_across_days.csv"
-    summary_df.to_csv(csv_filename, index=False)
+    csv_filename = save_summary(args.animal, summary)
     print(f"✅ Data exported to: {csv_filename}")
 
 
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--animal", required=True)
+    parser.add_argument("--files", nargs="+", required=True)
+    parser.add_argument("--summary-only", action="store_true",
+                        help="Only write the across-days CSV, without the figure.")
+    args = parser.parse_args()
+    with timing.session(f"{args.animal}_FreeLick_across_days", animal=args.animal, n_files=len(args.files)):
+        run(args)
+
 if __name__ == "__main__":
     main()
@@ -6,11 +6,13 @@ Created on Fri Jun 27 09:21:21 2025
 """
 import argparse
 import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.patches import Patch
 from pathlib import Path
 import re
 
+import paths
+import session_data
+import timing
+
 # Regex to extract date and box from filename
 filename_regex = re.compile(
     r'(?P<protocol>[^_]+)_(?P<animal>\d+)_(?P<date>\d{8})_\d+_box(?P<box>\w+)',
@@ -24,29 +26,24 @@ def extract_metadata(file_path):
     return match.group("date"), match.group("box")
 
 def load_trial_counts(file_path):
-    df = pd.read_csv(file_path)
+    """file_path may also be a session_data.Session already loaded."""
+    session = session_data.as_session(file_path)
+    # Unrewarded means reward == 0: rows with an empty reward are neither correct nor incorrect
+    unrewarded = session.unrewarded
 
-    correct = df[(df["lick"] == 1) & (df["reward"] == 1)].shape[0]
-    incorrect = df[(df["lick"] == 1) & (df["reward"] == 0)].shape[0]
-    incorrect_left = df[(df["left_spout"] == 1) & (df["reward"] == 0)].shape[0]
-    incorrect_right = df[(df["right_spout"] == 1) & (df["reward"] == 0)].shape[0]
+    correct = (session.lick & session.reward).sum()
+    incorrect = (session.lick & unrewarded).sum()
+    incorrect_left = (session.left & unrewarded).sum()
+    incorrect_right = (session.right & unrewarded).sum()
 
-    if 'QW' in df.columns and not df['QW'].isna().all():
-        qw_value = df['QW'].mode()[0]
-    else:
-        qw_value = 'NA'
+    qw_value = session.qw_mode
 
     return correct, incorrect, incorrect_left, incorrect_right, qw_value
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--animal", required=True)
-    parser.add_argument("--files", nargs="+", required=True)
-    args = parser.parse_args()
-
+def load_summary(files):
+    """One row per session, sorted by date."""
     summary = []
-
-    for file_path in args.files:
+    for file_path in files:
         try:
             date, box = extract_metadata(file_path)
             correct, incorrect, inc_left, inc_right, qw = load_trial_counts(file_path)
@@ -62,12 +59,49 @@ def main():
         except Exception as e:
             print(f"⚠️ Skipping file due to error: {file_path}\n{e}")
 
+    summary.sort(key=lambda x: x["date"])
+    return summary
+
+
+def output_dir(animal):
+    return paths.DATA_DIR / animal / "Analysis" / "Across-days"
+
+
+def save_summary(animal, summary):
+    base_dir = output_dir(animal)
+    base_dir.mkdir(parents=True, exist_ok=True)
+    csv_path = base_dir / f"{animal}_SpoutSamp_across_days.csv"
+    pd.DataFrame(summary).to_csv(csv_path, index=False)
+    return csv_path
+
+
+def write_summary(animal, files):
+    """Write the across-days table without making the figure. Returns the CSV path."""
+    summary = load_summary(files)
+    if not summary:
+        print("No valid data to summarize.")
+        return None
+    csv_path = save_summary(animal, summary)
+    print(f"✅ Summary saved to: {csv_path}")
+    return csv_path
+
+
+@timing.timed("across_days")
+def run(args):
+    timing.mark("load")
+    summary = load_summary(args.files)
+
     if not summary:
         print("No valid data to plot.")
         return
 
-    # Sort by date
-    summary.sort(key=lambda x: x["date"])
+    if getattr(args, "summary_only", False):
+        timing.mark("save")
+        csv_path = save_summary(args.animal, summary)
+        print(f"✅ Summary saved to: {csv_path}")
+        return
+
+    timing.mark("compute")
 
     # Extract data
     dates = [s["date"] for s in summary]
@@ -89,6 +123,11 @@ def main():
         'NA': "#F5F5F5"
     }
 
+    timing.mark("plot")
+    # Plotting libraries are only imported when a figure is made
+    import matplotlib.pyplot as plt
+    from matplotlib.patches import Patch
+
     fig, axs = plt.subplots(2, 1, figsize=(10, 12))
     
     # Add QW background
@@ -137,16 +176,26 @@ def main():
     plt.suptitle(f"Animal {args.animal} — Spout Sampling data across days", fontsize=12, fontweight='bold', y=0.97)
 
     # Save outputs
-    base_dir = Path(r"L:/dmclab/Joana/Behavior/Data") / args.animal / "Analysis" / "Across-days"
+    timing.mark("save")
+    base_dir = output_dir(args.animal)
     base_dir.mkdir(parents=True, exist_ok=True)
     fig_filename = base_dir / f"{args.animal}_SpoutSamp_across_days"
     for ext in ["png", "pdf", "svg"]:
         fig.savefig(fig_filename.with_suffix(f".{ext}"), dpi=500)
 
     # Export CSV
-    df_export = pd.DataFrame(summary)
-    df_export.to_csv(base_dir / f"{args.animal}_SpoutSamp_across_days.csv", index=False)
+    save_summary(args.animal, summary)
     print(f"✅ Analysis complete and saved for animal {args.animal}")
 
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--animal", required=True)
+    parser.add_argument("--files", nargs="+", required=True)
+    parser.add_argument("--summary-only", action="store_true",
+                        help="Only write the across-days CSV, without the figure.")
+    args = parser.parse_args()
+    with timing.session(f"{args.animal}_SpoutSamp_across_days", animal=args.animal, n_files=len(args.files)):
+        run(args)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 14:05:51 2026
+
+@author: JoanaCatarino
+
+Lick (or press) counts per spout in fixed time bins from session start, at
+several resolutions, plus the same counts per trial. Counting is one
+np.bincount per spout and resolution, so a 100k-lick session costs a few
+milliseconds and the figures draw one line per spout instead of one marker
+per lick.
+
+Used by analyze_free_licking / analyze_free_pressing for the session panels
+and by general_free_licking, which stores each day's binned rates for the
+across-days overlay.
+
+    rates = lick_rate.bin_licks(session)     # {1: counts, 10: counts, 60: counts}
+    rates[60][lick_rate.LEFT]                # left licks per minute bin
+"""
+
+import numpy as np
+
+# Bin widths in seconds
+BIN_SECONDS = (1, 10, 60)
+# Most bins drawn in one session panel; the finest resolution that fits is used
+MAX_BINS = 600
+
+# Rows of every counts array
+SPOUTS = ["total", "left", "right"]
+TOTAL, LEFT, RIGHT = range(3)
+
+
+def lick_masks(session):
+    """(total, left, right) masks of the rows that are licks."""
+    lick = session.lick
+    return lick, lick & session.left, lick & session.right
+
+
+def session_seconds(session) -> float:
+    """Time from session start to the last trial end or lick, whichever is later."""
+    ends = np.concatenate([session.trial_end, session.lick_time]) - session.session_start
+    ends = ends[~np.isnan(ends)]
+    return float(ends.max()) if len(ends) else 0.0
+
+
+def bin_licks(session, bin_seconds=BIN_SECONDS) -> dict:
+    """{bin width (s): counts} where counts is (3, n bins) ints, rows in SPOUTS order.
+
+    Bin i covers [i * width, (i + 1) * width) seconds after session start.
+    """
+    duration = session_seconds(session)
+    t = session.lick_time - session.session_start
+    valid = ~np.isnan(t) & (t >= 0)
+    masks = [m & valid for m in lick_masks(session)]
+
+    rates = {}
+    for width in bin_seconds:
+        n_bins = int(duration // width) + 1
+        index = (np.where(valid, t, 0) // width).astype(np.int64)
+        rates[width] = np.vstack([np.bincount(index[m], minlength=n_bins)[:n_bins] for m in masks])
+    return rates
+
+
+def pick_bin(duration, bin_seconds=BIN_SECONDS, max_bins=MAX_BINS):
+    """Finest bin width that keeps the session under max_bins bins."""
+    for width in sorted(bin_seconds):
+        if duration / width <= max_bins:
+            return width
+    return max(bin_seconds)
+
+
+def edges_minutes(n_bins, width) -> np.ndarray:
+    return np.arange(n_bins + 1) * width / 60
+
+
+def per_minute(counts, width) -> np.ndarray:
+    return counts * (60 / width)
+
+
+def trial_counts(session) -> np.ndarray:
+    """(3, last trial + 1) licks per trial number, rows in SPOUTS order."""
+    n = int(session.trial_number.max()) + 1 if len(session) else 1
+    return np.vstack([np.bincount(session.trial_number[m], minlength=n) for m in lick_masks(session)])
+
+
+def cumulative(counts):
+    """(trial numbers, running total) over the trials that have at least one lick."""
+    trials = np.flatnonzero(counts)
+    return trials, counts[trials].cumsum()
+
+
+def stack(arrays) -> np.ndarray:
+    """Stack (3, n) count arrays of different lengths into a (sessions, 3, longest) float
+    array, padded with NaN so shorter sessions simply end."""
+    longest = max((a.shape[1] for a in arrays), default=0)
+    out = np.full((len(arrays), len(SPOUTS), longest), np.nan)
+    for i, a in enumerate(arrays):
+        out[i, :, :a.shape[1]] = a
+    return out
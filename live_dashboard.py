@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 14:37:05 2026
+
+@author: JoanaCatarino
+
+One dashboard for all boxes running at the same time. Watches the folders
+the boxes write to, picks up each box's active session file (box number from
+the file name) and shows a per-box summary table: trials, % correct,
+omissions, early licks and time since the last lick.
+
+Each file has its own incremental parser (live_monitor.CsvTail) that only
+reads the bytes appended since the last refresh, and only running counts are
+kept, so memory stays the same however long the sessions run. The files are
+polled from a small thread pool.
+
+    python live_dashboard.py D:/Behavior E:/Behavior --every 3
+"""
+
+import os
+import time
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import session_data
+from session_data import OUTCOMES, outcome_code
+from live_monitor import CsvTail
+from session_index import filename_regex
+
+REFRESH_SECONDS = 3        # time between table refreshes
+SCAN_SECONDS = 30          # time between looks for new session files
+ACTIVE_MINUTES = 30        # files not written for longer are considered finished
+MAX_READ_BYTES = 4 * 1024 ** 2   # per file and refresh
+WORKERS = 4
+PROTOCOLS = ("2ChoiceAuditory", "2ChoiceBlocks", "AdaptSensorimotor")
+
+
+class BoxSummary:
+    """Running counts of one box's session file."""
+
+    def __init__(self, path, box, animal, protocol):
+        self.path = Path(path)
+        self.box, self.animal, self.protocol = box, animal, protocol
+        self.tail = CsvTail(path, max_bytes=MAX_READ_BYTES)
+        self.reset()
+
+    def reset(self):
+        self.trials = 0
+        self.counts = np.zeros(len(OUTCOMES), dtype=np.int64)   # trials per outcome code
+        self.last_lick = None
+        self.error = None
+
+    def poll(self):
+        try:
+            chunk, restarted = self.tail.read_new()
+            if restarted:
+                self.reset()
+            self.error = None   # a read that worked clears an earlier, transient failure
+            if chunk is None:
+                return
+            outcome = session_data.encode_frame(chunk)
+        except Exception as e:
+            self.error = str(e)
+            return
+        self.trials += len(chunk)
+        self.counts += np.bincount(outcome, minlength=len(OUTCOMES))
+        licks = chunk["lick_time"].dropna()
+        if len(licks):
+            self.last_lick = float(licks.iloc[-1])
+
+    def row(self, now) -> str:
+        if self.error:
+            return f"{self.box:>5}  {self.animal:>8}  {self.protocol:<18}  ❌ {self.error[:60]}"
+        with_outcome = self.counts[1:].sum()
+        pct = f"{self.counts[session_data.CORRECT].sum() / with_outcome * 100:.1f}" if with_outcome else "-"
+        since = f"{now - self.last_lick:.0f} s" if self.last_lick else "-"
+        return (f"{self.box:>5}  {self.animal:>8}  {self.protocol:<18}{self.trials:>8}{pct:>10}"
+                f"{self.counts[outcome_code['omission']]:>11}{self.counts[outcome_code['early lick']]:>8}{since:>12}")
+
+
+def active_files(folders, active_minutes=ACTIVE_MINUTES) -> dict:
+    """{box: (path, animal, protocol)} of the newest recently written session file of each box."""
+    cutoff = time.time() - active_minutes * 60
+    newest = {}
+    for folder in folders:
+        for root, _, files in os.walk(folder):
+            if os.path.basename(root).lower() == "old":
+                continue
+            for name in files:
+                match = filename_regex.match(name)
+                if not match or match.group("protocol") not in PROTOCOLS:
+                    continue
+                path = os.path.join(root, name)
+                mtime = os.stat(path).st_mtime
+                box = match.group("box")
+                if mtime >= cutoff and (box not in newest or mtime > newest[box][0]):
+                    newest[box] = (mtime, path, match.group("animal"), match.group("protocol"))
+    return {box: (path, animal, protocol) for box, (_, path, animal, protocol) in newest.items()}
+
+
+def print_table(boxes):
+    now = time.time()
+    print("\033[2J\033[H", end="")   # clear the terminal
+    print(f"📊 Live boxes — {time.strftime('%H:%M:%S')}\n")
+    print(f"{'box':>5}  {'animal':>8}  {'protocol':<18}{'trials':>8}{'correct %':>10}"
+          f"{'omissions':>11}{'early':>8}{'last lick':>12}")
+    for box in sorted(boxes, key=lambda b: (len(b), b)):   # box 10 after box 9
+        print(boxes[box].row(now))
+    if not boxes:
+        print("   (no active session files)")
+
+
+def run(folders, every=REFRESH_SECONDS, workers=WORKERS, active_minutes=ACTIVE_MINUTES, once=False):
+    boxes = {}
+    last_scan = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            if time.monotonic() - last_scan >= SCAN_SECONDS or once:
+                for box, (path, animal, protocol) in active_files(folders, active_minutes).items():
+                    # A new session on a box replaces the previous one
+                    if box not in boxes or boxes[box].path != Path(path):
+                        boxes[box] = BoxSummary(path, box, animal, protocol)
+                last_scan = time.monotonic()
+
+            list(pool.map(BoxSummary.poll, boxes.values()))
+            print_table(boxes)
+            if once:
+                return boxes
+            time.sleep(every)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-box summary of all running sessions.")
+    parser.add_argument("folders", nargs="+", help="Folders the boxes write their session CSVs to.")
+    parser.add_argument("--every", type=float, default=REFRESH_SECONDS, help="Seconds between refreshes.")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--active-minutes", type=float, default=ACTIVE_MINUTES,
+                        help="Ignore files not written for this long.")
+    parser.add_argument("--once", action="store_true", help="Print the table once and exit.")
+    args = parser.parse_args()
+    try:
+        run(args.folders, args.every, args.workers, args.active_minutes, args.once)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 09:12:40 2026
+
+@author: JoanaCatarino
+
+Live view of a 2-choice session while the box is still writing it. Tails the
+session CSV, and for every row appended since the last poll updates the
+outcome counts (same outcome codes as the session figure), the
+HR / FA / d' curves, the same three over the last trials and the lick latencies.
+Only the new bytes are read, and the figure is redrawn at most --fps times
+per second so the box PC stays responsive.
+
+    python live_monitor.py D:/Behavior/2ChoiceAuditory_123456_20261021_101500_box1.csv
+    python live_monitor.py D:/Behavior --idle-timeout 600        # newest CSV in the folder
+    python live_monitor.py <file> --no-plot                      # text only
+"""
+
+import io
+import time
+import argparse
+from pathlib import Path
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+import downsample
+import metrics
+import session_data
+from session_data import OUTCOMES, outcome_code
+from analyze_2choice_auditory import categories, category_colors
+
+POLL_INTERVAL = 0.25   # seconds between checks of the file
+REFRESH_FPS = 2.0      # maximum redraws per second
+ROLLING_WINDOW = 20    # trials in the rolling HR / FA / d'
+
+
+def rates(correct, incorrect, total):
+    """HR, FA and d' with the same correction and clipping as the session figure."""
+    hr = np.clip((correct + 0.5) / (total + 1), 0.01, 0.99)
+    fa = np.clip((incorrect + 0.5) / (total + 1), 0.01, 0.99)
+    return hr, fa, metrics.d_prime(hr, fa)
+
+
+class CsvTail:
+    """Reads the complete rows appended to a CSV since the last call, never the whole file again."""
+
+    def __init__(self, path, max_bytes=None):
+        self.path = Path(path)
+        self.max_bytes = max_bytes   # cap per read, the rest comes on the next call
+        self.offset = 0
+        self.header = None
+
+    def read_new(self):
+        """(new rows as a DataFrame or None, whether the file was rewritten and read from the start)."""
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            return None, False
+        restarted = size < self.offset
+        if restarted:
+            self.offset, self.header = 0, None
+        if size == self.offset:
+            return None, restarted
+
+        chunk_bytes = self.max_bytes or size
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(min(size - self.offset, chunk_bytes))
+            end = data.rfind(b"\n")
+            # A line longer than max_bytes: keep reading to its end, or the tail would never move on
+            while end < 0 and self.offset + len(data) < size:
+                block = f.read(min(size - self.offset - len(data), chunk_bytes))
+                if not block:
+                    break
+                newline = block.find(b"\n")
+                if newline >= 0:
+                    end = len(data) + newline
+                data += block
+        if end < 0:
+            return None, restarted   # the box is still writing the line
+        self.offset += end + 1
+        text = data[:end + 1].decode("utf-8", errors="replace")
+
+        if self.header is None:
+            self.header, _, text = text.partition("\n")
+            self.header = self.header.strip()
+        if not text.strip():
+            return None, restarted
+        return pd.read_csv(io.StringIO(self.header + "\n" + text)), restarted
+
+
+class LiveSession:
+    """Running statistics of one session file, updated from the rows appended since the last poll."""
+
+    def __init__(self, path, window=ROLLING_WINDOW):
+        self.path = Path(path)
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self.tail = CsvTail(self.path)
+        self.rows = 0
+        self.counts = np.zeros(len(OUTCOMES), dtype=np.int64)   # trials per outcome code
+        self.n_trials = 0          # trials with an outcome, as in the session figure
+        self.n_correct = 0
+        self.n_incorrect = 0
+        self.recent = deque(maxlen=self.window)   # (reward, punishment) of the last trials
+        self.trial_numbers, self.hr, self.fa, self.dprime = [], [], [], []
+        self.rolling_hr, self.rolling_fa, self.rolling_dprime = [], [], []
+        self.latency = {"left": ([], [], []), "right": ([], [], [])}   # trial, latency, rewarded
+        self.last_lick = None
+
+    def poll(self) -> int:
+        """Read the complete rows appended since the last call; return how many there were."""
+        tail = self.tail
+        chunk, restarted = tail.read_new()
+        if restarted:
+            print(f"⚠️ {self.path.name} got shorter, starting over")
+            self.reset()
+            self.tail = tail
+        if chunk is None:
+            return 0
+        self.update(chunk)
+        return len(chunk)
+
+    def update(self, chunk):
+        self.rows += len(chunk)
+        outcome = session_data.encode_frame(chunk)
+        self.counts += np.bincount(outcome, minlength=len(OUTCOMES))
+        trial_number = chunk["trial_number"].fillna(0).to_numpy(dtype=int)
+        reward_all = session_data.flag(chunk, "reward")
+
+        # Cumulative HR / FA / d' over the trials that have an outcome
+        plotted = outcome > 0
+        reward = reward_all[plotted]
+        punishment = session_data.flag(chunk, "punishment")[plotted]
+        total = self.n_trials + np.arange(1, plotted.sum() + 1)
+        correct = self.n_correct + np.cumsum(reward)
+        incorrect = self.n_incorrect + np.cumsum(punishment)
+        hr, fa, dprime = rates(correct, incorrect, total)
+        self.trial_numbers.extend(trial_number[plotted])
+        self.hr.extend(hr)
+        self.fa.extend(fa)
+        self.dprime.extend(dprime)
+        if len(total):
+            self.n_trials, self.n_correct, self.n_incorrect = int(total[-1]), int(correct[-1]), int(incorrect[-1])
+
+        # Rolling HR / FA / d' over the last ROLLING_WINDOW trials
+        for r, p in zip(reward, punishment):
+            self.recent.append((r, p))
+            c, i = np.sum(self.recent, axis=0)
+            hr, fa, dprime = rates(c, i, len(self.recent))
+            self.rolling_hr.append(hr)
+            self.rolling_fa.append(fa)
+            self.rolling_dprime.append(dprime)
+
+        # Lick latency from tone onset, per spout
+        lick_time = pd.to_numeric(chunk["lick_time"], errors="coerce").to_numpy()
+        lick_latency = lick_time - (chunk["trial_start"].to_numpy() + session_data.TONE_DELAY)
+        side = session_data.side_codes(chunk)
+        licked = ~np.isnan(lick_time)
+        for name, bit in (("left", session_data.LEFT), ("right", session_data.RIGHT)):
+            rows = licked & ((side & bit) > 0)
+            trials, latency, rewarded = self.latency[name]
+            trials.extend(trial_number[rows])
+            latency.extend(lick_latency[rows])
+            rewarded.extend(reward_all[rows])
+        if licked.any():
+            self.last_lick = float(lick_time[licked][-1])
+
+    def summary(self) -> str:
+        correct = self.counts[session_data.CORRECT].sum()
+        pct = correct / self.n_trials * 100 if self.n_trials else 0
+        rolling = (f"HR {self.rolling_hr[-1]:.2f} FA {self.rolling_fa[-1]:.2f} d' {self.rolling_dprime[-1]:.2f}"
+                   if self.rolling_dprime else "-")
+        since = f"{time.time() - self.last_lick:.0f} s ago" if self.last_lick else "-"
+        return (f"{self.rows} rows | {pct:.1f}% correct | omissions {self.counts[outcome_code['omission']]} | "
+                f"early {self.counts[outcome_code['early lick']]} | d' {self.dprime[-1] if self.dprime else 0:.2f} "
+                f"(last {self.window}: {rolling}) | last lick {since}")
+
+
+class LiveFigure:
+    """Small three-panel figure whose artists are updated in place instead of redrawn from scratch."""
+
+    def __init__(self, session):
+        import matplotlib.pyplot as plt
+        self.plt = plt
+        self.session = session
+        plt.ion()
+        self.fig, (self.ax_counts, self.ax_perf, self.ax_lat) = plt.subplots(3, 1, figsize=(8, 9))
+
+        self.bars = self.ax_counts.barh(categories, [0] * len(categories),
+                                        color=[category_colors[c] for c in categories])
+        self.ax_counts.invert_yaxis()
+        self.ax_counts.set_xlabel("Trials")
+
+        self.hr_line, = self.ax_perf.plot([], [], color="black", label="Hit Rate")
+        self.fa_line, = self.ax_perf.plot([], [], color="red", label="False Alarm")
+        self.rolling_hr_line, = self.ax_perf.plot([], [], color="black", linestyle="--", alpha=0.6,
+                                                  label=f"HR (last {session.window})")
+        self.rolling_fa_line, = self.ax_perf.plot([], [], color="red", linestyle="--", alpha=0.6,
+                                                  label=f"FA (last {session.window})")
+        self.ax_perf.set_ylim(0, 1)
+        self.ax_perf.set_ylabel("HR / FA")
+        self.ax_dprime = self.ax_perf.twinx()
+        self.d_line, = self.ax_dprime.plot([], [], color="#9DB4C0", label="d'")
+        self.rolling_line, = self.ax_dprime.plot([], [], color="#9DB4C0", linestyle="--",
+                                                 label=f"d' (last {session.window})")
+        self.ax_dprime.set_ylabel("d'")
+        self.ax_perf.legend(handles=[self.hr_line, self.fa_line, self.d_line,
+                                     self.rolling_hr_line, self.rolling_fa_line, self.rolling_line],
+                            loc="upper left", fontsize="small", ncol=3, frameon=False)
+
+        self.scatters = {side: self.ax_lat.scatter([], [], s=12, marker=marker, color="gray", label=side)
+                         for side, marker in (("left", "o"), ("right", "^"))}
+        self.ax_lat.set_xlabel("Trial Number")
+        self.ax_lat.set_ylabel("Lick Latency (s)")
+        self.ax_lat.legend(loc="upper left", fontsize="small", frameon=False)
+
+        for ax in (self.ax_counts, self.ax_perf, self.ax_lat):
+            ax.spines['top'].set_visible(False)
+        self.fig.suptitle(session.path.name, fontsize=9)
+        self.fig.tight_layout(rect=[0, 0, 1, 0.95])
+
+    def is_open(self) -> bool:
+        return self.plt.fignum_exists(self.fig.number)
+
+    def redraw(self):
+        s = self.session
+        for bar, count in zip(self.bars, s.counts[1:]):
+            bar.set_width(count)
+        self.ax_counts.set_xlim(0, max(s.counts.max(), 1) * 1.1)
+
+        x = s.trial_numbers
+        self.hr_line.set_data(*downsample.reduce(x, s.hr))
+        self.fa_line.set_data(*downsample.reduce(x, s.fa))
+        self.rolling_hr_line.set_data(*downsample.reduce(x, s.rolling_hr))
+        self.rolling_fa_line.set_data(*downsample.reduce(x, s.rolling_fa))
+        self.d_line.set_data(*downsample.reduce(x, s.dprime))
+        self.rolling_line.set_data(*downsample.reduce(x, s.rolling_dprime))
+        if x:
+            self.ax_perf.set_xlim(x[0] - 1, x[-1] + 1)
+            values = s.dprime + s.rolling_dprime
+            self.ax_dprime.set_ylim(min(values) - 0.5, max(values) + 0.5)
+
+        for side, scatter in self.scatters.items():
+            trials, latency, rewarded = s.latency[side]
+            if trials:
+                scatter.set_offsets(np.column_stack([trials, latency]))
+                scatter.set_color(np.where(rewarded, "green", "red"))
+        all_trials = s.latency["left"][0] + s.latency["right"][0]
+        if all_trials:
+            all_latency = s.latency["left"][1] + s.latency["right"][1]
+            self.ax_lat.set_xlim(min(all_trials) - 1, max(all_trials) + 1)
+            self.ax_lat.set_ylim(0, max(max(all_latency), 0.1) * 1.1)
+
+        self.fig.suptitle(f"{s.path.name}\n{s.summary()}", fontsize=9)
+        self.fig.canvas.draw_idle()
+
+    def wait(self, seconds):
+        """Let the GUI handle events for a while (a plain sleep without a window)."""
+        if self.fig.canvas.manager is not None and self.is_open():
+            self.fig.canvas.start_event_loop(seconds)
+        else:
+            time.sleep(seconds)
+
+    def save(self, path):
+        self.fig.savefig(path, dpi=100)
+
+
+def newest_csv(folder) -> Path | None:
+    files = [p for p in Path(folder).glob("*.csv") if not p.stem.endswith("_old")]
+    return max(files, key=lambda p: p.stat().st_mtime, default=None)
+
+
+def monitor(path, fps=REFRESH_FPS, window=ROLLING_WINDOW, plot=True, save=None, idle_timeout=None):
+    """Follow a session file until the window is closed, Ctrl+C, or no row arrived for idle_timeout s."""
+    path = Path(path)
+    if path.is_dir():
+        print(f"🔍 Waiting for a session CSV in {path}")
+        while (found := newest_csv(path)) is None:
+            time.sleep(POLL_INTERVAL)
+        path = found
+    print(f"📈 Following {path.name}")
+
+    session = LiveSession(path, window)
+    figure = LiveFigure(session) if plot or save else None
+    frame_interval = 1 / fps
+    last_row = last_draw = time.monotonic()
+    dirty = False
+    try:
+        while figure is None or not plot or figure.is_open():
+            added = session.poll()
+            now = time.monotonic()
+            if added:
+                last_row = now
+                dirty = True
+                if not plot:
+                    print(f"   {session.summary()}")
+            if dirty and figure and now - last_draw >= frame_interval:
+                figure.redraw()
+                if save:
+                    figure.save(save)
+                last_draw, dirty = now, False
+            if idle_timeout and now - last_row > idle_timeout:
+                print(f"⏹️ No new trials for {idle_timeout} s, stopping")
+                break
+            if figure and plot:
+                figure.wait(POLL_INTERVAL)
+            else:
+                time.sleep(POLL_INTERVAL)
+    except KeyboardInterrupt:
+        pass
+
+    if figure and dirty:
+        figure.redraw()
+        if save:
+            figure.save(save)
+    print(f"✅ {session.summary()}")
+    return session
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live view of a 2-choice session while it is being written.")
+    parser.add_argument("path", help="Session CSV, or a folder to follow its newest CSV.")
+    parser.add_argument("--fps", type=float, default=REFRESH_FPS, help="Maximum figure redraws per second.")
+    parser.add_argument("--window", type=int, default=ROLLING_WINDOW, help="Trials in the rolling d'.")
+    parser.add_argument("--no-plot", action="store_true", help="Print a summary line per update instead.")
+    parser.add_argument("--save", default=None, help="Also write the figure to this PNG on every redraw.")
+    parser.add_argument("--idle-timeout", type=float, default=None,
+                        help="Stop after this many seconds without new rows.")
+    args = parser.parse_args()
+    monitor(args.path, args.fps, args.window, not args.no_plot, args.save, args.idle_timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 09:14:05 2026
+
+@author: JoanaCatarino
+
+Signal-detection helpers shared by the analyses. Kept free of scipy and
+matplotlib so metrics can be computed without importing either.
+"""
+
+from statistics import NormalDist
+
+import numpy as np
+
+_inv_cdf = NormalDist().inv_cdf
+
+# Coefficients of Acklam's rational approximation of the normal quantile
+# (relative error < 1.2e-9, well below what matters for d')
+_A = [-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+      1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00]
+_B = [-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+      6.680131188771972e+01, -1.328068155288572e+01]
+_C = [-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+      -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00]
+_D = [7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00,
+      3.754408661907416e+00]
+_P_LOW = 0.02425
+
+
+def _inv_cdf_array(p):
+    p = np.asarray(p, dtype=float)
+    z = np.empty_like(p)
+
+    low = p < _P_LOW
+    high = p > 1 - _P_LOW
+    mid = ~low & ~high
+
+    q = p[mid] - 0.5
+    r = q * q
+    z[mid] = ((((((_A[0] * r + _A[1]) * r + _A[2]) * r + _A[3]) * r + _A[4]) * r + _A[5]) * q /
+              (((((_B[0] * r + _B[1]) * r + _B[2]) * r + _B[3]) * r + _B[4]) * r + 1))
+
+    for tail, sign, values in ((low, 1, p[low]), (high, -1, 1 - p[high])):
+        q = np.sqrt(-2 * np.log(values))
+        z[tail] = sign * ((((((_C[0] * q + _C[1]) * q + _C[2]) * q + _C[3]) * q + _C[4]) * q + _C[5]) /
+                          ((((_D[0] * q + _D[1]) * q + _D[2]) * q + _D[3]) * q + 1))
+    return z
+
+
+def z_score(p):
+    """Inverse of the standard normal CDF (scipy.stats.norm.ppf) for a number or an array."""
+    if np.ndim(p) == 0:
+        return _inv_cdf(float(p))
+    return _inv_cdf_array(p)
+
+
+def d_prime(hit_rate, false_alarm):
+    return z_score(hit_rate) - z_score(false_alarm)
@@ -9,7 +9,6 @@ overall plots across sessions for each animal
 
 import os, re
 import re
-import glob
 from pathlib import Path
 from datetime import datetime
 from math import isnan
@@ -17,16 +16,17 @@ from math import isnan
 import argparse
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.patches import Patch
-from scipy.stats import norm
+
+import metrics
+import paths
+import session_index
+import timing
 
 # ==== USER SETTINGS ==========================================
-base_dir = r"L:\dmclab\Joana\Behavior\Data"      
+base_dir = str(paths.DATA_DIR)      
 animals_of_interest = ["956700"]                  
-recursive_search = True
 save_formats = ("png", "pdf", "svg")
-patterns = ["2ChoiceAuditory*.csv", "2ChoiceBlocks*.csv"]
+protocols = ("2ChoiceAuditory", "2ChoiceBlocks")
 DPI = 500
 # =============================================================
 
@@ -49,32 +49,20 @@ def safe_read_csv(path: Path) -> pd.DataFrame:
         return pd.read_csv(path, encoding="latin-1", low_memory=False)
 
 
-def find_files() -> pd.DataFrame:
-    files = []
-    for pat in patterns:
-        if recursive_search:
-            files.extend(glob.glob(str(Path(base_dir) / "**" / pat), recursive=True))
-        else:
-            files.extend(glob.glob(str(Path(base_dir) / pat), recursive=False))
-
+def find_files(animal_ids=None) -> pd.DataFrame:
+    """Sessions of the given animals, looked up in their session index (old/ backups excluded)."""
     records = []
-    for f in files:
-        p = Path(f)
-        name = p.name
-        m = fname_rx.match(name)
-        if not m:
-            continue
-        animal = m.group("animal")
-        if animals_of_interest and animal not in animals_of_interest:
-            continue
-
-        date, time = m.group("date"), m.group("time")
-        dt = datetime.strptime(date + time, "%Y%m%d%H%M%S")
-        records.append({
-            "animal": animal,
-            "dt": dt,
-            "path": str(p),
-        })
+    for animal in animal_ids or animals_of_interest:
+        for r in session_index.lookup(animal, protocols):
+            m = fname_rx.match(Path(r["path"]).name)
+            if not m:
+                continue
+            dt = datetime.strptime(m.group("date") + m.group("time"), "%Y%m%d%H%M%S")
+            records.append({
+                "animal": r["animal"],
+                "dt": dt,
+                "path": r["path"],
+            })
 
     if not records:
         raise FileNotFoundError("No matching CSVs found for selected animals.")
@@ -103,7 +91,7 @@ def extract_metadata(file_path: str) -> tuple[datetime, str | None]:
 
 
 def load_tone_mapping(animal_id: str) -> str:
-    mapping_file_path = Path(r"L:/dmclab/Joana/Behavior/Spout-tone map/spout_tone_generator.csv")
+    mapping_file_path = paths.MAPPING_FILE
     if not mapping_file_path.exists():
         return "Tone-spout mapping: (mapping file not found)"
 
@@ -157,7 +145,7 @@ def load_trial_counts(file_path:str) -> dir:
     fa = (incorrect + 0.5) / (total + 1)
     hr = min(max(hr, 0.01), 0.99)
     fa = min(max(fa, 0.01), 0.99)
-    dprime = norm.ppf(hr) - norm.ppf(fa)
+    dprime = metrics.d_prime(hr, fa)
     
     
     # Compute overall Performance
@@ -219,7 +207,12 @@ def annotate_bars(ax, bars, offset=1, fmt="{:.1f}%"):
         )
 
 
+@timing.timed("plot")
 def plot_across_days(animal: str, session_summaries: list[dict]) -> None:
+    # Plotting libraries are only imported when a figure is made
+    import matplotlib.pyplot as plt
+    from matplotlib.patches import Patch
+
     if not session_summaries:
         print(f"No valid data to plot for animal {animal}.")
         return
@@ -318,25 +311,28 @@ def plot_across_days(animal: str, session_summaries: list[dict]) -> None:
     
 
 def run_for_animals(animal_ids: list[str]) -> None:
-    all_files = find_files()
+    with timing.session("overall_plots_find_files"):
+        all_files = find_files(animal_ids)
     for animal in animal_ids:
         animal_df = all_files[all_files["animal"] == animal]
         if animal_df.empty:
             print(f"⚠️ No files found for animal {animal}")
             continue
 
-        summaries = []
-        for _, row in animal_df.iterrows():
-            file_path = row["path"]
-            try:
-                date, box = extract_metadata(file_path)
-                tdat = load_trial_counts(file_path)
-                tdat.update({"date": date, "box": box, "file": file_path})
-                summaries.append(tdat)
-            except Exception as e:
-                print(f"⚠️ Skipping file due to error: {file_path}\n{e}")
-
-        plot_across_days(animal, summaries)
+        with timing.session(f"{animal}_overall_plots", animal=animal, n_files=len(animal_df)):
+            summaries = []
+            with timing.stage("load"):
+                for _, row in animal_df.iterrows():
+                    file_path = row["path"]
+                    try:
+                        date, box = extract_metadata(file_path)
+                        tdat = load_trial_counts(file_path)
+                        tdat.update({"date": date, "box": box, "file": file_path})
+                        summaries.append(tdat)
+                    except Exception as e:
+                        print(f"⚠️ Skipping file due to error: {file_path}\n{e}")
+
+            plot_across_days(animal, summaries)
 
 
 def cli():
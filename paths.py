@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 15:02:18 2026
+
+@author: JoanaCatarino
+
+Shared locations of the data folder and the tone-spout mapping file.
+Both can be overridden with environment variables, e.g. to run the scripts
+on a local copy or on synthetic data (see synthetic_sessions.py).
+"""
+
+import os
+from pathlib import Path
+
+DATA_DIR = Path(os.environ.get("BEHAVIOR_DATA_DIR", r"L:/dmclab/Joana/Behavior/Data"))
+MAPPING_FILE = Path(os.environ.get("BEHAVIOR_MAPPING_FILE",
+                                   r"L:/dmclab/Joana/Behavior/Spout-tone map/spout_tone_generator.csv"))
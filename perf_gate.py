@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 17:10:44 2026
+
+@author: JoanaCatarino
+
+Performance regression gate. Compares benchmark results (see benchmark.py)
+with a stored baseline and exits with 1 if any case got slower or uses more
+memory than the threshold allows, so a slow change to an analysis script is
+caught before it reaches the nightly run.
+
+    python perf_gate.py --run --update        # record a baseline on this machine
+    python perf_gate.py --run                 # after changing a script: compare
+    python perf_gate.py --results benchmark_results.json
+"""
+
+import sys
+import json
+import argparse
+from pathlib import Path
+
+import benchmark
+
+BASELINE_FILE = benchmark.REPO_DIR / "benchmark_baseline.json"
+
+TIME_THRESHOLD = 0.20      # fraction slower than the baseline median
+MEMORY_THRESHOLD = 0.20    # fraction above the baseline peak heap
+MIN_SECONDS = 0.05         # slowdowns smaller than this are timer noise
+MIN_MB = 5.0
+
+# Cases the gate runs with --run
+GATE_PROTOCOLS = list(benchmark.protocol_to_module)
+GATE_SIZES = ["small", "medium"]
+
+
+def case_key(row) -> str:
+    return f"{row['case']} [{row['size']}]"
+
+
+def load_results(path) -> dict:
+    with open(path) as f:
+        return {case_key(r): r for r in json.load(f)}
+
+
+def compare(baseline, current, time_threshold=TIME_THRESHOLD, memory_threshold=MEMORY_THRESHOLD) -> list[dict]:
+    rows = []
+    for key, new in current.items():
+        old = baseline.get(key)
+        row = {"key": key, "old_s": None, "new_s": new["median"], "old_mb": None,
+               "new_mb": new.get("peak_mb"), "status": "new"}
+        if old:
+            row.update(old_s=old["median"], old_mb=old.get("peak_mb"), status="ok")
+            slower = new["median"] - old["median"]
+            if slower > MIN_SECONDS and slower > old["median"] * time_threshold:
+                row["status"] = "SLOWER"
+            if row["old_mb"] is not None and row["new_mb"] is not None:
+                grown = row["new_mb"] - row["old_mb"]
+                if grown > MIN_MB and grown > row["old_mb"] * memory_threshold:
+                    row["status"] = "MEMORY" if row["status"] == "ok" else "SLOWER+MEMORY"
+        rows.append(row)
+
+    for key in baseline.keys() - current.keys():
+        rows.append({"key": key, "old_s": baseline[key]["median"], "new_s": None,
+                     "old_mb": baseline[key].get("peak_mb"), "new_mb": None, "status": "missing"})
+    return rows
+
+
+def change(old, new) -> str:
+    if old is None or new is None or old == 0:
+        return "-"
+    return f"{(new - old) / old * 100:+.0f}%"
+
+
+def fmt(value, spec) -> str:
+    return "-" if value is None else format(value, spec)
+
+
+def print_table(rows):
+    print(f"\n{'case':<50}{'base s':>10}{'now s':>10}{'Δ':>7}{'base MB':>10}{'now MB':>10}{'Δ':>7}  status")
+    for r in sorted(rows, key=lambda r: r["key"]):
+        print(f"{r['key']:<50}{fmt(r['old_s'], '.4f'):>10}{fmt(r['new_s'], '.4f'):>10}"
+              f"{change(r['old_s'], r['new_s']):>7}{fmt(r['old_mb'], '.1f'):>10}{fmt(r['new_mb'], '.1f'):>10}"
+              f"{change(r['old_mb'], r['new_mb']):>7}  {r['status']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare benchmark results with the baseline.")
+    parser.add_argument("--run", action="store_true", help="Run the benchmark first.")
+    parser.add_argument("--results", default=str(benchmark.RESULTS_FILE))
+    parser.add_argument("--baseline", default=str(BASELINE_FILE))
+    parser.add_argument("--update", action="store_true", help="Store the results as the new baseline.")
+    parser.add_argument("--time-threshold", type=float, default=TIME_THRESHOLD)
+    parser.add_argument("--memory-threshold", type=float, default=MEMORY_THRESHOLD)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.run:
+        # The runner cases depend on the whole tree and are too noisy to gate on
+        benchmark.run(GATE_SIZES, GATE_PROTOCOLS, args.repeats, runners=False, output=args.results)
+
+    current = load_results(args.results)
+    if args.update:
+        Path(args.baseline).write_text(Path(args.results).read_text())
+        print(f"✅ Baseline updated with {len(current)} cases: {args.baseline}")
+        return 0
+
+    if not Path(args.baseline).exists():
+        print(f"❌ No baseline at {args.baseline} — run with --update first")
+        return 2
+
+    rows = compare(load_results(args.baseline), current, args.time_threshold, args.memory_threshold)
+    print_table(rows)
+
+    regressions = [r for r in rows if r["status"] not in ("ok", "new", "missing")]
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.time_threshold:.0%} time "
+              f"/ {args.memory_threshold:.0%} memory")
+        return 1
+    print("\n✅ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,23 +9,30 @@ Created on Wed Jul 23 18:05:15 2025
 import os
 import re
 import glob
+import json
+import argparse
 import tempfile
 from datetime import datetime
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 
+import paths
+import session_index
+import timing
 
-DATA_ROOT     = r"L:\dmclab\Joana\Behavior\Data"          # raw data root
-ANALYSIS_ROOT = r"L:\dmclab\Joana\Behavior\Data"          # where figures go
+
+DATA_ROOT     = str(paths.DATA_DIR)                       # raw data root
+ANALYSIS_ROOT = str(paths.DATA_DIR)                       # where figures go
 CSV_GLOBS      = ["2ChoiceAuditory*.csv", "2ChoiceBlocks*.csv"]                    # pattern for CSVs
 FIG_FORMATS   = ("png", "pdf", "svg")                     # files to write
 CLEAN_OLD     = True                                      # remove old 'performance*.*' files first
 DATE_REGEX    = re.compile(r"^(\d{4})[-_]?(\d{2})[-_]?(\d{2})$")  # 20250723 / 2025-07-23 / 2025_07_23
 BOX_REGEX     = re.compile(r"[Bb]ox[_\-]?([A-Za-z0-9]+)")  # ← extract box number
-TONE_MAP_FILE = Path(r"L:\dmclab\Joana\Behavior\Spout-tone map\spout_tone_generator.csv")
+TONE_MAP_FILE = paths.MAPPING_FILE
+CACHE_NAME    = "day_metrics_cache.json"                  # per-animal, next to the figures
 
 
 def parse_date(folder_name: str) -> datetime | None:
@@ -37,10 +44,21 @@ def parse_date(folder_name: str) -> datetime | None:
     return datetime(y, mth, d)
 
 
-def load_day_csvs(day_dir: str) -> tuple[pd.DataFrame, str | None]:
+def day_files(day_dir: str) -> list[str]:
+    """Session CSVs of one day, without leftover *_old.csv copies or known duplicates (dedupe.py)."""
     files = []
     for pattern in CSV_GLOBS:
         files.extend(glob.glob(os.path.join(day_dir, pattern)))
+    return sorted(f for f in files if not f.endswith("_old.csv") and not session_index.is_duplicate(f))
+
+
+def day_key(files: list[str]) -> list:
+    """Cache key of a day: its file names and mtimes."""
+    return [[os.path.basename(f), os.path.getmtime(f)] for f in files]
+
+
+def load_day_csvs(day_dir: str) -> tuple[pd.DataFrame, str | None]:
+    files = day_files(day_dir)
 
     if not files:
         return pd.DataFrame(), None
@@ -101,30 +119,79 @@ def load_tone_mapping(animal_id: str | int, csv_path: Path) -> str | None:
     return f"Tone–spout mapping: {pair_8khz}, {pair_16khz}"
 
 
-def process_animal(animal_dir: str) -> None:
-    animal_id    = os.path.basename(animal_dir)
-    behavior_dir = os.path.join(animal_dir, "Behavior")
-    if not os.path.isdir(behavior_dir):
-        return
+def load_cache(cache_path: Path) -> dict:
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_cache(cache_path: Path, cache: dict):
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cache_path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp, cache_path)
+
+
+def cached_day_metrics(behavior_dir: str, cache_path: Path) -> tuple[list, list, bool, dict]:
+    """Metrics of every day, reading only the days whose files changed since the last run.
 
-    rows = []
-    boxes = []
+    Returns (rows, boxes, changed, cache); changed is False when nothing differs from the cache.
+    The updated cache is not written here: the caller saves it once the figure is saved, so a
+    failed render is retried on the next run.
+    """
+    cache = load_cache(cache_path)
+    new_cache = {}
+    changed = False
     for day_name in os.listdir(behavior_dir):
-        date_obj = parse_date(day_name)
-        if date_obj is None:
+        if parse_date(day_name) is None:
             continue
-        df_day, box_label = load_day_csvs(os.path.join(behavior_dir, day_name))
-        metrics = day_metrics(df_day)
-        if metrics is None:
+        day_dir = os.path.join(behavior_dir, day_name)
+        key = day_key(day_files(day_dir))
+        entry = cache.get(day_name)
+        if entry is None or entry["key"] != key:
+            df_day, box_label = load_day_csvs(day_dir)
+            entry = {"key": key, "metrics": day_metrics(df_day), "box": box_label}
+            changed = True
+        new_cache[day_name] = entry
+
+    changed = changed or set(cache) != set(new_cache)
+
+    rows, boxes = [], []
+    for day_name, entry in new_cache.items():
+        if entry["metrics"] is None:
             continue
-        metrics["date"] = date_obj
-        rows.append(metrics)
-        boxes.append(box_label or "Box ?")
+        rows.append({**entry["metrics"], "date": parse_date(day_name)})
+        boxes.append(entry["box"] or "Box ?")
+    return rows, boxes, changed, new_cache
+
+
+@timing.timed("process_animal")
+def process_animal(animal_dir: str, force: bool = False) -> bool:
+    """Update the performance figure of one animal. Returns True if it was rendered."""
+    animal_id    = os.path.basename(animal_dir)
+    behavior_dir = os.path.join(animal_dir, "Behavior")
+    if not os.path.isdir(behavior_dir):
+        return False
+
+    timing.mark("load")
+    analysis_dir = Path(ANALYSIS_ROOT) / animal_id / "Analysis" / "Across-days"
+    cache_path = analysis_dir / CACHE_NAME
+    rows, boxes, changed, cache = cached_day_metrics(behavior_dir, cache_path)
 
     if not rows:
+        if changed:
+            save_cache(cache_path, cache)   # nothing to draw, so nothing to retry
         print(f"{animal_id}: no usable CSVs.")
-        return
+        return False
+
+    # Only render animals whose metrics changed (or whose figure is missing)
+    if not changed and not force and (analysis_dir / "performance.png").exists():
+        return False
 
+    timing.mark("compute")
     perf = pd.DataFrame(rows).set_index("date").sort_index()
     boxes = np.array(boxes)[perf.index.argsort()] 
 
@@ -142,6 +209,9 @@ def process_animal(animal_dir: str) -> None:
     sup_title = "\n".join(sup_lines)
 
     # ---------------------- FIGURE --------------------------
+    timing.mark("plot")
+    import matplotlib.pyplot as plt  # only when a figure is made
+
     fig, (ax1, ax2) = plt.subplots(
         2, 1, figsize=(12, 10), constrained_layout=False, sharex=False, gridspec_kw={"hspace": 0.5}  
     )
@@ -189,7 +259,7 @@ def process_animal(animal_dir: str) -> None:
     fig.subplots_adjust(top=0.85, hspace=0.80)  # more gap from suptitle + between plots
 
     # ---------------------- SAVE ----------------------------
-    analysis_dir = Path(ANALYSIS_ROOT) / animal_id / "Analysis" / "Across-days"
+    timing.mark("save")
     analysis_dir.mkdir(parents=True, exist_ok=True)
 
     if CLEAN_OLD:
@@ -203,14 +273,37 @@ def process_animal(animal_dir: str) -> None:
     for ext in FIG_FORMATS:
         fig.savefig(f"{base}.{ext}", dpi=300)
 
+    plt.close(fig)
+    if changed:
+        save_cache(cache_path, cache)
     print(f"{animal_id}: saved/overwritten performance.{', '.join(FIG_FORMATS)}")
+    return True
 
 
+def refresh_animal(animal_dir: str, force: bool = False) -> bool:
+    """Worker: process one animal inside its own timing session.
+
+    Errors are reported and only skip this animal, the others are still processed.
+    """
+    animal_id = os.path.basename(animal_dir)
+    try:
+        with timing.session(f"{animal_id}_performance_across_days", animal=animal_id):
+            return process_animal(animal_dir, force)
+    except Exception as e:
+        print(f"❌ {animal_id}: {type(e).__name__}: {e}")
+        return False
+
 
 # ---------------------- MAIN -------------------------------
 if __name__ == "__main__":
-    for entry in os.listdir(DATA_ROOT):
-        path = os.path.join(DATA_ROOT, entry)
-        if os.path.isdir(path):
-            process_animal(path)
+    parser = argparse.ArgumentParser(description="Performance across days for every animal.")
+    parser.add_argument("--force", action="store_true", help="Re-render every animal.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes.")
+    args = parser.parse_args()
+
+    animal_dirs = [os.path.join(DATA_ROOT, entry) for entry in os.listdir(DATA_ROOT)
+                   if os.path.isdir(os.path.join(DATA_ROOT, entry, "Behavior"))]
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        rendered = list(pool.map(refresh_animal, animal_dirs, [args.force] * len(animal_dirs)))
+    print(f"✅ {sum(rendered)} of {len(animal_dirs)} animals re-rendered")
 
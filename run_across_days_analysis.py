@@ -6,13 +6,20 @@ Created on Tue Jun 24 11:42:33 2025
 """
 
 import re
+import csv
+import json
 import subprocess
 from pathlib import Path
 from collections import defaultdict
-import pandas as pd
+
+import dedupe
+import paths
+import session_index
+import timing
+import validate_sessions
 
 # Base data directory
-DATA_DIR = Path(r"L:/dmclab/Joana/Behavior/Data")
+DATA_DIR = paths.DATA_DIR
 
 # Map protocol prefix to script
 protocol_to_script = {
@@ -23,6 +30,11 @@ protocol_to_script = {
     # 'AdaptSensorimotor_distractor': 'analyze_adapt_sensorimotor_distractor.py'
 }
 
+# Outputs the scripts also write in --summary-only runs (<animal>_<protocol>_<suffix>)
+protocol_extra_outputs = {
+    '2ChoiceAuditory': ['trial_heatmap.png'],
+}
+
 # Regex to parse filenames
 filename_regex = re.compile(
     r'(?P<protocol>[^_]+)_(?P<animal>\d+)_(?P<date>\d{8})_\d+_box(?P<box>\w+)',
@@ -31,13 +43,69 @@ filename_regex = re.compile(
 
 
 def already_processed_dates(across_days_csv):
+    # Only the date column is needed, so the csv module is enough (no pandas import)
     if across_days_csv.exists():
-        df = pd.read_csv(across_days_csv, dtype={"date": str})
-        return set(df["date"])
+        with open(across_days_csv, newline="") as f:
+            return {row["date"] for row in csv.DictReader(f)}
     return set()
 
 
+def inputs_path(output_csv):
+    return output_csv.with_suffix(".inputs.json")
+
+
+def file_stamps(files):
+    """{path: mtime} of the session files handed to an across-days script."""
+    return {f["path"]: Path(f["path"]).stat().st_mtime for f in files}
+
+
+def read_inputs(output_csv):
+    """Files the last successful run was given, or None if it was never recorded."""
+    try:
+        with open(inputs_path(output_csv)) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def save_inputs(output_csv, files):
+    inputs_path(output_csv).write_text(json.dumps(file_stamps(files)))
+
+
+def older_than(output, mtime):
+    return not output.exists() or output.stat().st_mtime < mtime
+
+
+def stale_outputs(files, output_plot, output_csv, extra_outputs=()):
+    """(plot_stale, csv_stale): missing, older than the newest session file, or given other files.
+
+    The CSV is compared with the files the last run was given, not with the dates it holds,
+    so a session the script cannot summarize does not keep the animal stale forever.
+    Outputs written before the inputs were recorded fall back to the date check.
+    Extra outputs (written with the CSV) make the CSV stale when missing or old.
+    """
+    newest = max(Path(f["path"]).stat().st_mtime for f in files)
+    plot_stale = older_than(output_plot, newest)
+    if any(older_than(output, newest) for output in extra_outputs):
+        return plot_stale, True
+    previous = read_inputs(output_csv)
+    if not output_csv.exists():
+        csv_stale = True
+    elif previous is not None:
+        csv_stale = previous != file_stamps(files)
+    else:
+        csv_stale = not {f["date"] for f in files} <= already_processed_dates(output_csv)
+    return plot_stale, csv_stale
+
+
 def analyze_all_animals():
+    # Cheap header/sample check of every session file before any full parse
+    with timing.stage("validate"):
+        broken = validate_sessions.broken_files()
+    # Byte-identical copies of a session are only analyzed once
+    with timing.stage("dedupe"):
+        dedupe.find_duplicates()
+
     for animal_dir in DATA_DIR.iterdir():
         if not animal_dir.is_dir() or not animal_dir.name.isdigit():
             continue  # Skip non-animal directories
@@ -61,6 +129,12 @@ def analyze_all_animals():
                 match = filename_regex.match(file.stem)
                 if not match:
                     continue
+                if str(file) in broken:
+                    print(f"🚫 Skipping {file.name} — failed validation (see {validate_sessions.REPORT_FILE.name})")
+                    continue
+                if session_index.is_duplicate(str(file)):
+                    print(f"⏭️ Skipping {file.name} — identical copy of another session")
+                    continue
 
                 protocol = match.group("protocol")
                 date = match.group("date")
@@ -80,24 +154,34 @@ def analyze_all_animals():
                 continue
             
             
-            #uncomment when we finish scripts --> to not overwrite data and analyze all animals everytime
-            # Check if already analyzed
+            # Check which outputs are missing or older than the session files
             output_folder = DATA_DIR / animal_id / "Analysis" / "Across-days"
             output_plot = output_folder / f"{animal_id}_{protocol}_across_days.png"
             output_csv = output_folder / f"{animal_id}_{protocol}_across_days.csv"
+            extra_outputs = [output_folder / f"{animal_id}_{protocol}_{suffix}"
+                             for suffix in protocol_extra_outputs.get(protocol, [])]
+            plot_stale, csv_stale = stale_outputs(files, output_plot, output_csv, extra_outputs)
 
-            if output_plot.exists() and output_csv.exists():
+            if not plot_stale and not csv_stale:
                 print(f"⏭️  Skipping {protocol} for animal {animal_id} — already analyzed.")
                 continue
-           
-
-            print(f"📊 Running {script} on {len(files)} files for protocol '{protocol}' for animal {animal_id}")
 
-            subprocess.run([
-                "python", script,
-                "--animal", animal_id,
-                "--files", *[f["path"] for f in files]
-            ])
+            # Figure is up to date: only the table needs writing
+            summary_only = ["--summary-only"] if not plot_stale else []
+            mode = " (summary only)" if summary_only else ""
+            print(f"📊 Running {script}{mode} on {len(files)} files for protocol '{protocol}' for animal {animal_id}")
+
+            with timing.stage(f"{script}:{animal_id}"):
+                result = subprocess.run([
+                    "python", script,
+                    "--animal", animal_id,
+                    "--files", *[f["path"] for f in files],
+                    *summary_only
+                ])
+            # Sessions the script skipped stay skipped until their file changes
+            if result.returncode == 0 and output_csv.exists():
+                save_inputs(output_csv, files)
 
 if __name__ == "__main__":
-    analyze_all_animals()
+    with timing.session("run_across_days_analysis"):
+        analyze_all_animals()
@@ -10,8 +10,13 @@ import re
 import subprocess
 from pathlib import Path
 
+import criterion
+import paths
+import timing
+import validate_sessions
+
 # Base data directory
-DATA_DIR = Path(r"L:/dmclab/Joana/Behavior/Data")
+DATA_DIR = paths.DATA_DIR
 ANALYSIS_FOLDER_NAME = "Analysis"
 
 # Map protocol prefix to script
@@ -30,6 +35,10 @@ filename_regex = re.compile(
 )
 
 def analyze_new_data():
+    # Cheap header/sample check of every session file before any full parse
+    with timing.stage("validate"):
+        broken = validate_sessions.broken_files()
+
     for animal_dir in DATA_DIR.iterdir():
         if not animal_dir.is_dir():
             continue
@@ -68,17 +77,27 @@ def analyze_new_data():
                     print(f"⚠️  No analysis script for protocol '{protocol_prefix}' — skipping file: {file.name}")
                     continue
 
+                if str(file) in broken:
+                    print(f"🚫 Skipping {file.name} — failed validation (see {validate_sessions.REPORT_FILE.name})")
+                    continue
+
                 print(f"✅ Running {script_name} for {file.name}")
                 analysis_subdir.mkdir(parents=True, exist_ok=True)
-                subprocess.run([
-                    "python", script_name,
-                    "--file", str(file),
-                    "--animal", animal,
-                    "--date", date,
-                    "--box", box,
-                    "--output", str(analysis_subdir)
-                ])
+                with timing.stage(f"{script_name}:{file.name}"):
+                    subprocess.run([
+                        "python", script_name,
+                        "--file", str(file),
+                        "--animal", animal,
+                        "--date", date,
+                        "--box", box,
+                        "--output", str(analysis_subdir)
+                    ])
                 break  # Only analyze the first matching file per date
 
 if __name__ == "__main__":
-    analyze_new_data()
\ No newline at end of file
+    with timing.session("run_daily_analysis"):
+        with timing.stage("analyze"):
+            analyze_new_data()
+        # Flag animals that are ready to move on to the next protocol
+        with timing.stage("criterion"):
+            criterion.update_status()
\ No newline at end of file
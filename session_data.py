@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 09:48:16 2026
+
+@author: JoanaCatarino
+
+Compact in-memory form of one session file, shared by the analyze_* and
+general_* scripts. Built once per file: each column becomes a typed NumPy
+array, the outcome category, spout side, tone and block become small integer
+codes, and tone time / lick latency are derived here instead of in every
+script. Only arrays and a few scalars are stored, so a Session pickles
+cheaply when sent to worker processes.
+
+    s = session_data.load(file_path)
+    s.outcome_counts()["correct left"], s.lick_latency[s.left]
+"""
+
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Tone comes 1.2 s after trial_start
+TONE_DELAY = 1.2
+
+# Outcome codes; the order is the y order of the outcome raster (0 = no outcome)
+OUTCOMES = ["none", "early lick", "omission", "correct left", "correct right",
+            "incorrect left", "incorrect right"]
+outcome_code = {name: code for code, name in enumerate(OUTCOMES)}
+CORRECT = [outcome_code["correct left"], outcome_code["correct right"]]
+
+# Side bits: 1 = left spout, 2 = right spout
+LEFT, RIGHT = 1, 2
+
+# Stimulus codes: 1 = low tone, 2 = high tone, of the tone pair the protocol uses
+TONE_PAIRS = [("8KHz", "16KHz"), ("5KHz", "10KHz")]
+
+# Block codes of the AdaptSensorimotor protocol (0 = no block)
+BLOCKS = ["", "sound", "action-left", "action-right"]
+
+# Regex to parse filenames
+filename_regex = re.compile(
+    r'(?P<protocol>[^_]+)_(?P<animal>\d+)_(?P<date>\d{8})_(?P<time>\d+)_box(?P<box>\w+)',
+    re.IGNORECASE
+)
+
+FLAG_COLUMNS = ["reward", "punishment", "omission", "early_lick", "lick", "autom_reward", "catch_trial"]
+
+
+def flag(df, column, value=1):
+    """column == value as a bool array (missing column or NaN → False).
+
+    flag(df, "reward", 0) is not ~flag(df, "reward"): rows where reward is empty are in neither.
+    """
+    if column not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+    return (df[column] == value).to_numpy()
+
+
+def side_codes(df):
+    return (flag(df, "left_spout") * LEFT + flag(df, "right_spout") * RIGHT).astype(np.uint8)
+
+
+def encode_outcomes(early_lick, omission, side, reward, punishment):
+    """Outcome code per trial. The rules are applied in this order and later ones win, so a
+    punished lick beats a reward on the same trial and an omission never replaces an early lick."""
+    left = (side & LEFT) > 0
+    right = (side & RIGHT) > 0
+    outcome = np.zeros(len(side), dtype=np.uint8)
+    outcome[early_lick] = 1
+    outcome[omission & (outcome == 0)] = 2
+    outcome[left & reward] = 3
+    outcome[right & reward] = 4
+    outcome[punishment & left] = 5
+    outcome[punishment & right] = 6
+    return outcome
+
+
+def encode_frame(df):
+    """Outcome codes of the rows of a session DataFrame (e.g. the new rows of a live session)."""
+    return encode_outcomes(flag(df, "early_lick"), flag(df, "omission"), side_codes(df),
+                           flag(df, "reward"), flag(df, "punishment"))
+
+
+def most_common(values):
+    """Most frequent value, smallest on ties (as pandas mode()[0]); 'NA' without values."""
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return "NA"
+    unique, counts = np.unique(values, return_counts=True)
+    value = unique[np.argmax(counts)]
+    return int(value) if value == int(value) else float(value)
+
+
+class Session:
+    """One session file as typed arrays plus its protocol metadata."""
+
+    __slots__ = ("path", "protocol", "animal", "date", "time", "box", "columns", "tones", "qw_mode",
+                 "session_start", "trial_number", "trial_start", "trial_end", "lick_time",
+                 "outcome", "side", "stimulus", "block", "qw",
+                 "reward", "punishment", "omission", "early_lick", "lick", "autom_reward", "catch_trial",
+                 "unrewarded")
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    def __len__(self):
+        return len(self.trial_number)
+
+    def __repr__(self):
+        return f"Session({self.protocol} {self.animal} {self.date} box{self.box}, {len(self)} rows)"
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    @property
+    def left(self):
+        return (self.side & LEFT) > 0
+
+    @property
+    def right(self):
+        return (self.side & RIGHT) > 0
+
+    @property
+    def low_tone(self):
+        return self.stimulus == 1
+
+    @property
+    def high_tone(self):
+        return self.stimulus == 2
+
+    @property
+    def tone_time(self):
+        return self.trial_start + TONE_DELAY
+
+    @property
+    def lick_latency(self):
+        """Lick time from tone onset (NaN for trials without a lick)."""
+        return self.lick_time - self.tone_time
+
+    def outcome_counts(self, mask=None) -> dict:
+        """{outcome: number of trials} in one pass over the outcome codes."""
+        codes = self.outcome if mask is None else self.outcome[mask]
+        counts = np.bincount(codes, minlength=len(OUTCOMES))
+        return dict(zip(OUTCOMES, counts.tolist()))
+
+    def qw_most_common(self, missing=None):
+        """Most frequent QW. Rows without a QW are left out (as qw_mode), or counted as missing:
+        the 2-choice summaries filled the frame with 0 before taking the mode."""
+        if self.columns is not None and "QW" not in self.columns:
+            return "NA"
+        qw = self.qw.astype(float)
+        qw[self.qw == -1] = np.nan if missing is None else missing
+        return most_common(qw)
+
+    def block_names(self):
+        return np.array(BLOCKS, dtype=object)[self.block]
+
+
+def load(file_path) -> Session:
+    """Read a session CSV once and convert it to a Session."""
+    path = Path(file_path)
+    df = pd.read_csv(path, low_memory=False)
+    n = len(df)
+    match = filename_regex.match(path.stem)
+    meta = match.groupdict() if match else {}
+
+    def times(column):
+        if column not in df.columns:
+            return np.full(n, np.nan)
+        return pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float64)
+
+    side = side_codes(df)
+
+    tones = next((pair for pair in TONE_PAIRS if pair[0] in df.columns or pair[1] in df.columns), None)
+    stimulus = np.zeros(n, dtype=np.uint8)
+    if tones:
+        stimulus[flag(df, tones[0])] = 1
+        stimulus[flag(df, tones[1])] = 2
+
+    block = np.zeros(n, dtype=np.uint8)
+    if "block" in df.columns:
+        block = df["block"].map({name: code for code, name in enumerate(BLOCKS) if name}).fillna(0) \
+                           .to_numpy(dtype=np.uint8)
+
+    qw = times("QW")
+    flags = {column: flag(df, column) for column in FLAG_COLUMNS}
+    trial_number = (df["trial_number"].fillna(0).to_numpy(dtype=np.int32)
+                    if "trial_number" in df.columns else np.arange(1, n + 1, dtype=np.int32))
+    session_start = times("session_start")
+
+    return Session(
+        path=str(path), protocol=meta.get("protocol"), animal=meta.get("animal"),
+        date=meta.get("date"), time=meta.get("time"), box=meta.get("box"),
+        columns=frozenset(df.columns), tones=tones, qw_mode=most_common(qw),
+        session_start=float(session_start[0]) if n else np.nan,
+        trial_number=trial_number,
+        trial_start=times("trial_start"), trial_end=times("trial_end"), lick_time=times("lick_time"),
+        outcome=encode_outcomes(flags["early_lick"], flags["omission"], side, flags["reward"], flags["punishment"]),
+        side=side, stimulus=stimulus, block=block,
+        qw=np.nan_to_num(qw, nan=-1).astype(np.int16),
+        unrewarded=flag(df, "reward", 0),   # reward == 0 exactly, rows without a value excluded
+        **flags,
+    )
+
+
+def as_session(source) -> Session:
+    """Accept either a Session already built or the path of its CSV."""
+    return source if isinstance(source, Session) else load(source)
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 10:26:48 2026
+
+@author: JoanaCatarino
+
+Persistent per-animal index of session files, so a lookup only touches the
+folders of the animal asked for instead of globbing the whole data tree.
+
+Each animal has one JSON file in Index/ with its session records and the
+mtime of every date folder. A lookup lists the animal's Behavior folder and
+only re-lists the date folders whose mtime changed; files are re-stat'ed so
+records always carry the current size and mtime. Only the date folders
+themselves are listed, so backups in old/ are never indexed.
+
+Files that dedupe.py found to be byte-identical copies of another session
+are listed in Index/duplicates.json and left out of lookups, so every
+loader reads each session once.
+"""
+
+import os
+import re
+import json
+import argparse
+from pathlib import Path
+
+import paths
+
+# Base data directory
+DATA_DIR = paths.DATA_DIR
+INDEX_DIR = DATA_DIR / "Index"
+DUPLICATES_FILE = INDEX_DIR / "duplicates.json"
+
+# Regex to parse filenames
+filename_regex = re.compile(
+    r'(?P<protocol>[^_]+)_(?P<animal>\d+)_(?P<date>\d{8})_(?P<time>\d+)_box(?P<box>\w+)\.csv$',
+    re.IGNORECASE
+)
+
+
+def index_path(animal) -> Path:
+    return INDEX_DIR / f"{animal}.json"
+
+
+def load_index(animal) -> dict:
+    try:
+        with open(index_path(animal)) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {"dirs": {}, "sessions": {}}
+
+
+def save_index(animal, index):
+    INDEX_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = index_path(animal).with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp, index_path(animal))
+
+
+_duplicates = {"mtime": None, "files": {}}
+
+
+def load_duplicates() -> dict:
+    """{duplicate path: {"canonical", "size", "mtime"}} from the last dedupe scan (re-read when it changes)."""
+    try:
+        mtime = DUPLICATES_FILE.stat().st_mtime
+    except FileNotFoundError:
+        return {}
+    if _duplicates["mtime"] != mtime:
+        try:
+            with open(DUPLICATES_FILE) as f:
+                _duplicates["files"] = json.load(f)["duplicates"]
+        except (OSError, json.JSONDecodeError, KeyError):
+            _duplicates["files"] = {}
+        _duplicates["mtime"] = mtime
+    return _duplicates["files"]
+
+
+def is_duplicate(path, size=None, mtime=None) -> bool:
+    """True if path is a known copy of another session that still exists.
+
+    A file that changed since the scan is no longer treated as a copy.
+    """
+    entry = load_duplicates().get(os.path.normpath(path))
+    if entry is None:
+        return False
+    if size is None or mtime is None:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return False
+        size, mtime = stat.st_size, stat.st_mtime
+    return size == entry["size"] and mtime == entry["mtime"] and os.path.exists(entry["canonical"])
+
+
+def scan_date_folder(date_dir) -> list[dict]:
+    """Records of the session files directly in date_dir (subfolders such as old/ are not entered)."""
+    records = []
+    for entry in os.scandir(date_dir):
+        match = filename_regex.match(entry.name)
+        if not match or not entry.is_file():
+            continue
+        records.append({
+            "animal": match.group("animal"),
+            "protocol": match.group("protocol"),
+            "date": match.group("date"),
+            "time": match.group("time"),
+            "box": match.group("box"),
+            "path": entry.path,
+        })
+    return records
+
+
+def lookup(animal, protocols=None, unique=True) -> list[dict]:
+    """Session records of one animal, oldest first, refreshing the index where folders changed.
+
+    With unique, known duplicate copies (see dedupe.py) are left out.
+    """
+    animal = str(animal)
+    behavior_dir = DATA_DIR / animal / "Behavior"
+    if not behavior_dir.is_dir():
+        return []
+
+    index = load_index(animal)
+    changed = False
+    current_dirs = {}
+    for entry in os.scandir(behavior_dir):
+        if not entry.is_dir():
+            continue
+        mtime = entry.stat().st_mtime
+        current_dirs[entry.name] = mtime
+        if index["dirs"].get(entry.name) != mtime:
+            index["sessions"][entry.name] = scan_date_folder(entry.path)
+            changed = True
+
+    # Date folders that were removed
+    for name in set(index["dirs"]) - set(current_dirs):
+        index["sessions"].pop(name, None)
+        changed = True
+
+    if changed:
+        index["dirs"] = current_dirs
+        save_index(animal, index)
+
+    records = []
+    for name in sorted(index["sessions"]):
+        for record in index["sessions"][name]:
+            if protocols and record["protocol"] not in protocols:
+                continue
+            try:
+                stat = os.stat(record["path"])
+            except FileNotFoundError:
+                continue  # removed since the folder was listed
+            if unique and is_duplicate(record["path"], stat.st_size, stat.st_mtime):
+                continue
+            records.append({**record, "mtime": stat.st_mtime, "size": stat.st_size})
+    records.sort(key=lambda r: (r["date"], r["time"]))
+    return records
+
+
+def all_animals() -> list[str]:
+    return sorted(d.name for d in DATA_DIR.iterdir() if d.is_dir() and d.name.isdigit())
+
+
+def lookup_all(animals=None, protocols=None, unique=True) -> dict:
+    """{animal: [file record, ...]} for the given animals (default: every animal)."""
+    sessions = {}
+    for animal in animals or all_animals():
+        records = lookup(animal, protocols, unique)
+        if records:
+            sessions[animal] = records
+    return sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or refresh the per-animal session index.")
+    parser.add_argument("--animals", nargs="*", default=None, help="Animal IDs (default: all).")
+    args = parser.parse_args()
+    sessions = lookup_all(args.animals)
+    print(f"✅ Indexed {sum(len(r) for r in sessions.values())} sessions of {len(sessions)} animals in {INDEX_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 15:20:41 2026
+
+@author: JoanaCatarino
+
+Synthetic session generator. Writes a data tree with the same layout, file
+names and column schemas as the behavior boxes, so the analyses can be run
+and benchmarked without access to the share:
+
+    python synthetic_sessions.py --root C:/tmp/SyntheticData --animals 10 --days 30 --rows 500
+    set BEHAVIOR_DATA_DIR=C:/tmp/SyntheticData
+    set BEHAVIOR_MAPPING_FILE=C:/tmp/SyntheticData/spout_tone_generator.csv
+"""
+
+import argparse
+from pathlib import Path
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+PROTOCOLS = ["FreeLick", "FreePressing", "SpoutSamp", "2ChoiceAuditory", "AdaptSensorimotor"]
+FIRST_ANIMAL = 900001
+FIRST_DATE = datetime(2025, 1, 6)
+SESSION_EPOCH = 1.736e9     # session_start of the first day, in seconds
+TONE_DELAY = 1.2            # tone comes 1.2 s after trial_start, as assumed by the analyses
+MAPPING_NAME = "spout_tone_generator.csv"
+
+
+def trial_times(n, session_start, rng):
+    iti = rng.uniform(4, 8, n)
+    trial_start = session_start + 5 + np.cumsum(iti)
+    return trial_start, trial_start + iti * 0.8
+
+
+def choice_trials(n, rng, learning, tones):
+    """Common columns of the 2-choice protocols. learning in [0, 1] sets the % correct."""
+    session_start = SESSION_EPOCH
+    trial_start, trial_end = trial_times(n, session_start, rng)
+
+    high = rng.random(n) < 0.5
+    early = rng.random(n) < 0.05
+    omission = ~early & (rng.random(n) < 0.15 - 0.1 * learning)
+    responded = ~early & ~omission
+    correct = responded & (rng.random(n) < 0.5 + 0.4 * learning)
+
+    # Low tone → left spout, high tone → right spout (see write_mapping)
+    go_right = np.where(correct, high, ~high)
+    latency = rng.gamma(2.0, 0.25, n)
+    lick_time = np.where(responded, trial_start + TONE_DELAY + latency,
+                         np.where(early, trial_start + rng.uniform(0, TONE_DELAY, n), np.nan))
+
+    return pd.DataFrame({
+        "trial_number": np.arange(1, n + 1),
+        "session_start": session_start,
+        "trial_start": trial_start,
+        "trial_end": trial_end,
+        "lick_time": lick_time,
+        "left_spout": (responded & ~go_right).astype(int),
+        "right_spout": (responded & go_right).astype(int),
+        "reward": correct.astype(int),
+        "punishment": (responded & ~correct).astype(int),
+        "omission": omission.astype(int),
+        "early_lick": early.astype(int),
+        "autom_reward": (np.arange(n) < n * 0.05 * (1 - learning)).astype(int),
+        tones[0]: (~high).astype(int),
+        tones[1]: high.astype(int),
+        "QW": rng.integers(0, 4),
+    })
+
+
+def two_choice_auditory(n, rng, learning=0.5):
+    return choice_trials(n, rng, learning, ("8KHz", "16KHz"))
+
+
+def adapt_sensorimotor(n, rng, learning=0.5, block_length=40):
+    df = choice_trials(n, rng, learning, ("5KHz", "10KHz"))
+    blocks = np.array(["sound", "action-left", "action-right"])
+    df["block"] = blocks[(np.arange(n) // block_length) % len(blocks)]
+    df["catch_trial"] = (rng.random(n) < 0.1).astype(int)
+    return df
+
+
+def free_licking(n, rng, learning=0.5):
+    """One row per lick; a trial ends after QW licks."""
+    qw = int(rng.integers(1, 4))
+    lick_time = SESSION_EPOCH + 5 + np.cumsum(rng.exponential(0.6, n))
+    trial_number = np.arange(n) // qw + 1
+    starts = pd.Series(lick_time).groupby(trial_number).transform("min").to_numpy()
+    ends = pd.Series(lick_time).groupby(trial_number).transform("max").to_numpy()
+    left = rng.random(n) < 0.5
+
+    return pd.DataFrame({
+        "trial_number": trial_number,
+        "session_start": SESSION_EPOCH,
+        "trial_start": starts - 0.5,
+        "trial_end": ends + 0.1,
+        "lick_time": lick_time,
+        "lick": 1,
+        "left_spout": left.astype(int),
+        "right_spout": (~left).astype(int),
+        "QW": qw,
+    })
+
+
+def spout_sampling(n, rng, learning=0.5):
+    trial_start, trial_end = trial_times(n, SESSION_EPOCH, rng)
+    omission = rng.random(n) < 0.1
+    left = rng.random(n) < 0.5
+    reward = ~omission & (rng.random(n) < 0.6 + 0.3 * learning)
+
+    return pd.DataFrame({
+        "trial_number": np.arange(1, n + 1),
+        "session_start": SESSION_EPOCH,
+        "trial_start": trial_start,
+        "trial_end": trial_end,
+        "lick_time": np.where(omission, np.nan, trial_start + rng.gamma(2.0, 0.3, n)),
+        "lick": (~omission).astype(int),
+        "left_spout": (~omission & left).astype(int),
+        "right_spout": (~omission & ~left).astype(int),
+        "reward": reward.astype(int),
+        "omission": omission.astype(int),
+        "QW": int(rng.integers(0, 4)),
+    })
+
+
+# Map protocol prefix to generator
+protocol_to_generator = {
+    "2ChoiceAuditory": two_choice_auditory,
+    "AdaptSensorimotor": adapt_sensorimotor,
+    "FreeLick": free_licking,
+    "FreePressing": free_licking,
+    "SpoutSamp": spout_sampling,
+}
+
+
+def curriculum(day, n_days):
+    """Protocol of a training day: FreeLick → SpoutSamp → 2ChoiceAuditory → AdaptSensorimotor."""
+    if day < 2:
+        return "FreeLick"
+    if day < 4:
+        return "SpoutSamp"
+    if day < max(5, int(n_days * 0.8)):
+        return "2ChoiceAuditory"
+    return "AdaptSensorimotor"
+
+
+def session_path(root, protocol, animal, dt, box) -> Path:
+    date = dt.strftime("%Y%m%d")
+    return Path(root) / str(animal) / "Behavior" / date / f"{protocol}_{animal}_{date}_{dt:%H%M%S}_box{box}.csv"
+
+
+def write_session(root, protocol, animal, dt, box, n_rows, rng, learning=0.5) -> Path:
+    path = session_path(root, protocol, animal, dt, box)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df = protocol_to_generator[protocol](n_rows, rng, learning)
+    # Each day starts at its own time, as real sessions do
+    offset = (dt - FIRST_DATE).total_seconds()
+    for col in ("session_start", "trial_start", "trial_end", "lick_time"):
+        df[col] = df[col] + offset
+    df.to_csv(path, index=False)
+    return path
+
+
+def write_mapping(root, animals) -> Path:
+    path = Path(root) / MAPPING_NAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame({
+        "Animal": animals,
+        "8KHz": "left", "16KHz": "right",
+        "5KHz": "left", "10KHz": "right",
+    }).to_csv(path, index=False)
+    return path
+
+
+def generate_tree(root, n_animals=5, n_days=20, n_rows=500, protocols=None, seed=0) -> list[Path]:
+    """Write n_animals × n_days sessions. Without protocols, each animal follows the curriculum."""
+    rng = np.random.default_rng(seed)
+    animals = [FIRST_ANIMAL + i for i in range(n_animals)]
+    write_mapping(root, animals)
+
+    files = []
+    for animal in animals:
+        box = int(rng.integers(1, 5))
+        for day in range(n_days):
+            day_protocols = protocols or [curriculum(day, n_days)]
+            for k, protocol in enumerate(day_protocols):
+                dt = FIRST_DATE + timedelta(days=day, hours=9 + k, minutes=int(rng.integers(0, 60)))
+                learning = min(1.0, day / max(n_days - 1, 1))
+                files.append(write_session(root, protocol, animal, dt, box, n_rows, rng, learning))
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic behavior data tree.")
+    parser.add_argument("--root", required=True, help="Folder to write the data tree to.")
+    parser.add_argument("--animals", type=int, default=5)
+    parser.add_argument("--days", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=500, help="Rows per session file.")
+    parser.add_argument("--protocols", nargs="*", default=None, choices=PROTOCOLS,
+                        help="Protocols written every day (default: a training curriculum).")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    files = generate_tree(args.root, args.animals, args.days, args.rows, args.protocols, args.seed)
+    print(f"✅ Wrote {len(files)} sessions to {args.root}")
+    print(f"   BEHAVIOR_DATA_DIR={args.root}")
+    print(f"   BEHAVIOR_MAPPING_FILE={Path(args.root) / MAPPING_NAME}")
+
+
+if __name__ == "__main__":
+    main()
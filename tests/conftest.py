@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 10:04:12 2026
+
+@author: JoanaCatarino
+
+Shared fixtures of the tests: a small synthetic data tree written once per
+run with synthetic_sessions.py. paths.py reads the data folder at import, so
+it is pointed at a temporary folder here, before any test imports the scripts.
+
+    python -m pytest -q
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+from pathlib import Path
+
+import pytest
+
+REPO_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_DIR))
+
+DATA_DIR = Path(tempfile.mkdtemp(prefix="behavior_tests_"))
+os.environ["BEHAVIOR_DATA_DIR"] = str(DATA_DIR)
+os.environ["BEHAVIOR_MAPPING_FILE"] = str(DATA_DIR / "spout_tone_generator.csv")
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+import synthetic_sessions  # noqa: E402  (needs the environment above)
+
+PROTOCOLS = ["2ChoiceAuditory", "FreeLick", "SpoutSamp"]
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def session_files() -> dict:
+    """{protocol: [paths]} of a 2 animals × 3 days tree, one session per protocol and day.
+
+    Shared by every test, so tests must not change these files (use make_tree for that).
+    """
+    files = synthetic_sessions.generate_tree(DATA_DIR, n_animals=2, n_days=3, n_rows=300, protocols=PROTOCOLS)
+    by_protocol = {}
+    for path in files:
+        by_protocol.setdefault(path.name.split("_")[0], []).append(path)
+    return by_protocol
+
+
+@pytest.fixture
+def make_tree(tmp_path):
+    """Writes a synthetic tree of the test's own under tmp_path and returns its files."""
+    def make(**kwargs):
+        return synthetic_sessions.generate_tree(tmp_path, **kwargs)
+    return make
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 11:02:35 2026
+
+@author: JoanaCatarino
+
+Duplicate trials and the old/ backups: clean_duplicates, concat_files and
+archive_old must never lose or overwrite an original.
+"""
+
+import io
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import archive_old
+import clean_duplicates
+import concat_files
+
+
+def baseline_resolve(df):
+    """Per-trial choice of the original clean_duplicates script."""
+    def pick(group):
+        rewarded = group[group["reward"] == 1]
+        if not rewarded.empty:
+            group = rewarded
+        return group.drop_duplicates().iloc[[0]]
+    return pd.concat([pick(g) for _, g in df.groupby("trial_number")], ignore_index=True)
+
+
+def with_duplicates(path, seed=0):
+    """Session frame with some trials repeated, half of the copies with the reward flipped."""
+    rng = np.random.default_rng(seed)
+    df = pd.read_csv(path)
+    copies = df.sample(60, random_state=seed)
+    copies["reward"] = np.where(rng.random(len(copies)) < 0.5, 1 - copies["reward"], copies["reward"])
+    return pd.concat([df, copies]).sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def test_resolve_duplicates_matches_baseline(session_files):
+    for seed, path in enumerate(session_files["2ChoiceAuditory"]):
+        df = with_duplicates(path, seed)
+        pd.testing.assert_frame_equal(clean_duplicates.resolve_duplicates(df), baseline_resolve(df))
+
+
+def test_backup_path_counts_past_existing_and_archived(tmp_path):
+    session = tmp_path / "FreeLick_900001_20250106_090000_box1.csv"
+    session.write_text("trial_number\n1\n")
+
+    first = clean_duplicates.backup_path_for(session, tmp_path)
+    assert os.path.basename(first) == "FreeLick_900001_20250106_090000_box1_old.csv"
+    open(first, "w").close()
+    second = clean_duplicates.backup_path_for(session, tmp_path)
+    assert os.path.basename(second) == "FreeLick_900001_20250106_090000_box1_old2.csv"
+
+    # Once archived, the names stay taken
+    open(second, "w").close()
+    archive_old.archive_folder(tmp_path / "old")
+    third = clean_duplicates.backup_path_for(session, tmp_path)
+    assert os.path.basename(third) == "FreeLick_900001_20250106_090000_box1_old3.csv"
+
+
+def test_clean_file_keeps_the_original(make_tree):
+    path = make_tree(n_animals=1, n_days=1, n_rows=200, protocols=["2ChoiceAuditory"])[0]
+    original = path.read_bytes()
+    with_duplicates(path).to_csv(path, index=False)
+    duplicated = path.read_bytes()
+
+    removed = clean_duplicates.clean_file(str(path))
+
+    assert removed == 60
+    assert (path.parent / "old" / f"{path.stem}_old.csv").read_bytes() == duplicated
+    assert pd.read_csv(path)["trial_number"].is_unique
+    assert len(pd.read_csv(path)) == len(pd.read_csv(io.BytesIO(original)))
+    assert sorted(os.listdir(path.parent)) == sorted(["old", path.name])   # no temp file left
+
+
+def test_concat_backs_up_every_original(make_tree):
+    files = make_tree(n_animals=1, n_days=1, n_rows=50, protocols=["FreeLick", "FreeLick"])
+    date_dir = files[0].parent
+    originals = {p.name: p.read_bytes() for p in files}
+    # An earlier backup with the first file's name must survive
+    (date_dir / "old").mkdir()
+    (date_dir / "old" / f"{files[0].stem}_old.csv").write_text("earlier backup")
+
+    concat_files.process_date_folder(str(date_dir))
+
+    combined = pd.read_csv(files[0])
+    assert len(combined) == 100
+    assert combined["trial_number"].is_monotonic_increasing
+    assert not files[1].exists()
+    assert (date_dir / "old" / f"{files[0].stem}_old.csv").read_text() == "earlier backup"
+    assert (date_dir / "old" / f"{files[0].stem}_old2.csv").read_bytes() == originals[files[0].name]
+    assert (date_dir / "old" / f"{files[1].stem}_old.csv").read_bytes() == originals[files[1].name]
+
+
+def test_archive_round_trip(make_tree):
+    path = make_tree(n_animals=1, n_days=1, n_rows=100, protocols=["SpoutSamp"])[0]
+    old_dir = path.parent / "old"
+    old_dir.mkdir()
+    backup = old_dir / f"{path.stem}_old.csv"
+    backup.write_bytes(path.read_bytes())
+
+    n_files, _, _ = archive_old.archive_folder(old_dir)
+
+    assert n_files == 1
+    assert not old_dir.exists()
+    assert archive_old.list_archived(path.parent) == [backup.name]
+    pd.testing.assert_frame_equal(archive_old.read_backup(backup), pd.read_csv(path))
+
+
+def test_archive_refuses_a_different_file_with_an_archived_name(tmp_path, capsys):
+    old_dir = tmp_path / "old"
+    old_dir.mkdir()
+    backup = old_dir / "session_old.csv"
+    backup.write_text("a\n1\n")
+    archive_old.archive_folder(old_dir)
+
+    old_dir.mkdir()
+    backup.write_text("a\n2\n")
+    n_files, _, _ = archive_old.archive_folder(old_dir)
+
+    assert n_files == 0
+    assert "left in old/" in capsys.readouterr().out
+    assert archive_old.list_archived(tmp_path) == ["session_old.csv"]
+    assert archive_old.read_backup(backup)["a"].tolist() == [2]   # the file asked for, still in old/
+    backup.unlink()
+    assert archive_old.read_backup(backup)["a"].tolist() == [1]
+
+
+def test_missing_backup_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        archive_old.open_backup(tmp_path / "old" / "nothing_old.csv")
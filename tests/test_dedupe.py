@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 11:40:18 2026
+
+@author: JoanaCatarino
+
+Byte-identical session copies: dedupe finds them, session_index skips them.
+"""
+
+import os
+import shutil
+
+import pytest
+
+import dedupe
+import session_index
+
+
+@pytest.fixture
+def tree(make_tree, tmp_path, monkeypatch):
+    """Own synthetic tree with one session copied under a later time, and its own index."""
+    files = make_tree(n_animals=1, n_days=2, n_rows=100, protocols=["2ChoiceAuditory"])
+    monkeypatch.setattr(session_index, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(session_index, "INDEX_DIR", tmp_path / "Index")
+    monkeypatch.setattr(session_index, "DUPLICATES_FILE", tmp_path / "Index" / "duplicates.json")
+    monkeypatch.setattr(dedupe, "DUPLICATES_FILE", tmp_path / "Index" / "duplicates.json")
+    monkeypatch.setitem(session_index._duplicates, "mtime", None)
+
+    original = files[0]
+    copy = original.with_name(original.name.replace("_box", "9_box"))   # later time, same day
+    shutil.copy(original, copy)
+    os.utime(copy, (original.stat().st_mtime + 10,) * 2)
+    return original, copy
+
+
+def test_copy_is_skipped(tree):
+    original, copy = tree
+    duplicates = dedupe.find_duplicates(workers=2)
+
+    assert duplicates[os.path.normpath(copy)]["canonical"] == os.path.normpath(original)
+    assert session_index.is_duplicate(copy)
+    assert not session_index.is_duplicate(original)
+    paths = [r["path"] for r in session_index.lookup("900001")]
+    assert str(original) in paths and str(copy) not in paths
+
+
+def test_changed_copy_is_a_session_again(tree):
+    original, copy = tree
+    dedupe.find_duplicates(workers=2)
+    with open(copy, "a") as f:
+        f.write("\n")
+    assert not session_index.is_duplicate(copy)
+
+
+def test_copy_of_a_removed_session_is_kept(tree):
+    original, copy = tree
+    dedupe.find_duplicates(workers=2)
+    original.unlink()
+    assert not session_index.is_duplicate(copy)
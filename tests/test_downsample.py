@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 12:05:51 2026
+
+@author: JoanaCatarino
+
+downsample.reduce keeps the shape of a series: ends, every bucket's min and max.
+"""
+
+import numpy as np
+
+import downsample
+
+
+def test_short_series_untouched():
+    x, y = np.arange(100), np.random.default_rng(0).random(100)
+    rx, ry = downsample.reduce(x, y, max_points=200)
+    assert rx is x or np.array_equal(rx, x)
+    np.testing.assert_array_equal(ry, y)
+
+
+def test_long_series_keeps_extremes_and_ends():
+    rng = np.random.default_rng(0)
+    x = np.arange(100_000)
+    y = rng.normal(size=len(x))
+    y[12_345], y[67_890] = 50, -50
+
+    rx, ry = downsample.reduce(x, y, max_points=1000)
+
+    assert len(rx) <= 1002
+    assert rx[0] == 0 and rx[-1] == len(x) - 1
+    assert np.all(np.diff(rx) > 0)                 # original order, no repeats
+    np.testing.assert_array_equal(ry, y[rx])       # points are taken, never averaged
+    assert 12_345 in rx and 67_890 in rx
+    assert ry.max() == y.max() and ry.min() == y.min()
+
+
+def test_bucket_extremes_ignore_nan():
+    y = np.arange(20_000, dtype=float)
+    y[::2] = np.nan
+    rx, ry = downsample.reduce(np.arange(len(y)), y, max_points=100)
+    assert not np.isnan(ry[1:-1]).any()
+    assert np.nanmax(ry) == np.nanmax(y)
+
+
+def test_matches_every_bucket():
+    rng = np.random.default_rng(1)
+    y = rng.random(10_001)
+    rx, _ = downsample.reduce(np.arange(len(y)), y, max_points=100)
+    size = -(-len(y) // 50)
+    for start in range(0, len(y), size):
+        bucket = y[start:start + size]
+        assert start + bucket.argmin() in rx and start + bucket.argmax() in rx
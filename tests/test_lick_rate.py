@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 12:22:09 2026
+
+@author: JoanaCatarino
+
+lick_rate.bin_licks against a plain histogram of the lick times.
+"""
+
+import numpy as np
+import pandas as pd
+
+import lick_rate
+import session_data
+
+
+def test_bins_match_histogram(session_files):
+    for path in session_files["FreeLick"]:
+        df = pd.read_csv(path)
+        session = session_data.load(path)
+        t = df["lick_time"] - df["session_start"]
+        duration = max(t.max(), (df["trial_end"] - df["session_start"]).max())
+
+        rates = lick_rate.bin_licks(session)
+
+        for width, counts in rates.items():
+            n_bins = int(duration // width) + 1
+            edges = np.arange(n_bins + 1) * width
+            assert counts.shape == (3, n_bins)
+            for row, mask in ((lick_rate.TOTAL, df["lick"] == 1),
+                              (lick_rate.LEFT, (df["lick"] == 1) & (df["left_spout"] == 1)),
+                              (lick_rate.RIGHT, (df["lick"] == 1) & (df["right_spout"] == 1))):
+                np.testing.assert_array_equal(counts[row], np.histogram(t[mask], edges)[0])
+
+
+def test_licks_before_start_or_without_time_are_left_out():
+    session = session_data.Session(
+        session_start=100.0,
+        lick_time=np.array([99.0, 100.0, 100.5, np.nan, 161.0]),
+        trial_end=np.array([101.0, 101.0, 101.0, 101.0, 170.0]),
+        lick=np.ones(5, dtype=bool),
+        side=np.array([session_data.LEFT, session_data.LEFT, session_data.RIGHT,
+                       session_data.LEFT, session_data.RIGHT], dtype=np.uint8),
+    )
+    rates = lick_rate.bin_licks(session, bin_seconds=(60,))
+    np.testing.assert_array_equal(rates[60], [[2, 1], [1, 0], [1, 1]])
+
+
+def test_pick_bin_and_stack():
+    assert lick_rate.pick_bin(300) == 1
+    assert lick_rate.pick_bin(3600) == 10
+    assert lick_rate.pick_bin(10 ** 6) == 60
+    stacked = lick_rate.stack([np.ones((3, 2)), np.ones((3, 4))])
+    assert stacked.shape == (2, 3, 4)
+    assert np.isnan(stacked[0, :, 2:]).all() and not np.isnan(stacked[1]).any()
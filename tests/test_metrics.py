@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 12:40:33 2026
+
+@author: JoanaCatarino
+
+metrics' normal quantile against scipy.stats.norm.ppf, which it replaces.
+"""
+
+import numpy as np
+import pytest
+
+import metrics
+
+norm = pytest.importorskip("scipy.stats").norm
+
+
+def test_quantile_array_matches_scipy():
+    # Both tails and the central region of Acklam's approximation
+    p = np.concatenate([np.linspace(1e-6, 0.03, 500), np.linspace(0.01, 0.99, 2000), 1 - np.linspace(1e-6, 0.03, 500)])
+    np.testing.assert_allclose(metrics.z_score(p), norm.ppf(p), rtol=1e-8, atol=1e-8)
+
+
+def test_quantile_scalar_matches_scipy():
+    for p in (0.01, 0.025, 0.3, 0.5, 0.9, 0.99):
+        assert metrics.z_score(p) == pytest.approx(norm.ppf(p), abs=1e-12)
+    assert isinstance(metrics.z_score(0.5), float)
+
+
+def test_d_prime():
+    hr, fa = np.array([0.9, 0.5, 0.2]), np.array([0.1, 0.5, 0.6])
+    np.testing.assert_allclose(metrics.d_prime(hr, fa), norm.ppf(hr) - norm.ppf(fa), atol=1e-8)
+    assert metrics.d_prime(0.5, 0.5) == 0
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 10:31:47 2026
+
+@author: JoanaCatarino
+
+session_data against the pandas code it replaced in analyze_2choice_auditory.
+"""
+
+import numpy as np
+import pandas as pd
+
+import session_data
+from session_data import OUTCOMES
+
+
+def baseline_categories(df):
+    """Outcome category per row, as the original analyze_2choice_auditory assigned it."""
+    df = df.copy()
+    df["category"] = None
+    df.loc[df["early_lick"] == 1, "category"] = "early lick"
+    df.loc[(df["omission"] == 1) & (df["category"].isna()), "category"] = "omission"
+    df.loc[(df["left_spout"] == 1) & (df["reward"] == 1), "category"] = "correct left"
+    df.loc[(df["right_spout"] == 1) & (df["reward"] == 1), "category"] = "correct right"
+    df.loc[(df["punishment"] == 1) & (df["left_spout"] == 1), "category"] = "incorrect left"
+    df.loc[(df["punishment"] == 1) & (df["right_spout"] == 1), "category"] = "incorrect right"
+    return df["category"].fillna("none").to_list()
+
+
+def test_outcomes_match_baseline_on_sessions(session_files):
+    for path in session_files["2ChoiceAuditory"]:
+        df = pd.read_csv(path)
+        outcome = session_data.load(path).outcome
+        assert [OUTCOMES[code] for code in outcome] == baseline_categories(df)
+
+
+def test_outcomes_match_baseline_on_conflicting_flags():
+    # Every combination of flags, including ones the boxes should never write
+    rng = np.random.default_rng(1)
+    columns = ["early_lick", "omission", "left_spout", "right_spout", "reward", "punishment"]
+    df = pd.DataFrame(rng.integers(0, 2, (2000, len(columns))), columns=columns)
+    assert [OUTCOMES[code] for code in session_data.encode_frame(df)] == baseline_categories(df)
+
+
+def test_lick_latency_matches_baseline(session_files):
+    for path in session_files["2ChoiceAuditory"]:
+        df = pd.read_csv(path)
+        expected = df["lick_time"] - (df["trial_start"] + 1.2)
+        np.testing.assert_allclose(session_data.load(path).lick_latency, expected.to_numpy(), equal_nan=True)
+
+
+def test_missing_flag_columns_are_false():
+    df = pd.DataFrame({"reward": [1, np.nan, 0]})
+    assert session_data.flag(df, "reward").tolist() == [True, False, False]
+    assert not session_data.flag(df, "punishment").any()
+
+
+def test_spout_sampling_counts_skip_empty_rewards(session_files, tmp_path):
+    import general_spout_sampling
+    df = pd.read_csv(session_files["SpoutSamp"][0])
+    df.loc[::7, "reward"] = np.nan
+    path = tmp_path / session_files["SpoutSamp"][0].name
+    df.to_csv(path, index=False)
+
+    # Counts of the original general_spout_sampling (reward == 0 on the unfilled frame)
+    expected = (((df["lick"] == 1) & (df["reward"] == 1)).sum(), ((df["lick"] == 1) & (df["reward"] == 0)).sum(),
+                ((df["left_spout"] == 1) & (df["reward"] == 0)).sum(),
+                ((df["right_spout"] == 1) & (df["reward"] == 0)).sum())
+    assert general_spout_sampling.load_trial_counts(path)[:4] == expected
+
+
+def test_two_choice_qw_counts_empty_rows_as_zero(session_files, tmp_path):
+    import general_2choice_auditory
+    df = pd.read_csv(session_files["2ChoiceAuditory"][0])
+    df["QW"] = np.where(np.arange(len(df)) % 3 == 0, 2, np.nan)
+    path = tmp_path / session_files["2ChoiceAuditory"][0].name
+    df.to_csv(path, index=False)
+
+    # The original filled the frame with 0 before the mode
+    assert general_2choice_auditory.load_trial_counts(path)["QW"] == 0
+    assert session_data.load(path).qw_mode == 2
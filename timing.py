@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 14:12:30 2026
+
+@author: JoanaCatarino
+
+Per-stage timing for the analysis scripts and runners.
+
+    with timing.session(Path(file_path).stem, animal=animal):
+        with timing.stage("load"):
+            ...
+
+Long functions can instead call timing.mark("plot") at each stage boundary;
+a mark lasts until the next mark or the end of the enclosing stage.
+
+Each session appends one JSON line (stages and durations) to Logs/timing.jsonl.
+Set BEHAVIOR_PROFILE to part of a session name to also dump a cProfile of that
+session to Logs/profiles/<session>.prof (open with pstats or snakeviz).
+
+Set BEHAVIOR_MEMORY the same way ("all" for every session) to also record, per
+stage, the peak Python heap (tracemalloc) and the peak RSS of the process, and
+the lines of our modules holding the most memory (memory allocated inside
+pandas, numpy or matplotlib counts for the line of ours that called it).
+Subprocesses started by the runners inherit the variable. Summarize a batch with:
+
+    python timing.py --memory --last 50
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import cProfile
+import functools
+import tracemalloc
+from pathlib import Path
+from datetime import datetime
+from contextlib import contextmanager
+
+import paths
+
+# Base data directory
+DATA_DIR = paths.DATA_DIR
+LOG_DIR = DATA_DIR / "Logs"
+TIMING_LOG = LOG_DIR / "timing.jsonl"
+PROFILE_ENV = "BEHAVIOR_PROFILE"
+MEMORY_ENV = "BEHAVIOR_MEMORY"
+TOP_LINES = 10
+MIN_LINE_BYTES = 64 * 1024     # smaller lines are left out of the ranking
+# Stack depth kept per allocation, enough to reach our code from inside pandas/numpy/matplotlib.
+# Deep stacks make traced runs much slower; BEHAVIOR_MEMORY_FRAMES can lower it.
+TRACE_FRAMES = int(os.environ.get("BEHAVIOR_MEMORY_FRAMES", 25))
+REPO_DIR = str(Path(__file__).resolve().parent)
+THIS_FILE = str(Path(__file__).resolve())
+
+# Stages of the session currently being timed (None outside a session), the
+# names of the open stages and the open marks as (depth, name, start, memory)
+_records = None
+_stack = []
+_marks = []
+
+# When memory is tracked: the heap peak seen by each open stage or mark, and
+# the largest size held by each of our source lines during the session
+_memory = None
+_open_peaks = []
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far, or None if not available."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024, 1)
+    except ImportError:
+        pass
+    try:
+        import psutil  # Windows: peak working set
+        return round(psutil.Process().memory_info().peak_wset / 1024 ** 2, 1)
+    except (ImportError, AttributeError):
+        return None
+
+
+def _fold_peak():
+    """Pass the heap peak since the last event to every open stage, then restart it."""
+    peak = tracemalloc.get_traced_memory()[1]
+    for entry in _open_peaks:
+        entry[0] = max(entry[0], peak)
+    tracemalloc.reset_peak()
+
+
+def _open_memory():
+    if _memory is None:
+        return None
+    _fold_peak()
+    entry = [tracemalloc.get_traced_memory()[0]]
+    _open_peaks.append(entry)
+    return entry
+
+
+@functools.lru_cache(maxsize=None)
+def _is_repo_file(filename):
+    """True for our modules (a script started as "python analyze_x.py" has a relative name)."""
+    if filename.startswith("<"):
+        return False   # <frozen ...>, <string>, <stdin>
+    path = os.path.abspath(filename)
+    return path.startswith(REPO_DIR + os.sep) and path != THIS_FILE
+
+
+def _close_memory(entry, record):
+    """Add the stage's heap peak and RSS to its record, and note the lines holding memory."""
+    if entry is None:
+        return
+    _fold_peak()
+    _open_peaks[:] = [e for e in _open_peaks if e is not entry]
+    record["peak_mb"] = round(entry[0] / 1024 ** 2, 2)
+    record["rss_mb"] = peak_rss_mb()
+
+    # Charge every block, even one allocated deep inside pandas or numpy, to the innermost of
+    # our lines in its traceback (the line that called out). Tracebacks are matched here rather
+    # than with Filter(all_frames=True), which is much slower on large heaps.
+    sizes = {}
+    for stat in tracemalloc.take_snapshot().statistics("traceback"):
+        frame = next((f for f in stat.traceback if _is_repo_file(f.filename)), None)   # most recent first
+        if frame is not None:
+            line = f"{Path(frame.filename).name}:{frame.lineno}"
+            sizes[line] = sizes.get(line, 0) + stat.size
+    for line, size in sizes.items():
+        if size >= MIN_LINE_BYTES:
+            _memory[line] = max(_memory.get(line, 0), size)
+
+
+def _close_marks(depth):
+    """Close the marks opened at nesting depth >= depth."""
+    now = time.perf_counter()
+    while _marks and _marks[-1][0] >= depth:
+        _, name, start, memory = _marks.pop()
+        if _records is not None:
+            record = {"stage": name, "seconds": round(now - start, 6)}
+            _close_memory(memory, record)
+            _records.append(record)
+
+
+def mark(name):
+    """End the current mark of this block and start a new one (pass None to only end it)."""
+    depth = len(_stack)
+    _close_marks(depth)
+    if name and _records is not None:
+        _marks.append((depth, "/".join(_stack + [name]), time.perf_counter(), _open_memory()))
+
+
+@contextmanager
+def stage(name):
+    """Time a block. Nested stages are recorded as 'outer/inner'."""
+    _stack.append(name)
+    full_name = "/".join(_stack)
+    memory = _open_memory() if _records is not None else None
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _close_marks(len(_stack))
+        if _records is not None:
+            record = {"stage": full_name, "seconds": round(time.perf_counter() - start, 6)}
+            _close_memory(memory, record)
+            _records.append(record)
+        _stack.pop()
+
+
+def timed(name=None):
+    """Decorator version of stage(); the stage name defaults to the function name."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name or func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def write_log(entry, log_path=TIMING_LOG):
+    try:
+        Path(log_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(log_path, "a") as f:
+            f.write(json.dumps(entry, default=str) + "\n")
+    except OSError as e:
+        print(f"⚠️ Could not write timing log {log_path}: {e}")
+
+
+@contextmanager
+def session(name, log_path=TIMING_LOG, **info):
+    """Collect the stages run inside the block and write them as one log entry."""
+    global _records, _stack, _marks, _memory, _open_peaks
+    outer = _records, _stack, _marks, _memory, _open_peaks
+    _records, _stack, _marks, _open_peaks = [], [], [], []
+
+    profile_target = os.environ.get(PROFILE_ENV)
+    profiler = cProfile.Profile() if profile_target and profile_target in name else None
+
+    memory_target = os.environ.get(MEMORY_ENV)
+    track_memory = bool(memory_target) and (memory_target == "all" or memory_target in name)
+    started_tracing = track_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start(TRACE_FRAMES)
+    _memory = {} if track_memory else None
+    session_memory = _open_memory()
+
+    started = datetime.now()
+    start = time.perf_counter()
+    status = "ok"
+    if profiler:
+        profiler.enable()
+    try:
+        yield _records
+    except BaseException as e:
+        status = f"error: {type(e).__name__}"
+        raise
+    finally:
+        _close_marks(0)
+        memory_record = {}
+        _close_memory(session_memory, memory_record)
+        if profiler:
+            profiler.disable()
+            profile_path = Path(log_path).parent / "profiles" / f"{name}.prof"
+            profile_path.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(profile_path)
+            print(f"🔬 Profile saved to: {profile_path}")
+
+        entry = {
+            "session": name,
+            "script": Path(sys.argv[0]).stem,
+            "started": started.isoformat(timespec="seconds"),
+            "total_seconds": round(time.perf_counter() - start, 6),
+            "status": status,
+            **info,
+            "stages": _records,
+        }
+        if track_memory:
+            top = sorted(_memory.items(), key=lambda item: -item[1])[:TOP_LINES]
+            entry["memory"] = {**memory_record,
+                               "top_lines": [{"line": line, "mb": round(size / 1024 ** 2, 3)} for line, size in top]}
+            print_memory_report(name, memory_record, _records, entry["memory"]["top_lines"])
+        if started_tracing:
+            tracemalloc.stop()
+        write_log(entry, log_path)
+        _records, _stack, _marks, _memory, _open_peaks = outer
+        # The enclosing stages still see this session's peak
+        for open_entry in _open_peaks:
+            open_entry[0] = max(open_entry[0], session_memory[0] if session_memory else 0)
+
+
+def print_memory_report(name, total, records, top_lines):
+    print(f"🧠 Memory for {name}: heap peak {total['peak_mb']} MB, peak RSS {total['rss_mb']} MB")
+    for r in records:
+        print(f"   {r['stage']:<40}{r['peak_mb']:>10} MB heap{r['rss_mb'] or '-':>10} MB RSS")
+    for t in top_lines[:5]:
+        print(f"   {t['line']:<40}{t['mb']:>10} MB")
+
+
+def read_log(log_path=TIMING_LOG, last=None) -> list[dict]:
+    entries = []
+    if Path(log_path).exists():
+        with open(log_path) as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return entries[-last:] if last else entries
+
+
+def memory_summary(log_path=TIMING_LOG, last=None, top=20):
+    """Rank the sessions, stages and source lines of a batch by memory."""
+    entries = [e for e in read_log(log_path, last) if "memory" in e]
+    if not entries:
+        print(f"⚠️ No memory records in {log_path} — run with {MEMORY_ENV}=all")
+        return
+
+    print(f"\n🧠 {len(entries)} sessions with memory records\n")
+    print(f"{'session':<50}{'heap peak MB':>14}{'peak RSS MB':>14}")
+    for e in sorted(entries, key=lambda e: -e["memory"]["peak_mb"])[:top]:
+        print(f"{e['session']:<50}{e['memory']['peak_mb']:>14}{e['memory']['rss_mb'] or '-':>14}")
+
+    # Stage names without the session-specific prefix, worst case over the batch
+    stages = {}
+    for e in entries:
+        for r in e["stages"]:
+            if "peak_mb" in r:
+                stages[r["stage"]] = max(stages.get(r["stage"], 0), r["peak_mb"])
+    print(f"\n{'stage':<50}{'max heap MB':>14}")
+    for stage_name, peak in sorted(stages.items(), key=lambda item: -item[1])[:top]:
+        print(f"{stage_name:<50}{peak:>14}")
+
+    lines = {}
+    for e in entries:
+        for t in e["memory"]["top_lines"]:
+            held, count = lines.get(t["line"], (0, 0))
+            lines[t["line"]] = (max(held, t["mb"]), count + 1)
+    print(f"\n{'line':<50}{'max held MB':>14}{'sessions':>10}")
+    for line, (held, count) in sorted(lines.items(), key=lambda item: -item[1][0])[:top]:
+        print(f"{line:<50}{held:>14}{count:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize the timing log.")
+    parser.add_argument("--memory", action="store_true", help="Rank sessions, stages and lines by memory.")
+    parser.add_argument("--last", type=int, default=None, help="Only the last N sessions.")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--log", default=str(TIMING_LOG))
+    args = parser.parse_args()
+
+    if args.memory:
+        memory_summary(args.log, args.last, args.top)
+        return
+    for e in read_log(args.log, args.last):
+        print(f"{e['started']}  {e['session']:<50}{e['total_seconds']:>10.2f} s  {e['status']}")
+
+
+if __name__ == "__main__":
+    main()
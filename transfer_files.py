@@ -6,42 +6,159 @@ Created on Thu Jun  5 10:35:48 2025
 """
 
 import os
-import shutil
 import re
+import json
+import shutil
+import hashlib
+import argparse
+import threading
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import paths
 
 # Paths
-transfering_folder = r"L:/dmclab/Joana/Behavior/Data/transfering"
-data_base_folder = r"L:/dmclab/Joana/Behavior/Data"
+transfering_folder = str(paths.DATA_DIR / "transfering")
+data_base_folder = str(paths.DATA_DIR)
+JOURNAL_NAME = "transfer_journal.jsonl"
+CHUNK_SIZE = 4 * 1024 * 1024
 
 # Pattern to extract animal ID and date from the filename
 pattern = r"_([0-9]{6})_([0-9]{8})_"
 
-# Gather files grouped by base name (excluding extension)
-file_groups = defaultdict(list)
-for filename in os.listdir(transfering_folder):
-    if filename.endswith(('.csv', '.json')):
-        base_name = os.path.splitext(filename)[0]  # without extension
-        file_groups[base_name].append(filename)
+journal_lock = threading.Lock()
+
+
+def file_groups_in(folder):
+    """Gather files grouped by base name (excluding extension)."""
+    groups = defaultdict(list)
+    for filename in os.listdir(folder):
+        if filename.endswith(('.csv', '.json')) and filename != JOURNAL_NAME:
+            base_name = os.path.splitext(filename)[0]  # without extension
+            groups[base_name].append(filename)
+    return groups
+
+
+def sha256_of(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def copy_with_checksum(src, tmp):
+    """Copy src to tmp and return the sha256 of the bytes read."""
+    h = hashlib.sha256()
+    with open(src, "rb") as fin, open(tmp, "wb") as fout:
+        while chunk := fin.read(CHUNK_SIZE):
+            h.update(chunk)
+            fout.write(chunk)
+    shutil.copystat(src, tmp)
+    return h.hexdigest()
+
+
+def load_journal(journal_path):
+    """Return {file name: entry} of files already transferred."""
+    done = {}
+    if os.path.exists(journal_path):
+        with open(journal_path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # last line cut by an interruption
+                done[entry["file"]] = entry
+    return done
+
+
+def write_journal(journal_path, entry):
+    with journal_lock:
+        with open(journal_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def transfer_file(src, dst, journal_path, done):
+    fname = os.path.basename(src)
 
-# Process each group
-for base_name, files in file_groups.items():
+    # Resume: already copied and verified, only the source is left to remove
+    entry = done.get(fname)
+    if entry and os.path.exists(dst) and sha256_of(dst) == entry["sha256"]:
+        if os.path.exists(src) and sha256_of(src) == entry["sha256"]:
+            os.remove(src)
+        print(f"⏭️  Already transferred {fname}")
+        return
+
+    # Same drive: a rename is enough
+    if os.stat(src).st_dev == os.stat(os.path.dirname(dst)).st_dev:
+        os.replace(src, dst)
+        write_journal(journal_path, {"file": fname, "dst": dst, "sha256": None, "method": "rename"})
+        print(f"Moved {fname} to {dst}")
+        return
+
+    tmp = dst + ".part"
+    checksum = copy_with_checksum(src, tmp)
+    if sha256_of(tmp) != checksum:
+        os.remove(tmp)
+        raise IOError(f"Checksum mismatch after copying {fname}")
+    os.replace(tmp, dst)
+    write_journal(journal_path, {"file": fname, "dst": dst, "sha256": checksum, "method": "copy"})
+    os.remove(src)
+    print(f"Copied and verified {fname} to {dst}")
+
+
+def transfer_group(base_name, files, source_folder, target_base, journal_path, done):
     match = re.search(pattern, base_name)
-    if match:
-        animal_id = match.group(1)
-        date = match.group(2)
+    if not match:
+        print(f"Skipping file (no animal ID or date match): {files}")
+        return True
+
+    animal_id = match.group(1)
+    date = match.group(2)
 
-        # Create target folder
-        target_folder = os.path.join(data_base_folder, animal_id, "Behavior", date)
-        os.makedirs(target_folder, exist_ok=True)
+    # Create target folder
+    target_folder = os.path.join(target_base, animal_id, "Behavior", date)
+    os.makedirs(target_folder, exist_ok=True)
 
-        # Move each file in the group
+    # Move each file in the group
+    try:
         for fname in files:
-            src = os.path.join(transfering_folder, fname)
-            dst = os.path.join(target_folder, fname)
-            shutil.move(src, dst)
-            print(f"Moved {fname} to {dst}")
-    else:
-        print(f"Skipping file (no animal ID or date match): {files}")
+            transfer_file(os.path.join(source_folder, fname), os.path.join(target_folder, fname), journal_path, done)
+        return True
+    except Exception as e:
+        print(f"❌ Error transferring {base_name}: {e}")
+        return False
+
+
+def transfer_all(source_folder=transfering_folder, target_base=data_base_folder, workers=4):
+    journal_path = os.path.join(source_folder, JOURNAL_NAME)
+    done = load_journal(journal_path)
+    if done:
+        print(f"↩️  Resuming: {len(done)} files already in the transfer journal")
+
+    groups = file_groups_in(source_folder)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(
+            lambda item: transfer_group(item[0], item[1], source_folder, target_base, journal_path, done),
+            groups.items()
+        ))
+
+    # Journal is only needed while a batch is incomplete
+    if all(results) and os.path.exists(journal_path):
+        os.remove(journal_path)
+    print("Done!" if all(results) else "Done with errors — run again to resume.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transfer session files from the transfer folder to the data tree.")
+    parser.add_argument("--source", default=transfering_folder)
+    parser.add_argument("--target", default=data_base_folder)
+    parser.add_argument("--workers", type=int, default=4, help="Groups copied concurrently.")
+    args = parser.parse_args()
+    transfer_all(args.source, args.target, args.workers)
+
 
-print("Done!")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 13:05:52 2026
+
+@author: JoanaCatarino
+
+Pre-flight validation of session files. Only the header, the first rows and
+the last rows of each file are read, so the whole tree can be checked before
+any analysis spends time parsing and plotting broken files.
+"""
+
+import os
+import re
+import csv
+import argparse
+from io import StringIO
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import paths
+
+# Base data directory
+DATA_DIR = paths.DATA_DIR
+REPORT_FILE = DATA_DIR / "validation_report.csv"
+
+SAMPLE_ROWS = 200          # rows read from the start of the file
+TAIL_BYTES = 64 * 1024     # bytes read from the end of the file
+MIN_ROWS = 1
+
+# Regex to parse filenames
+filename_regex = re.compile(
+    r'(?P<protocol>[^_]+)_(?P<animal>\d+)_(?P<date>\d{8})_\d+_box(?P<box>\w+)',
+    re.IGNORECASE
+)
+
+# Columns each analysis needs, per protocol
+REQUIRED_COLUMNS = {
+    '2ChoiceAuditory': {'trial_number', 'trial_start', 'lick_time', 'left_spout', 'right_spout', 'reward',
+                        'punishment', 'omission', 'early_lick', 'autom_reward', '8KHz', '16KHz'},
+    'AdaptSensorimotor': {'trial_number', 'trial_start', 'lick_time', 'left_spout', 'right_spout', 'reward',
+                          'punishment', 'omission', 'early_lick', 'autom_reward', '5KHz', '10KHz',
+                          'block', 'catch_trial'},
+    'FreeLick': {'trial_number', 'lick', 'left_spout', 'right_spout', 'QW', 'trial_start', 'trial_end',
+                 'lick_time', 'session_start'},
+    'FreePressing': {'trial_number', 'lick', 'left_spout', 'right_spout', 'QW', 'trial_start', 'trial_end',
+                     'lick_time', 'session_start'},
+    'SpoutSamp': {'trial_number', 'left_spout', 'right_spout', 'reward', 'omission', 'lick'},
+}
+
+# Protocols with one row per trial (FreeLick/FreePressing have one row per lick)
+UNIQUE_TRIALS = {'2ChoiceAuditory', 'AdaptSensorimotor', 'SpoutSamp'}
+
+TIME_COLUMN = 'trial_start'
+
+# mtime in integer nanoseconds: a float mtime does not always survive the CSV round trip
+REPORT_COLUMNS = ['path', 'protocol', 'size', 'mtime_ns', 'n_rows', 'ok', 'errors', 'warnings']
+# Nullable ints, so blanks (a file that vanished) never turn them into floats or strings
+INT_COLUMNS = {'size': 'Int64', 'mtime_ns': 'Int64', 'n_rows': 'Int64'}
+
+
+def count_rows(path) -> int:
+    """Number of data rows, counted on raw bytes without parsing."""
+    lines = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            lines += chunk.count(b"\n")
+            last = chunk[-1:]
+    if last != b"\n":
+        lines += 1  # last line without newline
+    return max(lines - 1, 0)
+
+
+def read_sample(path, header, n_rows) -> tuple[list[dict], list[dict]]:
+    """First SAMPLE_ROWS rows and the rows contained in the last TAIL_BYTES of the file.
+
+    The tail never repeats rows already in the head.
+    """
+    head = []
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            head.append(row)
+            if len(head) >= SAMPLE_ROWS:
+                break
+
+    tail = []
+    remaining = n_rows - len(head)
+    size = os.path.getsize(path)
+    if remaining > 0 and size > TAIL_BYTES:
+        with open(path, "rb") as f:
+            f.seek(size - TAIL_BYTES)
+            text = f.read().decode("utf-8", errors="replace")
+        text = text.split("\n", 1)[1] if "\n" in text else ""  # drop the partial first line
+        tail = list(csv.DictReader(StringIO(text), fieldnames=header))[-remaining:]
+    return head, tail
+
+
+def numeric(rows, column) -> list[float]:
+    values = []
+    for row in rows:
+        try:
+            values.append(float(row.get(column) or "nan"))
+        except ValueError:
+            values.append(float("nan"))
+    return [v for v in values if v == v]
+
+
+def is_sorted(values) -> bool:
+    return all(a <= b for a, b in zip(values, values[1:]))
+
+
+def validate_file(path) -> dict:
+    path = str(path)
+    stat = None
+    match = filename_regex.match(Path(path).stem)
+    protocol = match.group("protocol") if match else None
+    errors, warnings = [], []
+    n_rows = 0
+
+    try:
+        # Inside the try: a file moved away mid-run (transfer, concat) is reported, not raised
+        stat = os.stat(path)
+        with open(path, newline="") as f:
+            header = next(csv.reader(f), [])
+        n_rows = count_rows(path)
+
+        required = REQUIRED_COLUMNS.get(protocol)
+        if required is None:
+            warnings.append(f"no schema for protocol '{protocol}'")
+        else:
+            missing = sorted(required - set(header))
+            if missing:
+                errors.append(f"missing columns: {', '.join(missing)}")
+
+        if n_rows < MIN_ROWS:
+            errors.append(f"only {n_rows} rows")
+
+        elif not errors:
+            head, tail = read_sample(path, header, n_rows)
+            trials = numeric(head, "trial_number") + numeric(tail, "trial_number")
+            times = numeric(head, TIME_COLUMN) + numeric(tail, TIME_COLUMN)
+
+            if protocol in UNIQUE_TRIALS and len(set(trials)) < len(trials):
+                warnings.append("duplicate trial numbers")
+            if not is_sorted(trials):
+                warnings.append("trial numbers not increasing")
+            if not is_sorted(times):
+                warnings.append(f"{TIME_COLUMN} not monotonic")
+
+    except Exception as e:
+        errors.append(f"unreadable: {e}")
+
+    return {
+        "path": path,
+        "protocol": protocol,
+        "size": stat.st_size if stat else None,
+        "mtime_ns": stat.st_mtime_ns if stat else None,
+        "n_rows": n_rows,
+        "ok": not errors,
+        "errors": "; ".join(errors),
+        "warnings": "; ".join(warnings),
+    }
+
+
+def find_session_files(base_dir=DATA_DIR) -> list[str]:
+    files = []
+    for animal_dir in Path(base_dir).iterdir():
+        behavior_dir = animal_dir / "Behavior"
+        if not animal_dir.name.isdigit() or not behavior_dir.is_dir():
+            continue
+        for date_dir in behavior_dir.iterdir():
+            if date_dir.is_dir():
+                files.extend(str(f) for f in date_dir.glob("*_*_*_box*.csv"))
+    return files
+
+
+def load_report() -> pd.DataFrame:
+    if REPORT_FILE.exists():
+        # Blank errors / warnings stay '', blank numbers become <NA>
+        report = pd.read_csv(REPORT_FILE, keep_default_na=False, na_values={c: [""] for c in INT_COLUMNS},
+                             dtype=INT_COLUMNS)
+        # A report from before mtime_ns matches nothing, so every file is validated once more
+        return report.reindex(columns=REPORT_COLUMNS).astype(INT_COLUMNS)
+    return pd.DataFrame(columns=REPORT_COLUMNS).astype(INT_COLUMNS)
+
+
+def validate_tree(files=None, workers=8) -> pd.DataFrame:
+    """Validate files (default: the whole tree) and update the report.
+
+    Files whose size and mtime match the report are not read again.
+    """
+    files = find_session_files() if files is None else [str(f) for f in files]
+    report = load_report()
+    known = {(r["path"], r["size"], r["mtime_ns"]) for r in report.to_dict("records")}
+
+    todo = []
+    for f in files:
+        try:
+            stat = os.stat(f)
+        except OSError:
+            todo.append(f)   # gone since it was listed; validate_file reports it as unreadable
+            continue
+        if (f, stat.st_size, stat.st_mtime_ns) not in known:
+            todo.append(f)
+
+    # Threads rather than processes: the work is small reads, mostly waiting on the share
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        new_rows = list(pool.map(validate_file, todo))
+
+    if not report.empty:
+        keep = report["path"].map(os.path.exists) & ~report["path"].isin(todo)
+        report = report[keep.astype(bool)]
+    new_report = pd.DataFrame(new_rows, columns=REPORT_COLUMNS).astype(INT_COLUMNS)
+    report = pd.concat([report, new_report], ignore_index=True).astype(INT_COLUMNS)
+    report["ok"] = report["ok"].astype(str) == "True"
+    REPORT_FILE.parent.mkdir(parents=True, exist_ok=True)
+    report.sort_values("path").to_csv(REPORT_FILE, index=False)
+
+    for row in new_rows:
+        if not row["ok"]:
+            print(f"❌ {Path(row['path']).name}: {row['errors']}")
+    print(f"🔍 Validated {len(todo)} new or changed files ({len(files) - len(todo)} unchanged)")
+    return report
+
+
+def broken_files(files=None) -> set[str]:
+    """Paths the analyses should skip, after bringing the report up to date."""
+    report = validate_tree(files)
+    return set(report.loc[~report["ok"], "path"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fast pre-flight validation of session files.")
+    parser.add_argument("--files", nargs="*", default=None,
+                        help="Files to validate (default: every session file in the data folder).")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+    validate_tree(args.files, args.workers)
+
+
+if __name__ == "__main__":
+    main()